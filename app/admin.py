@@ -50,3 +50,36 @@ class BusinessAdmin(admin.ModelAdmin):
 @admin.register(models.SocialMediaLink)
 class SocialMediaLinkAdmin(admin.ModelAdmin):
     list_display = get_all_fields(models.SocialMediaLink)
+
+
+@admin.register(models.ScrapeFingerprint)
+class ScrapeFingerprintAdmin(admin.ModelAdmin):
+    list_display = get_all_fields(models.ScrapeFingerprint)
+    search_fields = [
+        "source",
+        "external_id",
+    ]
+
+
+@admin.register(models.DuplicateCandidate)
+class DuplicateCandidateAdmin(admin.ModelAdmin):
+    list_display = get_all_fields(models.DuplicateCandidate)
+    list_filter = [
+        "detector_version",
+    ]
+
+
+@admin.register(models.DuplicateDetectionRun)
+class DuplicateDetectionRunAdmin(admin.ModelAdmin):
+    list_display = get_all_fields(models.DuplicateDetectionRun)
+
+
+@admin.register(models.BusinessContactKey)
+class BusinessContactKeyAdmin(admin.ModelAdmin):
+    list_display = get_all_fields(models.BusinessContactKey)
+    list_filter = [
+        "kind",
+    ]
+    search_fields = [
+        "value",
+    ]
@@ -0,0 +1,171 @@
+"""
+Candidate generation (blocking) for fuzzy name matching
+
+Scoring every pair of names with ``SequenceMatcher`` is O(n²).  The helpers
+here only return the pairs that can still reach the similarity threshold,
+using bounds that hold for ``SequenceMatcher.ratio()``:
+
+    ratio = 2M / T, with M matched characters and T = len(a) + len(b)
+
+* Length filter: M <= min(len(a), len(b)).
+* Bigram count filter: the matched characters form b non-adjacent blocks,
+  and b - 1 <= T - 2M (each gap between blocks leaves at least one
+  unmatched character).  A block of length L shares L - 1 bigrams, so the
+  two names share at least M - b >= 3M - T - 1 bigrams.
+
+Pairs are generated from a bigram inverted index, so every pair reaching the
+threshold is returned and the scored results match brute force exactly.
+For thresholds <= 2/3, or names too short for the bigram bound to guarantee
+a shared bigram, pairs fall back to the length filter alone.
+"""
+import math
+from collections import Counter, defaultdict
+from itertools import combinations
+
+# Slack for float rounding, so bounds never prune a pair that reaches the threshold
+EPSILON = 1e-9
+
+
+def bigrams(text: str) -> Counter:
+    return Counter(text[i : i + 2] for i in range(len(text) - 1))
+
+
+def min_matched_chars(threshold: float, total_length: int) -> int:
+    """Fewest matched characters a pair of combined ``total_length`` needs"""
+    return max(0, math.ceil(threshold * total_length / 2 - EPSILON))
+
+
+def can_reach_threshold(length_a: int, length_b: int, threshold: float) -> bool:
+    """Length filter: at most the shorter name can be matched"""
+    return min(length_a, length_b) >= min_matched_chars(threshold, length_a + length_b)
+
+
+def required_shared_bigrams(threshold: float, total_length: int) -> int:
+    """Fewest shared bigrams (M - b >= 3M - T - 1) a pair reaching ``threshold`` has"""
+    return 3 * min_matched_chars(threshold, total_length) - total_length - 1
+
+
+def min_shared_bigrams(length: int, threshold: float) -> int:
+    """Lower bound of ``required_shared_bigrams`` over partners passing the length filter"""
+    partner_lengths = range(
+        math.floor(length * threshold / (2 - threshold)),
+        math.ceil(length * (2 - threshold) / threshold) + 1,
+    )
+    return min(
+        (
+            required_shared_bigrams(threshold, length + partner_length)
+            for partner_length in partner_lengths
+            if partner_length > 0
+            and can_reach_threshold(length, partner_length, threshold)
+        ),
+        default=1,
+    )
+
+
+def index_pairs(indices: list[int], changed: set[int] | None):
+    """Pairs ``(i, j)``, ``i < j``, of ``indices`` with at least one in ``changed`` (None: all)"""
+    if changed is None:
+        return combinations(indices, 2)
+    return sorted({
+        (min(i, j), max(i, j))
+        for i in indices
+        if i in changed
+        for j in indices
+        if j != i
+    })
+
+
+def candidate_name_pairs(
+    names: list[str], threshold: float, changed: set[int] | None = None
+) -> list[tuple[int, int]]:
+    """
+    Index pairs ``(i, j)``, ``i < j``, of non-empty ``names`` whose
+    ``SequenceMatcher`` ratio may reach ``threshold``, sorted
+
+    With ``changed`` (a set of indices) only pairs involving at least one
+    of them are generated.
+    """
+    indices = [i for i, name in enumerate(names) if name]
+    if threshold > 1:
+        return []
+
+    lengths = {i: len(names[i]) for i in indices}
+    if threshold <= 2 / 3:
+        # The bigram bound gives no guarantee, only the length filter applies
+        return [
+            (i, j)
+            for i, j in index_pairs(indices, changed)
+            if can_reach_threshold(lengths[i], lengths[j], threshold)
+        ]
+
+    # Pairs with a combined length up to this are not guaranteed to share a
+    # bigram, so they are compared directly (both names are short)
+    max_unbounded_total = math.floor(2 / (3 * threshold - 2) + EPSILON)
+    short = [i for i in indices if lengths[i] < max_unbounded_total]
+    pairs = {
+        (i, j)
+        for i, j in index_pairs(short, changed)
+        if lengths[i] + lengths[j] <= max_unbounded_total
+        and can_reach_threshold(lengths[i], lengths[j], threshold)
+    }
+
+    grams = {i: bigrams(names[i]) for i in indices}
+    # Each bigram occurrence becomes its own token, so multiset overlap is
+    # plain set overlap; tokens are ordered rarest first for prefix filtering
+    tokens = {
+        i: [(gram, k) for gram, count in grams[i].items() for k in range(count)]
+        for i in indices
+    }
+    frequency = Counter(token for i in indices for token in tokens[i])
+    token_sets = {i: frozenset(tokens[i]) for i in indices}
+    # Two token sets sharing at least r tokens share one within the first
+    # len - r + 1 tokens of each (same global order)
+    prefixes = {}
+    for i in indices:
+        tokens[i].sort(key=lambda token: (frequency[token], token))
+        prefix_length = len(tokens[i]) - min_shared_bigrams(lengths[i], threshold) + 1
+        prefixes[i] = tokens[i][: max(0, prefix_length)]
+
+    # (length, partner length) -> shared bigrams needed, None if out of reach
+    required = {}
+
+    def add_if_similar(i, j):
+        length_pair = (lengths[i], lengths[j])
+        if length_pair not in required:
+            required[length_pair] = (
+                required_shared_bigrams(threshold, sum(length_pair))
+                if can_reach_threshold(*length_pair, threshold)
+                else None
+            )
+        if required[length_pair] is None:
+            return
+        if len(token_sets[i] & token_sets[j]) >= required[length_pair]:
+            pairs.add((min(i, j), max(i, j)))
+
+    postings = defaultdict(list)
+    if changed is None:
+        # Probe each name against the names indexed before it
+        for i in indices:
+            seen = set()
+            for token in prefixes[i]:
+                seen.update(postings[token])
+                postings[token].append(i)
+            for j in seen:
+                add_if_similar(i, j)
+        return sorted(pairs)
+
+    # Index every name, then probe with the changed ones only
+    for i in indices:
+        for token in prefixes[i]:
+            postings[token].append(i)
+    for i in indices:
+        if i not in changed:
+            continue
+        seen = set()
+        for token in prefixes[i]:
+            seen.update(postings[token])
+        seen.discard(i)
+        for j in seen:
+            add_if_similar(i, j)
+
+    return sorted(pairs)
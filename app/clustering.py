@@ -0,0 +1,157 @@
+"""
+Score fusion and clustering of duplicate candidates
+
+Every detection method is a signal.  The signals found for a pair are fused
+into one score with a weighted noisy-OR:
+
+    score = 1 - prod(1 - weight[signal] * signal_score)
+
+so a pair backed by several independent signals outranks a pair backed by
+one.  Pairs are then grouped into clusters of businesses with union-find.
+"""
+from dataclasses import dataclass, field
+
+# How much a perfect match on each signal alone is trusted
+DEFAULT_SIGNAL_WEIGHTS = {
+    'name': 0.8,
+    'address': 0.5,
+    'phone': 0.8,
+    'website': 0.9,
+    'geo': 0.7,
+}
+
+# Fused score a pair needs to be clustered by default; no weak signal alone
+# (a shared address, nearby coordinates, a similar name) reaches it
+DEFAULT_CLUSTER_MIN_SCORE = 0.85
+
+# Reason prefixes (as in "phone_match: ...") of each signal
+REASON_SIGNALS = {
+    'name_fuzzy': 'name',
+    'name_levenshtein': 'name',
+    'name_tfidf': 'name',
+    'address_exact': 'address',
+    'address_normalized': 'address',
+    'phone_match': 'phone',
+    'website_match': 'website',
+    'geo_proximity': 'geo',
+}
+
+
+def reason_signal(reason: str) -> str:
+    prefix = reason.split(':')[0]
+    return REASON_SIGNALS.get(prefix, prefix)
+
+
+@dataclass
+class FusedPair:
+    business1: object
+    business2: object
+    score: float = 0.0
+    signals: dict = field(default_factory=dict)
+    reasons: list = field(default_factory=list)
+
+
+@dataclass
+class DuplicateCluster:
+    businesses: list
+    pairs: list
+
+    @property
+    def score(self) -> float:
+        """Score of the most confident pair"""
+        return max(pair.score for pair in self.pairs)
+
+
+class UnionFind:
+    """Disjoint sets with path halving and union by size"""
+
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+
+    def find(self, item):
+        if item not in self.parent:
+            self.parent[item] = item
+            self.size[item] = 1
+            return item
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+
+
+def fuse_signals(candidates, weights: dict | None = None) -> list[FusedPair]:
+    """
+    Merge ``(business1, business2, score, reason)`` candidates into one
+    ``FusedPair`` per pair, best fused score first
+    """
+    weights = {**DEFAULT_SIGNAL_WEIGHTS, **(weights or {})}
+    pairs = {}
+    for business1, business2, score, reason in candidates:
+        if business1.id > business2.id:
+            business1, business2 = business2, business1
+        pair = pairs.setdefault(
+            (business1.id, business2.id), FusedPair(business1, business2)
+        )
+        signal = reason_signal(reason)
+        pair.signals[signal] = max(score, pair.signals.get(signal, 0.0))
+        pair.reasons.append(reason)
+
+    for pair in pairs.values():
+        miss = 1.0
+        for signal, score in pair.signals.items():
+            miss *= 1 - min(1.0, weights.get(signal, 0.5) * score)
+        pair.score = 1 - miss
+
+    return sorted(
+        pairs.values(),
+        key=lambda pair: (-pair.score, pair.business1.id, pair.business2.id),
+    )
+
+
+def build_clusters(pairs: list[FusedPair]) -> list[DuplicateCluster]:
+    """Group fused pairs into connected clusters, most confident first"""
+    union_find = UnionFind()
+    for pair in pairs:
+        union_find.union(pair.business1.id, pair.business2.id)
+
+    clusters = {}
+    for pair in pairs:
+        root = union_find.find(pair.business1.id)
+        cluster = clusters.setdefault(root, DuplicateCluster(businesses=[], pairs=[]))
+        cluster.pairs.append(pair)
+
+    for cluster in clusters.values():
+        businesses = {}
+        for pair in cluster.pairs:
+            businesses[pair.business1.id] = pair.business1
+            businesses[pair.business2.id] = pair.business2
+        cluster.businesses = [businesses[business_id] for business_id in sorted(businesses)]
+
+    return sorted(
+        clusters.values(),
+        key=lambda cluster: (-cluster.score, cluster.businesses[0].id),
+    )
+
+
+def cluster_candidates(candidates, weights: dict | None = None, min_score: float | None = None,
+                       required_signals=()):
+    """
+    Fuse candidate signals, drop pairs under ``min_score`` or missing any of
+    ``required_signals`` and cluster the rest
+    """
+    pairs = fuse_signals(candidates, weights)
+    if min_score is not None:
+        pairs = [pair for pair in pairs if pair.score >= min_score]
+    if required_signals:
+        pairs = [pair for pair in pairs if set(required_signals) <= pair.signals.keys()]
+    return build_clusters(pairs)
@@ -0,0 +1,106 @@
+"""
+Persisted duplicate candidates and incremental duplicate detection
+
+Each stored run records a watermark (the latest ``updated_at`` of a business
+or address it covered).  The next run only compares businesses updated since
+then, or whose address was, against everything else, replaces the stored
+candidates involving them, and keeps the rest.
+"""
+from django.db import transaction
+from django.db.models import Max, Q
+
+from app.models import Address, Business, DuplicateCandidate, DuplicateDetectionRun
+
+
+def latest_run(version: str) -> DuplicateDetectionRun | None:
+    return (
+        DuplicateDetectionRun.objects.filter(detector_version=version)
+        .order_by("-created_at", "-id")
+        .first()
+    )
+
+
+def update_candidates(detector, method: str = "all", full: bool = False) -> DuplicateDetectionRun:
+    """
+    Bring the stored candidates of ``detector``'s version up to date
+
+    Runs a full scan on the first run or when ``full`` is set, otherwise
+    only compares the businesses changed since the last run.
+    """
+    version = detector.version(method)
+    previous = None if full else latest_run(version)
+    # Captured before scanning: rows updated meanwhile are picked up next run.
+    # Addresses count too: coordinate updates don't touch their businesses
+    latest = [
+        Business.objects.aggregate(Max("updated_at"))["updated_at__max"],
+        Address.objects.aggregate(Max("updated_at"))["updated_at__max"],
+    ]
+    watermark = max((value for value in latest if value is not None), default=None)
+
+    changed = None
+    if previous is not None:
+        changed = Business.objects.all()
+        if previous.watermark is not None:
+            changed = changed.filter(
+                Q(updated_at__gt=previous.watermark)
+                | Q(address__updated_at__gt=previous.watermark)
+            )
+        changed_ids = set(changed.values_list("id", flat=True))
+
+    if changed is not None and not changed_ids:
+        candidates = []
+    else:
+        detector.changed_ids = changed_ids if changed is not None else None
+        try:
+            candidates = detector.find_duplicates(method)
+        finally:
+            detector.changed_ids = None
+
+    # One row per pair: keep the best score and every reason
+    pairs = {}
+    for business1, business2, score, reason in candidates:
+        pair = tuple(sorted([business1.id, business2.id]))
+        if pair in pairs:
+            pairs[pair].score = max(pairs[pair].score, score)
+            pairs[pair].reasons.append(reason)
+        else:
+            pairs[pair] = DuplicateCandidate(
+                business_1_id=pair[0],
+                business_2_id=pair[1],
+                score=score,
+                reasons=[reason],
+                detector_version=version,
+            )
+
+    with transaction.atomic():
+        stale = DuplicateCandidate.objects.filter(detector_version=version)
+        if changed is not None:
+            changed_ids = changed.values("id")
+            stale = stale.filter(
+                Q(business_1_id__in=changed_ids) | Q(business_2_id__in=changed_ids)
+            )
+        stale.delete()
+        DuplicateCandidate.objects.bulk_create(pairs.values(), batch_size=500)
+
+        return DuplicateDetectionRun.objects.create(
+            detector_version=version,
+            watermark=watermark or (previous.watermark if previous else None),
+            incremental=changed is not None,
+            businesses_compared=(
+                len(changed_ids) if changed is not None else Business.objects.count()
+            ),
+            candidates_found=len(pairs),
+        )
+
+
+def stored_candidates(version: str) -> list[tuple]:
+    """Stored candidates as ``(business1, business2, score, reason)``, best first"""
+    candidates = (
+        DuplicateCandidate.objects.filter(detector_version=version)
+        .select_related("business_1__address", "business_2__address")
+        .order_by("-score", "business_1_id", "business_2_id")
+    )
+    return [
+        (candidate.business_1, candidate.business_2, candidate.score, "; ".join(candidate.reasons))
+        for candidate in candidates
+    ]
@@ -1,178 +1,300 @@
 """
 Duplicate detection utilities for businesses
 """
-import re
 from difflib import SequenceMatcher
+from itertools import groupby
 from typing import List, Tuple
-from django.db.models import Count
 
-from app.models import Business, Address
+from app import normalization
+from app.blocking import candidate_name_pairs
+from app.clustering import DuplicateCluster, cluster_candidates
+from app.duplicate_reports import write_csv
+from app.geo import nearby_pairs
+from app.models import BusinessContactKey
+from app.parallel import score_name_pairs
+from app.similarity import KERNELS
+from app.snapshot import BusinessSnapshot
+from app.tfidf import similar_name_pairs
+
+# Name similarity engines: a pairwise kernel from app.similarity (difflib's
+# SequenceMatcher ratio or bounded Levenshtein similarity), or cosine
+# similarity of character n-gram TF-IDF vectors (much faster on large tables)
+ENGINES = [*KERNELS, 'tfidf']
+
+METHODS = ['name', 'address', 'phone', 'website', 'geo', 'all']
+
+# Geo duplicates: weight of name similarity vs proximity in the score
+GEO_NAME_WEIGHT = 0.7
+
+# Bump when matching rules change, so stored candidates are recomputed
+DETECTOR_VERSION = '1'
 
 
 class DuplicateDetector:
     """Detect potential duplicate businesses using various algorithms"""
     
-    def __init__(self, threshold=0.8, source_filter=None):
+    def __init__(self, threshold=0.8, source_filter=None, blocking=False, engine='sequence',
+                 jobs=1, changed_ids=None, radius_m=50):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown name similarity engine: {engine}")
         self.threshold = threshold
         self.source_filter = source_filter
+        self.blocking = blocking
+        self.engine = engine
+        self.jobs = jobs
+        self.radius_m = radius_m
+        # When set, only pairs involving at least one of these businesses are returned
+        self.changed_ids = changed_ids
+        # method -> number of business pairs it actually compared, set by
+        # each find_*_duplicates call
+        self.pair_counts = {}
+    
+    def version(self, method='all') -> str:
+        """Identifies the settings stored candidates were computed with"""
+        version = f"{DETECTOR_VERSION}:{method}:{self.engine}:{self.threshold}"
+        if method in ('geo', 'all'):
+            version += f":{self.radius_m}m"
+        return version
+    
+    def find_duplicates(self, method='all') -> List[Tuple]:
+        """Find duplicates with one of ``METHODS``"""
+        if method not in METHODS:
+            raise ValueError(f"Unknown duplicate detection method: {method}")
+        return getattr(self, f'find_{method}_duplicates')()
+    
+    def involves_changed(self, business1_id, business2_id) -> bool:
+        return (
+            self.changed_ids is None
+            or business1_id in self.changed_ids
+            or business2_id in self.changed_ids
+        )
     
     @staticmethod
     def normalize_name(name):
         """Normalize business name for fuzzy matching"""
-        if not name:
-            return ""
-        
-        name = name.lower().strip()
-        # Remove common business suffixes
-        name = re.sub(r'\b(inc|llc|corp|ltd|co|corporation|incorporated|limited|company)\b\.?$', '', name)
-        # Remove punctuation and extra spaces
-        name = re.sub(r'[^\w\s]', '', name)
-        name = re.sub(r'\s+', ' ', name)
-        return name.strip()
+        return normalization.normalize_business_name(name)
     
     @staticmethod
     def clean_phone_number(phone):
         """Clean phone number for comparison"""
-        if not phone:
-            return ""
-        # Remove all non-digit characters
-        cleaned = re.sub(r'\D', '', phone)
-        # If it starts with 1 and is 11 digits, remove the 1
-        if len(cleaned) == 11 and cleaned.startswith('1'):
-            cleaned = cleaned[1:]
-        return cleaned
+        return normalization.normalize_phone_number(phone)
     
     @staticmethod 
     def normalize_url(url):
         """Normalize URL for comparison"""
-        if not url:
-            return ""
-        url = url.lower().strip()
-        # Remove protocol
-        url = re.sub(r'^https?://', '', url)
-        # Remove www
-        url = re.sub(r'^www\.', '', url)
-        # Remove trailing slash
-        url = url.rstrip('/')
-        return url
-    
-    def find_name_duplicates(self) -> List[Tuple]:
+        return normalization.normalize_url(url)
+    
+    def find_name_duplicates(self, snapshot=None) -> List[Tuple]:
         """Find businesses with similar names using fuzzy matching"""
-        businesses = Business.objects.all()
-        candidates = []
-        business_list = list(businesses)
+        snapshot = BusinessSnapshot.load() if snapshot is None else snapshot
+        ids, normalized_names = snapshot.ids, snapshot.normalized_names
         
-        for i, business1 in enumerate(business_list):
-            normalized_name1 = self.normalize_name(business1.name)
-            if not normalized_name1:
-                continue
-                
-            for business2 in business_list[i+1:]:
-                normalized_name2 = self.normalize_name(business2.name)
-                if not normalized_name2:
-                    continue
-                
-                similarity = SequenceMatcher(
-                    None, 
-                    normalized_name1,
-                    normalized_name2
-                ).ratio()
-                
-                if similarity >= self.threshold:
-                    candidates.append((
-                        business1, 
-                        business2, 
-                        similarity, 
-                        f'name_fuzzy: "{normalized_name1}" <-> "{normalized_name2}"'
-                    ))
+        if self.engine == 'tfidf':
+            stats = {}
+            candidates = [
+                (
+                    snapshot.business(i),
+                    snapshot.business(j),
+                    similarity,
+                    f'name_tfidf: "{normalized_names[i]}" <-> "{normalized_names[j]}"'
+                )
+                for i, j, similarity in similar_name_pairs(
+                    normalized_names, self.threshold, stats=stats
+                )
+                if self.involves_changed(ids[i], ids[j])
+            ]
+            self.pair_counts['name'] = stats['compared']
+            return candidates
         
-        return candidates
+        if self.blocking:
+            # Only score pairs that can still reach the threshold (and, in an
+            # incremental run, involve a changed business)
+            changed = None if self.changed_ids is None else {
+                i for i, pk in enumerate(ids) if pk in self.changed_ids
+            }
+            pairs = candidate_name_pairs(normalized_names, self.threshold, changed=changed)
+        elif self.changed_ids is not None:
+            # Compare changed businesses against every other business
+            changed = [
+                i for i, pk in enumerate(ids)
+                if pk in self.changed_ids and normalized_names[i]
+            ]
+            pairs = sorted({
+                (min(i, j), max(i, j))
+                for i in changed
+                for j, normalized_name in enumerate(normalized_names)
+                if j != i and normalized_name
+            })
+        else:
+            pairs = None
+        records = list(zip(ids, normalized_names))
+        reason = KERNELS[self.engine].reason
+        if pairs is None:
+            named = sum(1 for normalized_name in normalized_names if normalized_name)
+            self.pair_counts['name'] = named * (named - 1) // 2
+        else:
+            self.pair_counts['name'] = len(pairs)
+        
+        return [
+            (
+                snapshot.business(i), 
+                snapshot.business(j), 
+                similarity, 
+                f'{reason}: "{normalized_names[i]}" <-> "{normalized_names[j]}"'
+            )
+            for i, j, similarity in score_name_pairs(
+                records, self.threshold, pairs=pairs, jobs=self.jobs, kernel=self.engine
+            )
+        ]
     
-    def find_address_duplicates(self) -> List[Tuple]:
-        """Find businesses at the same address"""
-        # Find addresses with multiple businesses
-        duplicate_addresses = Address.objects.annotate(
-            business_count=Count('business')
-        ).filter(business_count__gt=1)
+    def find_address_duplicates(self, snapshot=None) -> List[Tuple]:
+        """Find businesses at the same or an equivalent address"""
+        snapshot = BusinessSnapshot.load() if snapshot is None else snapshot
+        ids, keys = snapshot.ids, snapshot.address_keys
+        
+        # Rows with an address, grouped by normalized key (in pk order within a key)
+        rows = sorted((row for row, key in enumerate(keys) if key), key=keys.__getitem__)
         
         candidates = []
-        for address in duplicate_addresses:
-            businesses = list(address.business_set.all())
+        compared = 0
+        for _, group in groupby(rows, key=keys.__getitem__):
+            group = list(group)
+            compared += len(group) * (len(group) - 1) // 2
             
-            for i, business1 in enumerate(businesses):
-                for business2 in businesses[i+1:]:
-                    candidates.append((
-                        business1, 
-                        business2, 
-                        1.0, 
-                        f'address_exact: {address.street_1}, {address.city}'
-                    ))
+            for i, row1 in enumerate(group):
+                for row2 in group[i+1:]:
+                    if not self.involves_changed(ids[row1], ids[row2]):
+                        continue
+                    if snapshot.address_ids[row1] == snapshot.address_ids[row2]:
+                        reason = f'address_exact: {snapshot.streets[row1]}, {snapshot.cities[row1]}'
+                    else:
+                        reason = (
+                            f'address_normalized: "{snapshot.streets[row1]}" <-> '
+                            f'"{snapshot.streets[row2]}", {snapshot.cities[row1]}'
+                        )
+                    candidates.append((snapshot.business(row1), snapshot.business(row2), 1.0, reason))
         
+        self.pair_counts['address'] = compared
         return candidates
     
-    def find_phone_duplicates(self) -> List[Tuple]:
-        """Find businesses with matching phone numbers"""
-        candidates = []
-        phone_map = {}
+    def find_contact_duplicates(self, kind, snapshot=None) -> List[Tuple]:
+        """
+        Every pair of businesses sharing a ``BusinessContactKey`` of ``kind``,
+        as ``(business1, business2, shared value)``
         
-        for business in Business.objects.all():
-            if not business.phone_numbers:
-                continue
-                
-            for phone in business.phone_numbers:
-                cleaned_phone = self.clean_phone_number(phone)
-                if not cleaned_phone or len(cleaned_phone) < 10:
-                    continue
-                    
-                if cleaned_phone in phone_map:
-                    existing_business = phone_map[cleaned_phone]
-                    candidates.append((
-                        existing_business, 
-                        business, 
-                        0.9, 
-                        f'phone_match: {cleaned_phone}'
-                    ))
-                else:
-                    phone_map[cleaned_phone] = business
+        Pairs sharing several values are reported once, with the lowest value.
+        """
+        snapshot = BusinessSnapshot.load() if snapshot is None else snapshot
+        ids = snapshot.ids
         
-        return candidates
+        pairs = {}
+        for value, rows in snapshot.shared_contacts(kind):
+            for i, row1 in enumerate(rows):
+                for row2 in rows[i+1:]:
+                    # Values come in order, so the first one seen is the lowest
+                    pairs.setdefault((row1, row2), value)
+        self.pair_counts[kind] = len(pairs)
+        
+        return [
+            (snapshot.business(row1), snapshot.business(row2), value)
+            for (row1, row2), value in sorted(pairs.items())
+            if self.involves_changed(ids[row1], ids[row2])
+        ]
+    
+    def find_phone_duplicates(self, snapshot=None) -> List[Tuple]:
+        """Find businesses with matching phone numbers"""
+        return [
+            (business1, business2, 0.9, f'phone_match: {phone}')
+            for business1, business2, phone in self.find_contact_duplicates(
+                BusinessContactKey.PHONE, snapshot
+            )
+        ]
     
-    def find_website_duplicates(self) -> List[Tuple]:
+    def find_website_duplicates(self, snapshot=None) -> List[Tuple]:
         """Find businesses with matching websites"""
-        candidates = []
-        website_map = {}
+        return [
+            (business1, business2, 0.95, f'website_match: {url}')
+            for business1, business2, url in self.find_contact_duplicates(
+                BusinessContactKey.WEBSITE, snapshot
+            )
+        ]
+    
+    def find_geo_duplicates(self, radius_m=None, snapshot=None) -> List[Tuple]:
+        """
+        Find businesses within ``radius_m`` meters of each other with similar names
         
-        website_businesses = Business.objects.filter(
-            website_url__isnull=False
-        ).exclude(website_url='')
+        Only nearby pairs (found through a spatial grid) are compared; the
+        score weighs name similarity with proximity.
+        """
+        radius_m = radius_m or self.radius_m
+        snapshot = BusinessSnapshot.load() if snapshot is None else snapshot
+        ids, normalized_names = snapshot.ids, snapshot.normalized_names
+        rows = [row for row in range(len(snapshot)) if snapshot.has_point(row)]
+        points = [(snapshot.latitudes[row], snapshot.longitudes[row]) for row in rows]
         
-        for business in website_businesses:
-            normalized_url = self.normalize_url(business.website_url)
-            if not normalized_url:
+        candidates = []
+        stats = {}
+        for i, j, distance in nearby_pairs(points, radius_m, stats=stats):
+            row1, row2 = rows[i], rows[j]
+            if not self.involves_changed(ids[row1], ids[row2]):
                 continue
-                
-            if normalized_url in website_map:
-                existing_business = website_map[normalized_url]
+            
+            name_similarity = 0.0
+            if normalized_names[row1] and normalized_names[row2]:
+                name_similarity = SequenceMatcher(
+                    None,
+                    normalized_names[row1],
+                    normalized_names[row2]
+                ).ratio()
+            proximity = 1 - distance / radius_m
+            score = GEO_NAME_WEIGHT * name_similarity + (1 - GEO_NAME_WEIGHT) * proximity
+            
+            if score >= self.threshold:
                 candidates.append((
-                    existing_business, 
-                    business, 
-                    0.95, 
-                    f'website_match: {normalized_url}'
+                    snapshot.business(row1),
+                    snapshot.business(row2),
+                    score,
+                    f'geo_proximity: {distance:.0f}m apart, name similarity {name_similarity:.2f}'
                 ))
-            else:
-                website_map[normalized_url] = business
         
+        self.pair_counts['geo'] = stats.get('compared', 0)
         return candidates
     
-    def find_all_duplicates(self) -> List[Tuple]:
-        """Find duplicates using all methods"""
+    def collect_candidates(self) -> List[Tuple]:
+        """
+        Candidates of every method, keeping every signal found for a pair
+        
+        Every method reads the same snapshot, loaded once.
+        """
+        snapshot = BusinessSnapshot.load()
         all_candidates = []
+        all_candidates.extend(self.find_name_duplicates(snapshot))
+        all_candidates.extend(self.find_address_duplicates(snapshot))
+        all_candidates.extend(self.find_phone_duplicates(snapshot))
+        all_candidates.extend(self.find_website_duplicates(snapshot))
+        all_candidates.extend(self.find_geo_duplicates(snapshot=snapshot))
+        return all_candidates
+    
+    def find_clusters(self, method='all', weights=None, min_score=None,
+                      required_signals=()) -> List[DuplicateCluster]:
+        """
+        Group candidates into clusters of duplicates, fusing every signal
+        found for a pair into one weighted score
         
-        # Collect candidates from all methods
-        all_candidates.extend(self.find_name_duplicates())
-        all_candidates.extend(self.find_address_duplicates())
-        all_candidates.extend(self.find_phone_duplicates())
-        all_candidates.extend(self.find_website_duplicates())
+        Pairs missing any of ``required_signals`` (e.g. ``'name'``) are left
+        out before clustering.
+        """
+        if method == 'all':
+            candidates = self.collect_candidates()
+        else:
+            candidates = self.find_duplicates(method)
+        return cluster_candidates(
+            candidates, weights=weights, min_score=min_score, required_signals=required_signals
+        )
+    
+    def find_all_duplicates(self) -> List[Tuple]:
+        """Find duplicates using all methods"""
+        all_candidates = self.collect_candidates()
         
         # Remove duplicates (same business pair found by multiple methods)
         seen_pairs = set()
@@ -193,22 +315,5 @@ class DuplicateDetector:
     
     def export_to_csv(self, candidates: List[Tuple], filename: str):
         """Export duplicate candidates to CSV file"""
-        import csv
-        
         with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow([
-                'business1_id', 'business1_name', 'business1_address',
-                'business2_id', 'business2_name', 'business2_address', 
-                'score', 'match_reason'
-            ])
-            
-            for business1, business2, score, reason in candidates:
-                addr1 = f"{business1.address}" if business1.address else ""
-                addr2 = f"{business2.address}" if business2.address else ""
-                
-                writer.writerow([
-                    business1.id, business1.name, addr1,
-                    business2.id, business2.name, addr2,
-                    f"{score:.3f}", reason
-                ])
\ No newline at end of file
+            write_csv(candidates, csvfile)
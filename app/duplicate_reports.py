@@ -0,0 +1,170 @@
+"""
+Streaming output of duplicate candidates
+
+Candidates are hydrated in chunks (address and categories loaded with
+``select_related`` / ``prefetch_related``) and written chunk by chunk, so a
+report costs a constant number of queries per chunk and only one chunk of
+fully loaded businesses is held at a time.
+"""
+import csv
+import json
+from typing import Iterable, Iterator, Tuple
+
+from app.models import Business
+
+REPORT_CHUNK_SIZE = 500
+
+CSV_HEADER = [
+    'business1_id', 'business1_name', 'business1_address',
+    'business2_id', 'business2_name', 'business2_address',
+    'score', 'match_reason'
+]
+
+
+def hydrate_candidates(candidates: Iterable[Tuple], chunk_size: int = REPORT_CHUNK_SIZE) -> Iterator[Tuple]:
+    """
+    Yield ``(business1, business2, score, reason)`` with both businesses'
+    address and categories prefetched, loading ``chunk_size`` pairs at a time
+    """
+    chunk = []
+    for candidate in candidates:
+        chunk.append(candidate)
+        if len(chunk) >= chunk_size:
+            yield from _hydrate_chunk(chunk)
+            chunk = []
+    yield from _hydrate_chunk(chunk)
+
+
+def _hydrate_chunk(chunk: list) -> list:
+    if not chunk:
+        return []
+    businesses = Business.objects.select_related('address').prefetch_related(
+        'categories'
+    ).in_bulk({business.id for business1, business2, _, _ in chunk for business in (business1, business2)})
+    return [
+        (businesses[business1.id], businesses[business2.id], score, reason)
+        for business1, business2, score, reason in chunk
+    ]
+
+
+def business_record(business) -> dict:
+    address = business.address
+    return {
+        'id': business.id,
+        'name': business.name,
+        'address': f"{address.street_1}, {address.city}" if address else None,
+        'categories': [category.name for category in business.categories.all()],
+        'phone_numbers': business.phone_numbers,
+        'website_url': business.website_url,
+    }
+
+
+def write_csv(candidates: Iterable[Tuple], file) -> int:
+    """Write candidates as CSV rows, returning how many were written"""
+    writer = csv.writer(file)
+    writer.writerow(CSV_HEADER)
+    count = 0
+    for business1, business2, score, reason in hydrate_candidates(candidates):
+        addr1 = f"{business1.address}" if business1.address else ""
+        addr2 = f"{business2.address}" if business2.address else ""
+        writer.writerow([
+            business1.id, business1.name, addr1,
+            business2.id, business2.name, addr2,
+            f"{score:.3f}", reason
+        ])
+        count += 1
+    return count
+
+
+def write_ndjson(candidates: Iterable[Tuple], file) -> int:
+    """Write one JSON object per candidate line, returning how many were written"""
+    count = 0
+    for business1, business2, score, reason in hydrate_candidates(candidates):
+        file.write(json.dumps({
+            'business1': business_record(business1),
+            'business2': business_record(business2),
+            'score': round(score, 3),
+            'reason': reason,
+        }) + '\n')
+        count += 1
+    return count
+
+
+WRITERS = {
+    'csv': write_csv,
+    'ndjson': write_ndjson,
+}
+
+
+CLUSTER_CSV_HEADER = [
+    'cluster', 'cluster_score', 'business_id', 'business_name', 'business_address',
+]
+
+
+def hydrate_clusters(clusters, chunk_size: int = REPORT_CHUNK_SIZE):
+    """Yield clusters with their businesses' address and categories prefetched, in chunks"""
+    chunk = []
+    chunk_businesses = 0
+    for cluster in clusters:
+        chunk.append(cluster)
+        chunk_businesses += len(cluster.businesses)
+        if chunk_businesses >= chunk_size:
+            yield from _hydrate_cluster_chunk(chunk)
+            chunk = []
+            chunk_businesses = 0
+    yield from _hydrate_cluster_chunk(chunk)
+
+
+def _hydrate_cluster_chunk(chunk: list) -> list:
+    if not chunk:
+        return []
+    businesses = Business.objects.select_related('address').prefetch_related(
+        'categories'
+    ).in_bulk({business.id for cluster in chunk for business in cluster.businesses})
+    for cluster in chunk:
+        cluster.businesses = [businesses[business.id] for business in cluster.businesses]
+    return chunk
+
+
+def cluster_record(cluster) -> dict:
+    return {
+        'score': round(cluster.score, 3),
+        'businesses': [business_record(business) for business in cluster.businesses],
+        'pairs': [
+            {
+                'business1_id': pair.business1.id,
+                'business2_id': pair.business2.id,
+                'score': round(pair.score, 3),
+                'signals': {signal: round(score, 3) for signal, score in pair.signals.items()},
+                'reasons': pair.reasons,
+            }
+            for pair in cluster.pairs
+        ],
+    }
+
+
+def write_cluster_csv(clusters, file) -> int:
+    """Write one row per business of each cluster, returning the number of clusters"""
+    writer = csv.writer(file)
+    writer.writerow(CLUSTER_CSV_HEADER)
+    count = 0
+    for count, cluster in enumerate(hydrate_clusters(clusters), 1):
+        for business in cluster.businesses:
+            address = f"{business.address}" if business.address else ""
+            writer.writerow([count, f"{cluster.score:.3f}", business.id, business.name, address])
+    return count
+
+
+def write_cluster_ndjson(clusters, file) -> int:
+    """Write one JSON object per cluster line, returning how many were written"""
+    count = 0
+    for cluster in hydrate_clusters(clusters):
+        file.write(json.dumps(cluster_record(cluster)) + '\n')
+        count += 1
+    return count
+
+
+CLUSTER_WRITERS = {
+    'csv': write_cluster_csv,
+    'ndjson': write_cluster_ndjson,
+}
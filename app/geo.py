@@ -0,0 +1,74 @@
+"""
+Spatial grid index for finding nearby coordinates
+
+Points are bucketed into a uniform latitude/longitude grid whose cells are
+at least ``radius_m`` wide, so any two points within the radius sit in the
+same or adjacent cells.  Distances are only computed within those 3x3
+neighbourhoods, never for all pairs.
+"""
+import math
+from collections import defaultdict
+
+EARTH_RADIUS_M = 6_371_008.8
+METERS_PER_DEGREE_LATITUDE = math.pi * EARTH_RADIUS_M / 180
+
+
+def haversine_m(latitude_1: float, longitude_1: float, latitude_2: float, longitude_2: float) -> float:
+    """Great-circle distance in meters"""
+    phi_1, phi_2 = math.radians(latitude_1), math.radians(latitude_2)
+    delta_phi = phi_2 - phi_1
+    delta_lambda = math.radians(longitude_2 - longitude_1)
+    a = (
+        math.sin(delta_phi / 2) ** 2
+        + math.cos(phi_1) * math.cos(phi_2) * math.sin(delta_lambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def nearby_pairs(
+    points: list[tuple[float, float]], radius_m: float, stats: dict | None = None
+) -> list[tuple[int, int, float]]:
+    """
+    ``(i, j, distance_m)`` for every pair ``i < j`` of ``(latitude, longitude)``
+    ``points`` at most ``radius_m`` apart, sorted by ``(i, j)``
+
+    ``stats["compared"]`` is set to the number of distances computed.
+    """
+    if not points or radius_m <= 0:
+        return []
+
+    # A degree of longitude shrinks away from the equator; size cells for
+    # the highest latitude so they are wide enough everywhere
+    max_latitude = min(89.0, max(abs(latitude) for latitude, _ in points))
+    latitude_step = radius_m / METERS_PER_DEGREE_LATITUDE
+    longitude_step = radius_m / (
+        METERS_PER_DEGREE_LATITUDE * math.cos(math.radians(max_latitude))
+    )
+
+    grid = defaultdict(list)
+    for i, (latitude, longitude) in enumerate(points):
+        cell = (math.floor(latitude / latitude_step), math.floor(longitude / longitude_step))
+        grid[cell].append(i)
+
+    pairs = []
+    compared = 0
+    for (row, column), members in grid.items():
+        neighbours = [
+            j
+            for d_row in (-1, 0, 1)
+            for d_column in (-1, 0, 1)
+            for j in grid.get((row + d_row, column + d_column), ())
+        ]
+        for i in members:
+            for j in neighbours:
+                if j <= i:
+                    continue
+                compared += 1
+                distance = haversine_m(*points[i], *points[j])
+                if distance <= radius_m:
+                    pairs.append((i, j, distance))
+
+    if stats is not None:
+        stats["compared"] = compared
+    pairs.sort()
+    return pairs
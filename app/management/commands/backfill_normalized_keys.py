@@ -0,0 +1,100 @@
+"""
+Management command to recompute the normalized match keys of every Business
+and Address
+"""
+from django.core.management.base import BaseCommand
+from app.models import Address, Business, BusinessContactKey
+from app.normalization import normalize_address_key
+
+
+class Command(BaseCommand):
+    help = "Recompute normalized business and address keys and contact keys (e.g. after normalization rules change)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rows written per UPDATE batch (default: 500)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count stale rows without writing them',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        business_count = self.backfill_businesses(batch_size, dry_run)
+        address_count = self.backfill_addresses(batch_size, dry_run)
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING(
+                f'DRY RUN: {business_count} Business rows and {address_count} Address rows '
+                f'have stale normalized keys.'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Updated normalized keys for {business_count} Business rows and '
+                f'{address_count} Address rows, and synced the contact keys of every business.'
+            ))
+
+    def backfill_businesses(self, batch_size, dry_run) -> int:
+        """
+        Recompute the normalized keys of every business
+
+        Contact keys are synced for every business, not only the ones whose
+        keys changed: rows loaded from fixtures or written with bulk_create
+        may have up-to-date keys but no contact key rows.
+        """
+        batch = []
+        updated_count = 0
+
+        for business in Business.objects.only(
+            'name', 'website_url', 'phone_numbers',
+            'normalized_name', 'normalized_website', 'normalized_phone_numbers',
+        ).iterator(chunk_size=batch_size):
+            batch.append((business, business.populate_normalized_keys()))
+            if len(batch) >= batch_size:
+                updated_count += self.write_businesses(batch, dry_run)
+                batch = []
+
+        updated_count += self.write_businesses(batch, dry_run)
+        return updated_count
+
+    def write_businesses(self, batch, dry_run) -> int:
+        stale = [business for business, changed in batch if changed]
+        fields = {field for _, changed in batch for field in changed}
+        if batch and not dry_run:
+            if stale:
+                Business.objects.bulk_update(stale, sorted(fields))
+            BusinessContactKey.sync([business for business, _ in batch])
+        return len(stale)
+
+    def backfill_addresses(self, batch_size, dry_run) -> int:
+        stale = []
+        updated_count = 0
+
+        for address in Address.objects.only(
+            'street_1', 'city', 'state', 'zip', 'normalized_key',
+        ).iterator(chunk_size=batch_size):
+            normalized_key = normalize_address_key(
+                address.street_1, address.city, address.state, address.zip
+            )
+            if normalized_key == address.normalized_key:
+                continue
+            address.normalized_key = normalized_key
+            stale.append(address)
+
+            if len(stale) >= batch_size:
+                updated_count += self.write_addresses(stale, dry_run)
+                stale = []
+
+        updated_count += self.write_addresses(stale, dry_run)
+        return updated_count
+
+    def write_addresses(self, addresses, dry_run) -> int:
+        if addresses and not dry_run:
+            Address.objects.bulk_update(addresses, ['normalized_key'])
+        return len(addresses)
@@ -0,0 +1,191 @@
+"""
+Management command to benchmark DuplicateDetector methods at growing scales
+"""
+import json
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from app.duplicate_detection import DuplicateDetector
+from scraper.benchmark import (
+    current_commit,
+    generate_duplicate_corpus,
+    load_duplicate_corpus,
+    peak_rss_bytes,
+    temporary_database,
+)
+
+# (method, name engine, blocking) combinations to time
+CONFIGURATIONS = [
+    ("name", "sequence", False),
+    ("name", "sequence", True),
+    ("name", "levenshtein", True),
+    ("name", "tfidf", False),
+    ("address", None, False),
+    ("phone", None, False),
+    ("website", None, False),
+    ("geo", None, False),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time every duplicate detection method and name engine on synthetic "
+        "corpora with planted duplicates, scoring them against the ground truth"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scales",
+            nargs="+",
+            type=int,
+            default=[1000, 10000],
+            help="Numbers of businesses to generate (default: 1000 10000)",
+        )
+        parser.add_argument(
+            "--methods",
+            nargs="+",
+            choices=sorted({method for method, _, _ in CONFIGURATIONS}),
+            help="Methods to benchmark (default: all)",
+        )
+        parser.add_argument(
+            "--duplicate-rate",
+            type=float,
+            default=0.2,
+            help="Share of records that are perturbed copies of another (default: 0.2)",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.8,
+            help="Detector similarity threshold (default: 0.8)",
+        )
+        parser.add_argument(
+            "--max-pairs",
+            type=int,
+            default=50_000_000,
+            help=(
+                "Skip configurations that compare every pair when there are "
+                "more pairs than this (default: 50000000)"
+            ),
+        )
+        parser.add_argument(
+            "--memory",
+            action="store_true",
+            help="Trace each run's peak Python memory (slows the runs down)",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed for the generated corpus",
+        )
+        parser.add_argument(
+            "--output",
+            help="Also write the JSON results to this file",
+        )
+
+    def handle(self, *args, **options):
+        configurations = [
+            configuration
+            for configuration in CONFIGURATIONS
+            if not options["methods"] or configuration[0] in options["methods"]
+        ]
+        results = []
+        # Smallest runs first, so the process-wide peak RSS reported after
+        # each run is attributable to the largest run so far
+        for scale in sorted(options["scales"]):
+            corpus = generate_duplicate_corpus(
+                scale, seed=options["seed"], duplicate_rate=options["duplicate_rate"]
+            )
+            with temporary_database():
+                started_at = time.perf_counter()
+                business_ids = load_duplicate_corpus(corpus)
+                self.stderr.write(
+                    f"{scale} businesses, {len(corpus.truth)} planted duplicate pairs, "
+                    f"loaded in {time.perf_counter() - started_at:.1f}s"
+                )
+                truth = {
+                    (business_ids[i], business_ids[j]) for i, j in corpus.truth
+                }
+                for method, engine, blocking in configurations:
+                    result = self.run_benchmark(
+                        method, engine, blocking, scale, truth, options
+                    )
+                    results.append(result)
+                    self.stderr.write(self.describe(result))
+
+        report = {
+            "commit": current_commit(),
+            "threshold": options["threshold"],
+            "duplicate_rate": options["duplicate_rate"],
+            "results": results,
+        }
+        output = json.dumps(report, indent=2)
+        if options.get("output"):
+            with open(options["output"], "w", encoding="utf-8") as f:
+                f.write(output)
+        self.stdout.write(output)
+
+    def run_benchmark(self, method, engine, blocking, scale, truth, options) -> dict:
+        result = {
+            "scale": scale,
+            "method": method,
+            "engine": engine,
+            "blocking": blocking,
+        }
+        detector = DuplicateDetector(
+            threshold=options["threshold"],
+            engine=engine or "sequence",
+            blocking=blocking,
+        )
+        if method == "name" and engine != "tfidf" and not blocking:
+            all_pairs = scale * (scale - 1) // 2
+            if all_pairs > options["max_pairs"]:
+                result["skipped"] = f"{all_pairs} pairs exceed --max-pairs"
+                return result
+
+        if options["memory"]:
+            tracemalloc.start()
+        started_at = time.perf_counter()
+        candidates = detector.find_duplicates(method)
+        seconds = time.perf_counter() - started_at
+        if options["memory"]:
+            result["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        found = {
+            (min(b1.id, b2.id), max(b1.id, b2.id)) for b1, b2, _, _ in candidates
+        }
+        true_positives = len(found & truth)
+        # Pruning is measured against comparing every pair of businesses
+        all_pairs = scale * (scale - 1) // 2
+        compared = detector.pair_counts[method]
+        result.update(
+            {
+                "seconds": round(seconds, 3),
+                "candidates": len(found),
+                "pairs_possible": all_pairs,
+                "pairs_compared": compared,
+                "pairs_pruned": all_pairs - compared,
+                "precision": round(true_positives / len(found), 4) if found else None,
+                "recall": round(true_positives / len(truth), 4) if truth else None,
+                "peak_rss_bytes": peak_rss_bytes(),
+            }
+        )
+        return result
+
+    @staticmethod
+    def describe(result: dict) -> str:
+        label = result["method"]
+        if result["engine"]:
+            label += f"/{result['engine']}" + ("+blocking" if result["blocking"] else "")
+        if "skipped" in result:
+            return f"  {label:<28} skipped: {result['skipped']}"
+        return (
+            f"  {label:<28} {result['seconds']:>9.3f}s "
+            f"compared {result['pairs_compared']:>12} "
+            f"pruned {result['pairs_pruned']:>14} "
+            f"precision {result['precision']} recall {result['recall']}"
+        )
@@ -0,0 +1,94 @@
+"""
+Management command to compare name similarity kernels against SequenceMatcher
+"""
+import json
+import time
+from difflib import SequenceMatcher
+from itertools import combinations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.models import Business
+from app.similarity import KERNELS
+
+
+class Command(BaseCommand):
+    help = "Time each name similarity kernel against plain SequenceMatcher scoring"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=1000,
+            help="Number of business names to score pairwise (default: 1000)",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.8,
+            help="Similarity threshold (default: 0.8)",
+        )
+        parser.add_argument(
+            "--json",
+            action="store_true",
+            help="Print results as JSON",
+        )
+
+    def handle(self, *args, **options):
+        names = list(
+            Business.objects.exclude(normalized_name="")
+            .order_by("pk")
+            .values_list("normalized_name", flat=True)[: options["limit"]]
+        )
+        if len(names) < 2:
+            raise CommandError("Need at least two named businesses to benchmark")
+        threshold = options["threshold"]
+        pairs = list(combinations(range(len(names)), 2))
+
+        started_at = time.perf_counter()
+        baseline = []
+        for i, j in pairs:
+            similarity = SequenceMatcher(None, names[i], names[j]).ratio()
+            if similarity >= threshold:
+                baseline.append((i, j, similarity))
+        baseline_seconds = time.perf_counter() - started_at
+
+        results = [
+            {
+                "kernel": "difflib",
+                "pairs": len(pairs),
+                "matches": len(baseline),
+                "seconds": round(baseline_seconds, 3),
+                "speedup": 1.0,
+            }
+        ]
+        for name, kernel in KERNELS.items():
+            started_at = time.perf_counter()
+            scored = kernel.score_pairs(names, pairs, threshold)
+            seconds = time.perf_counter() - started_at
+            result = {
+                "kernel": name,
+                "pairs": len(pairs),
+                "matches": len(scored),
+                "seconds": round(seconds, 3),
+                "speedup": round(baseline_seconds / seconds, 1) if seconds else None,
+            }
+            if name == "sequence":
+                result["identical_to_difflib"] = scored == baseline
+            results.append(result)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(
+            f"{len(names)} names, {len(pairs)} pairs, threshold {threshold}"
+        )
+        self.stdout.write(
+            f"{'kernel':<12} {'matches':>8} {'seconds':>9} {'speedup':>8}"
+        )
+        for result in results:
+            self.stdout.write(
+                f"{result['kernel']:<12} {result['matches']:>8} "
+                f"{result['seconds']:>9.3f} {result['speedup']:>7}x"
+            )
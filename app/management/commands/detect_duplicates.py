@@ -1,8 +1,12 @@
 """
 Management command to detect potential duplicate businesses
 """
-from django.core.management.base import BaseCommand
-from app.duplicate_detection import DuplicateDetector
+from django.core.management.base import BaseCommand, CommandError
+from app.clustering import DEFAULT_CLUSTER_MIN_SCORE, DEFAULT_SIGNAL_WEIGHTS
+from app.duplicate_candidates import latest_run, stored_candidates, update_candidates
+from app.duplicate_detection import ENGINES, METHODS, DuplicateDetector
+from app.duplicate_reports import CLUSTER_WRITERS, WRITERS, hydrate_candidates, hydrate_clusters
+from app.sqlite import use_sqlite_profile
 
 
 class Command(BaseCommand):
@@ -18,12 +22,18 @@ class Command(BaseCommand):
         parser.add_argument(
             '--method', 
             default='all',
-            choices=['name', 'address', 'phone', 'website', 'all'],
+            choices=METHODS,
             help='Detection method to use (default: all)'
         )
         parser.add_argument(
             '--output', 
-            help='Output CSV file for results'
+            help='Output file for results (CSV unless --format is given)'
+        )
+        parser.add_argument(
+            '--format',
+            choices=['console', *WRITERS],
+            default='console',
+            help='Report format; csv and ndjson go to --output or stdout (default: console)'
         )
         parser.add_argument(
             '--limit',
@@ -33,27 +43,100 @@ class Command(BaseCommand):
         parser.add_argument(
             '--min-score',
             type=float,
-            help='Minimum score to display results'
+            help='Minimum score to display results; with --clusters, the minimum fused '
+                 f'score of a clustered pair (default there: {DEFAULT_CLUSTER_MIN_SCORE})'
+        )
+        parser.add_argument(
+            '--blocking',
+            action='store_true',
+            help='Only score name pairs that can reach the threshold (same results, faster)'
+        )
+        parser.add_argument(
+            '--engine',
+            default='sequence',
+            choices=ENGINES,
+            help='Name similarity engine: SequenceMatcher, bounded Levenshtein or character n-gram TF-IDF (default: sequence)'
+        )
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            default=1,
+            help='Worker processes for pairwise name scoring (default: 1)'
+        )
+        parser.add_argument(
+            '--radius',
+            type=float,
+            default=50,
+            help='Distance in meters within which the geo method compares businesses (default: 50)'
+        )
+        parser.add_argument(
+            '--clusters',
+            action='store_true',
+            help='Group candidates into duplicate clusters with a fused multi-signal score'
+        )
+        parser.add_argument(
+            '--weights',
+            help='Signal weights for --clusters, e.g. name=0.8,phone=0.9 '
+                 f'(signals: {", ".join(DEFAULT_SIGNAL_WEIGHTS)})'
+        )
+        parser.add_argument(
+            '--require-signals',
+            nargs='*',
+            default=[],
+            choices=sorted(DEFAULT_SIGNAL_WEIGHTS),
+            help='With --clusters, only cluster pairs found by all of these signals, e.g. name'
+        )
+        parser.add_argument(
+            '--store',
+            action='store_true',
+            help='Store results, only comparing businesses changed since the last stored run'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='With --store, rescan every business instead of the changes'
+        )
+        parser.add_argument(
+            '--cached',
+            action='store_true',
+            help='Show the stored results of the last --store run without recomputing'
         )
     
     def handle(self, *args, **options):
-        self.stdout.write(f"Starting duplicate detection with threshold {options['threshold']}")
-        self.stdout.write(f"Using method: {options['method']}")
-        self.stdout.write("")
-        
-        detector = DuplicateDetector(threshold=options['threshold'])
-        
-        # Choose detection method
-        if options['method'] == 'all':
-            candidates = detector.find_all_duplicates()
-        elif options['method'] == 'name':
-            candidates = detector.find_name_duplicates()
-        elif options['method'] == 'address':
-            candidates = detector.find_address_duplicates()
-        elif options['method'] == 'phone':
-            candidates = detector.find_phone_duplicates()
-        elif options['method'] == 'website':
-            candidates = detector.find_website_duplicates()
+        with use_sqlite_profile("read"):
+            self.detect(options)
+    
+    def detect(self, options):
+        report_format = options['format']
+        if report_format == 'console' and options.get('output'):
+            # Console report plus a CSV export, as before --format existed
+            export_format = 'csv'
+        else:
+            export_format = None if report_format == 'console' else report_format
+        # Keep stdout machine-readable when streaming a report to it
+        self.log = self.stderr if export_format and not options.get('output') else self.stdout
+        
+        self.log.write(f"Starting duplicate detection with threshold {options['threshold']}")
+        self.log.write(f"Using method: {options['method']}")
+        self.log.write(f"Using name engine: {options['engine']}")
+        self.log.write("")
+        
+        detector = DuplicateDetector(
+            threshold=options['threshold'],
+            blocking=options['blocking'],
+            engine=options['engine'],
+            jobs=options['jobs'],
+            radius_m=options['radius'],
+        )
+        
+        if options['clusters']:
+            self.handle_clusters(detector, options, export_format)
+            return
+        
+        if options['store'] or options['cached']:
+            candidates = self.get_stored_candidates(detector, options)
+        else:
+            candidates = detector.find_duplicates(options['method'])
         
         # Filter by minimum score if specified
         if options.get('min_score'):
@@ -64,13 +147,22 @@ class Command(BaseCommand):
             candidates = candidates[:options['limit']]
         
         if not candidates:
-            self.stdout.write(self.style.SUCCESS("No duplicate candidates found!"))
+            self.log.write(self.style.SUCCESS("No duplicate candidates found!"))
             return
         
+        if report_format == 'console':
+            self.write_console_report(candidates)
+        
+        if export_format:
+            self.export(candidates, export_format, options.get('output'))
+        
+        self.write_summary(candidates)
+    
+    def write_console_report(self, candidates):
         self.stdout.write(f"Found {len(candidates)} potential duplicate pairs:")
         self.stdout.write("=" * 80)
         
-        for i, (business1, business2, score, reason) in enumerate(candidates, 1):
+        for i, (business1, business2, score, reason) in enumerate(hydrate_candidates(candidates), 1):
             self.stdout.write(f"{i}. {business1.name} <-> {business2.name}")
             self.stdout.write(f"   Score: {score:.3f}")
             self.stdout.write(f"   Reason: {reason}")
@@ -105,15 +197,19 @@ class Command(BaseCommand):
                 self.stdout.write(f"   Website 2: {business2.website_url}")
             
             self.stdout.write("")
-        
-        # Export to CSV if requested
-        if options.get('output'):
-            detector.export_to_csv(candidates, options['output'])
-            self.stdout.write(f"Results exported to {options['output']}")
-        
-        # Summary statistics
-        self.stdout.write("=" * 80)
-        self.stdout.write("SUMMARY:")
+    
+    def export(self, candidates, export_format, output):
+        write = WRITERS[export_format]
+        if output:
+            with open(output, 'w', newline='', encoding='utf-8') as file:
+                write(candidates, file)
+            self.log.write(f"Results exported to {output}")
+        else:
+            write(candidates, self.stdout)
+    
+    def write_summary(self, candidates):
+        self.log.write("=" * 80)
+        self.log.write("SUMMARY:")
         
         method_counts = {}
         score_ranges = {'high': 0, 'medium': 0, 'low': 0}
@@ -129,21 +225,108 @@ class Command(BaseCommand):
             else:
                 score_ranges['low'] += 1
         
-        self.stdout.write(f"Total candidates: {len(candidates)}")
-        self.stdout.write(f"High confidence (≥0.9): {score_ranges['high']}")
-        self.stdout.write(f"Medium confidence (0.7-0.9): {score_ranges['medium']}")
-        self.stdout.write(f"Low confidence (<0.7): {score_ranges['low']}")
-        self.stdout.write("")
+        self.log.write(f"Total candidates: {len(candidates)}")
+        self.log.write(f"High confidence (≥0.9): {score_ranges['high']}")
+        self.log.write(f"Medium confidence (0.7-0.9): {score_ranges['medium']}")
+        self.log.write(f"Low confidence (<0.7): {score_ranges['low']}")
+        self.log.write("")
         
-        self.stdout.write("Detection methods:")
+        self.log.write("Detection methods:")
         for method, count in method_counts.items():
-            self.stdout.write(f"  {method}: {count}")
+            self.log.write(f"  {method}: {count}")
         
-        if candidates:
-            self.stdout.write("")
-            self.stdout.write(self.style.WARNING(
-                "These are potential duplicates that should be manually reviewed."
+        self.log.write("")
+        self.log.write(self.style.WARNING(
+            "These are potential duplicates that should be manually reviewed."
+        ))
+        self.log.write(self.style.WARNING(
+            "Use the IDs above to examine specific businesses more closely."
+        ))
+    
+    def get_stored_candidates(self, detector, options):
+        version = detector.version(options['method'])
+        
+        if options['store']:
+            run = update_candidates(detector, options['method'], full=options['full'])
+            kind = 'Incremental' if run.incremental else 'Full'
+            self.log.write(
+                f"{kind} run compared {run.businesses_compared} businesses "
+                f"and found {run.candidates_found} candidate pairs"
+            )
+        elif latest_run(version) is None:
+            self.log.write(self.style.WARNING(
+                "No stored results for these settings yet, run with --store first."
             ))
-            self.stdout.write(self.style.WARNING(
-                "Use the IDs above to examine specific businesses more closely."
-            ))
\ No newline at end of file
+        
+        return stored_candidates(version)
+    
+    def handle_clusters(self, detector, options, export_format):
+        if options['store'] or options['cached']:
+            raise CommandError("--clusters can't be combined with --store or --cached")
+        
+        min_score = options.get('min_score')
+        clusters = detector.find_clusters(
+            options['method'],
+            weights=self.parse_weights(options.get('weights')),
+            min_score=DEFAULT_CLUSTER_MIN_SCORE if min_score is None else min_score,
+            required_signals=options['require_signals'],
+        )
+        if options.get('limit'):
+            clusters = clusters[:options['limit']]
+        
+        if not clusters:
+            self.log.write(self.style.SUCCESS("No duplicate clusters found!"))
+            return
+        
+        if options['format'] == 'console':
+            self.write_console_clusters(clusters)
+        
+        if export_format:
+            write = CLUSTER_WRITERS[export_format]
+            if options.get('output'):
+                with open(options['output'], 'w', newline='', encoding='utf-8') as file:
+                    write(clusters, file)
+                self.log.write(f"Results exported to {options['output']}")
+            else:
+                write(clusters, self.stdout)
+        
+        self.log.write("=" * 80)
+        self.log.write("SUMMARY:")
+        self.log.write(f"Total clusters: {len(clusters)}")
+        self.log.write(f"Businesses in clusters: {sum(len(c.businesses) for c in clusters)}")
+        self.log.write(f"Largest cluster: {max(len(c.businesses) for c in clusters)} businesses")
+    
+    def write_console_clusters(self, clusters):
+        self.stdout.write(f"Found {len(clusters)} potential duplicate clusters:")
+        self.stdout.write("=" * 80)
+        
+        for i, cluster in enumerate(hydrate_clusters(clusters), 1):
+            self.stdout.write(
+                f"{i}. Cluster of {len(cluster.businesses)} businesses, score {cluster.score:.3f}"
+            )
+            for business in cluster.businesses:
+                address = ""
+                if business.address:
+                    address = f" ({business.address.street_1}, {business.address.city})"
+                self.stdout.write(f"   [{business.id}] {business.name}{address}")
+            for pair in cluster.pairs:
+                signals = ', '.join(f"{signal} {score:.2f}" for signal, score in pair.signals.items())
+                self.stdout.write(
+                    f"   {pair.business1.id} <-> {pair.business2.id}: {pair.score:.3f} ({signals})"
+                )
+            self.stdout.write("")
+    
+    def parse_weights(self, value):
+        if not value:
+            return None
+        weights = {}
+        for item in value.split(','):
+            signal, _, weight = item.partition('=')
+            signal = signal.strip()
+            if signal not in DEFAULT_SIGNAL_WEIGHTS:
+                raise CommandError(f"Unknown signal in --weights: {signal}")
+            try:
+                weights[signal] = float(weight)
+            except ValueError:
+                raise CommandError(f"Invalid weight for {signal}: {weight}")
+        return weights
@@ -0,0 +1,111 @@
+"""
+Management command to merge clusters of duplicate businesses
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from app.clustering import DEFAULT_SIGNAL_WEIGHTS
+from app.duplicate_detection import METHODS, DuplicateDetector
+from app.merging import apply_merge, plan_merges, read_clusters_csv
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge each cluster of duplicate businesses into its lowest-id business "
+        "(only shows the merges unless --apply is given)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--input',
+            help='Pair CSV written by detect_duplicates without --clusters (default: detect clusters now)',
+        )
+        parser.add_argument(
+            '--method',
+            default='all',
+            choices=METHODS,
+            help='Detection method when no --input is given (default: all)',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.8,
+            help='Similarity threshold when no --input is given (default: 0.8)',
+        )
+        parser.add_argument(
+            '--min-score',
+            type=float,
+            default=0.9,
+            help=(
+                'Minimum pair score: fused when detecting, the best score of a pair '
+                'in a pair CSV (default: 0.9)'
+            ),
+        )
+        parser.add_argument(
+            '--require-signals',
+            nargs='*',
+            default=['name'],
+            choices=sorted(DEFAULT_SIGNAL_WEIGHTS),
+            help='Only merge pairs found by all of these signals (default: name)',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Merge at most this many clusters',
+        )
+        mode = parser.add_mutually_exclusive_group()
+        mode.add_argument(
+            '--apply',
+            action='store_true',
+            help='Write the merges',
+        )
+        mode.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what each merge would change without writing it (the default)',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = not options['apply']
+        if options['input']:
+            try:
+                with open(options['input'], newline='', encoding='utf-8') as file:
+                    clusters = read_clusters_csv(
+                        file,
+                        min_score=options['min_score'],
+                        required_signals=options['require_signals'],
+                    )
+            except (OSError, KeyError, ValueError) as error:
+                raise CommandError(f"Could not read clusters from {options['input']}: {error}")
+        else:
+            detector = DuplicateDetector(threshold=options['threshold'])
+            clusters = [
+                [business.id for business in cluster.businesses]
+                for cluster in detector.find_clusters(
+                    options['method'],
+                    min_score=options['min_score'],
+                    required_signals=options['require_signals'],
+                )
+            ]
+        if options['limit']:
+            clusters = clusters[:options['limit']]
+
+        started_at = time.perf_counter()
+        plans = plan_merges(clusters)
+        for plan in plans:
+            for line in plan.describe():
+                self.stdout.write(line)
+            if not dry_run:
+                apply_merge(plan)
+        seconds = time.perf_counter() - started_at
+
+        removed = sum(len(plan.merged) for plan in plans)
+        if dry_run:
+            self.stdout.write(self.style.WARNING(
+                f'DRY RUN: {len(plans)} clusters would be merged, removing {removed} businesses. '
+                f'Run with --apply to merge them.'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Merged {len(plans)} clusters, removing {removed} businesses in {seconds:.2f}s.'
+            ))
@@ -0,0 +1,239 @@
+"""
+Merging clusters of duplicate businesses
+
+Each cluster is merged into its lowest-pk business (the one exact matching
+already prefers) in one transaction:
+
+* empty fields of the survivor are filled from the other businesses,
+  ``phone_numbers`` and ``contacts`` are unioned and ``extra`` is merged
+  (the survivor's keys win);
+* social media links, categories and scrape fingerprints are moved to the
+  survivor with set-based updates, dropping links whose name the survivor
+  already has;
+* the other businesses are deleted.
+
+Relations of every business being merged are loaded up front with one query
+per table, so merging a cluster costs a constant number of queries.
+"""
+import csv
+from dataclasses import dataclass, field
+from typing import Iterable, TextIO
+
+from django.db import transaction
+from django.utils import timezone
+
+from app.clustering import UnionFind, reason_signal
+from app.models import Business, BusinessContactKey, ScrapeFingerprint, SocialMediaLink
+from app.normalization import normalize_phone_number
+
+# Fields of the survivor filled from the first other business that has them
+FILL_FIELDS = [
+    'address_id',
+    'website_url',
+    'google_maps_url',
+    'number_of_employees',
+    'chamber_of_commerce_id',
+    'downtown_frederick_id',
+]
+
+
+@dataclass
+class MergePlan:
+    """What merging one cluster changes"""
+    survivor: Business
+    merged: list
+    # field -> (old value, new value) on the survivor
+    changes: dict = field(default_factory=dict)
+    # Social media links moved to / dropped as duplicates of the survivor's
+    moved_links: list = field(default_factory=list)
+    dropped_links: list = field(default_factory=list)
+    # Category ids the survivor gains
+    added_categories: list = field(default_factory=list)
+    fingerprints: int = 0
+
+    def describe(self) -> list[str]:
+        """Human readable diff, one line per change"""
+        lines = [
+            f"Merge {', '.join(f'#{b.pk} {b.name!r}' for b in self.merged)} "
+            f"into #{self.survivor.pk} {self.survivor.name!r}"
+        ]
+        for name, (old, new) in self.changes.items():
+            lines.append(f"  {name}: {old!r} -> {new!r}")
+        if self.moved_links or self.dropped_links:
+            lines.append(
+                f"  social media links: {len(self.moved_links)} moved, "
+                f"{len(self.dropped_links)} duplicates dropped"
+            )
+        if self.added_categories:
+            lines.append(f"  categories: {len(self.added_categories)} added")
+        if self.fingerprints:
+            lines.append(f"  scrape fingerprints: {self.fingerprints} moved")
+        return lines
+
+
+def union(*lists, key=None) -> list:
+    """Items of ``lists`` in order, without repeats (compared by ``key``)"""
+    merged = {}
+    for items in lists:
+        for item in items or []:
+            merged.setdefault(key(item) if key else repr(item), item)
+    return list(merged.values())
+
+
+def plan_merges(clusters: Iterable[Iterable[int]]) -> list[MergePlan]:
+    """
+    Plan merging each cluster of business ids
+
+    Ids that no longer exist are ignored, as are clusters left with fewer
+    than two businesses.  A business is only merged once, with the first
+    cluster it appears in.
+    """
+    clusters = [sorted(set(cluster)) for cluster in clusters]
+    business_ids = {business_id for cluster in clusters for business_id in cluster}
+    businesses = Business.objects.in_bulk(business_ids)
+
+    links = {}
+    for link in SocialMediaLink.objects.filter(business_id__in=business_ids).order_by('pk'):
+        links.setdefault(link.business_id, []).append(link)
+    categories = {}
+    for business_id, category_id in Business.categories.through.objects.filter(
+        business_id__in=business_ids
+    ).values_list('business_id', 'businesscategory_id'):
+        categories.setdefault(business_id, set()).add(category_id)
+    fingerprints = {}
+    for business_id in ScrapeFingerprint.objects.filter(
+        business_id__in=business_ids
+    ).values_list('business_id', flat=True):
+        fingerprints[business_id] = fingerprints.get(business_id, 0) + 1
+
+    plans = []
+    planned = set()
+    for cluster in clusters:
+        cluster = [pk for pk in cluster if pk in businesses and pk not in planned]
+        if len(cluster) < 2:
+            continue
+        planned.update(cluster)
+        survivor, merged = businesses[cluster[0]], [businesses[pk] for pk in cluster[1:]]
+        plan = MergePlan(survivor=survivor, merged=merged)
+
+        values = {
+            'phone_numbers': union(
+                survivor.phone_numbers,
+                *(b.phone_numbers for b in merged),
+                key=lambda phone: normalize_phone_number(phone) or phone,
+            ),
+            'contacts': union(survivor.contacts, *(b.contacts for b in merged)),
+            'extra': {},
+        }
+        for business in reversed([survivor, *merged]):
+            values['extra'].update(business.extra or {})
+        for name in FILL_FIELDS:
+            if getattr(survivor, name) in (None, ''):
+                values[name] = next(
+                    (getattr(b, name) for b in merged if getattr(b, name) not in (None, '')),
+                    None,
+                )
+        plan.changes = {
+            name: (getattr(survivor, name), value)
+            for name, value in values.items()
+            if value != getattr(survivor, name) and value is not None
+        }
+
+        link_names = {link.name for link in links.get(survivor.pk, [])}
+        for business in merged:
+            for link in links.get(business.pk, []):
+                if link.name in link_names:
+                    plan.dropped_links.append(link.pk)
+                else:
+                    link_names.add(link.name)
+                    plan.moved_links.append(link.pk)
+        plan.added_categories = sorted(
+            set().union(*(categories.get(b.pk, set()) for b in merged))
+            - categories.get(survivor.pk, set())
+        )
+        plan.fingerprints = sum(fingerprints.get(b.pk, 0) for b in merged)
+        plans.append(plan)
+    return plans
+
+
+def apply_merge(plan: MergePlan):
+    """Merge one planned cluster in a transaction"""
+    survivor = plan.survivor
+    merged_ids = [business.pk for business in plan.merged]
+    with transaction.atomic():
+        if plan.dropped_links:
+            SocialMediaLink.objects.filter(pk__in=plan.dropped_links).delete()
+        if plan.moved_links:
+            SocialMediaLink.objects.filter(pk__in=plan.moved_links).update(business_id=survivor.pk)
+        if plan.added_categories:
+            Through = Business.categories.through
+            Through.objects.bulk_create(
+                [
+                    Through(business_id=survivor.pk, businesscategory_id=category_id)
+                    for category_id in plan.added_categories
+                ],
+                ignore_conflicts=True,
+            )
+        if plan.fingerprints:
+            ScrapeFingerprint.objects.filter(business_id__in=merged_ids).update(business_id=survivor.pk)
+
+        # Delete first: external ids moving to the survivor are unique
+        Business.objects.filter(pk__in=merged_ids).delete()
+
+        if plan.changes:
+            for name, (_, new) in plan.changes.items():
+                setattr(survivor, name, new)
+            survivor.updated_at = timezone.now()
+            fields = [*plan.changes, 'updated_at', *survivor.populate_normalized_keys()]
+            Business.objects.filter(pk=survivor.pk).update(
+                **{name: getattr(survivor, name) for name in fields}
+            )
+            BusinessContactKey.sync([survivor])
+
+
+def merge_clusters(clusters: Iterable[Iterable[int]], dry_run: bool = False) -> list[MergePlan]:
+    """Merge each cluster of business ids, returning the plans (only planned if ``dry_run``)"""
+    plans = plan_merges(clusters)
+    if not dry_run:
+        for plan in plans:
+            apply_merge(plan)
+    return plans
+
+
+def read_clusters_csv(file: TextIO, min_score: float | None = None,
+                      required_signals=()) -> list[list[int]]:
+    """
+    Clusters of business ids from a ``detect_duplicates`` pair CSV
+
+    Pairs are grouped into connected clusters, leaving out pairs whose best
+    score is under ``min_score`` or whose reasons (over all of the pair's
+    rows) lack any of ``required_signals``.  Cluster CSVs (``--clusters``)
+    are refused: they carry no per-pair scores or reasons, so one weak pair
+    could chain unrelated businesses into a cluster that is then merged.
+    """
+    reader = csv.DictReader(file)
+    if 'cluster' in (reader.fieldnames or []):
+        raise ValueError(
+            "cluster CSVs can't be filtered pair by pair, export pairs with "
+            "detect_duplicates --format csv (without --clusters) instead"
+        )
+
+    # (business1_id, business2_id) -> [best score, signals]
+    pairs = {}
+    for row in reader:
+        pair = tuple(sorted([int(row['business1_id']), int(row['business2_id'])]))
+        score, signals = pairs.setdefault(pair, [0.0, set()])
+        pairs[pair][0] = max(score, float(row['score']))
+        signals.update(reason_signal(reason) for reason in row['match_reason'].split('; '))
+
+    union_find = UnionFind()
+    for (business1_id, business2_id), (score, signals) in pairs.items():
+        if min_score is not None and score < min_score:
+            continue
+        if not set(required_signals) <= signals:
+            continue
+        union_find.union(business1_id, business2_id)
+    clusters = {}
+    for business_id in sorted(union_find.parent):
+        clusters.setdefault(union_find.find(business_id), []).append(business_id)
+    return list(clusters.values())
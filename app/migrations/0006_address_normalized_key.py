@@ -0,0 +1,37 @@
+# Generated by Django 5.1.2 on 2026-10-17 02:57
+
+from django.db import migrations, models
+
+from app.normalization import normalize_address_key
+
+
+def backfill_normalized_key(apps, schema_editor):
+    Address = apps.get_model("app", "Address")
+    addresses = list(Address.objects.all())
+    for address in addresses:
+        address.normalized_key = normalize_address_key(
+            address.street_1, address.city, address.state, address.zip
+        )
+    Address.objects.bulk_update(addresses, ["normalized_key"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0005_business_downtown_frederick_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="address",
+            name="normalized_key",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                default="",
+                help_text="Case-folded street/city/state/zip used to match equivalent addresses",
+                max_length=1024,
+            ),
+        ),
+        migrations.RunPython(backfill_normalized_key, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.2 on 2026-10-17 03:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0006_address_normalized_key"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScrapeFingerprint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("source", models.CharField(help_text="Spider name", max_length=255)),
+                (
+                    "external_id",
+                    models.CharField(
+                        help_text="Record id within the source", max_length=1024
+                    ),
+                ),
+                ("fingerprint", models.CharField(max_length=64)),
+                (
+                    "business",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="app.business",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("source", "external_id"),
+                        name="unique_scrape_fingerprint_source_external_id",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.1.2 on 2026-10-17 03:26
+
+from django.db import migrations, models
+
+from app.normalization import (
+    normalize_business_name,
+    normalize_phone_numbers,
+    normalize_url,
+)
+
+
+def backfill_normalized_keys(apps, schema_editor):
+    Business = apps.get_model("app", "Business")
+    businesses = list(Business.objects.all())
+    for business in businesses:
+        business.normalized_name = normalize_business_name(business.name)
+        business.normalized_website = normalize_url(business.website_url)
+        business.normalized_phone_numbers = normalize_phone_numbers(
+            business.phone_numbers
+        )
+    Business.objects.bulk_update(
+        businesses,
+        ["normalized_name", "normalized_website", "normalized_phone_numbers"],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0007_scrapefingerprint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="business",
+            name="normalized_name",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                default="",
+                help_text="Name without legal suffix or punctuation, used for duplicate matching",
+                max_length=255,
+            ),
+        ),
+        migrations.AddField(
+            model_name="business",
+            name="normalized_phone_numbers",
+            field=models.JSONField(
+                blank=True,
+                default=list,
+                help_text="Distinct phone numbers as 10 digits",
+            ),
+        ),
+        migrations.AddField(
+            model_name="business",
+            name="normalized_website",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                default="",
+                help_text="Website URL without protocol, www. or trailing slash",
+                max_length=255,
+            ),
+        ),
+        migrations.RunPython(backfill_normalized_keys, migrations.RunPython.noop),
+    ]
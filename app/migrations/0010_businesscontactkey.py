@@ -0,0 +1,76 @@
+# Generated by Django 5.1.2 on 2026-10-17 03:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_contact_keys(apps, schema_editor):
+    Business = apps.get_model("app", "Business")
+    BusinessContactKey = apps.get_model("app", "BusinessContactKey")
+    keys = []
+    for business_id, phones, website in Business.objects.values_list(
+        "id", "normalized_phone_numbers", "normalized_website"
+    ):
+        keys.extend(
+            BusinessContactKey(business_id=business_id, kind="phone", value=phone)
+            for phone in phones
+        )
+        if website:
+            keys.append(
+                BusinessContactKey(business_id=business_id, kind="website", value=website)
+            )
+    BusinessContactKey.objects.bulk_create(keys, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0009_duplicatecandidate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BusinessContactKey",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("phone", "Phone"), ("website", "Website")],
+                        max_length=16,
+                    ),
+                ),
+                ("value", models.CharField(max_length=255)),
+                (
+                    "business",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="contact_keys",
+                        to="app.business",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["kind", "value"], name="app_busines_kind_4cdc6b_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("business", "kind", "value"),
+                        name="unique_business_contact_key",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_contact_keys, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,13 @@
 from django.db import models
 from django.utils.text import slugify
 
+from app.normalization import (
+    normalize_address_key,
+    normalize_business_name,
+    normalize_phone_numbers,
+    normalize_url,
+)
+
 
 class TimestampsMixin(models.Model):
     """
@@ -41,6 +48,24 @@ class Address(TimestampsMixin, models.Model):
         help_text="Longitude coordinate (e.g., -77.41010073)"
     )
 
+    normalized_key = models.CharField(
+        max_length=1024,
+        blank=True,
+        default="",
+        db_index=True,
+        help_text="Case-folded street/city/state/zip used to match equivalent addresses",
+    )
+
+    def save(self, *args, **kwargs):
+        normalized_key = normalize_address_key(
+            self.street_1, self.city, self.state, self.zip
+        )
+        if kwargs.get("update_fields") and normalized_key != self.normalized_key:
+            # Keep the stored key in step with the fields being saved
+            kwargs["update_fields"] = {*kwargs["update_fields"], "normalized_key"}
+        self.normalized_key = normalized_key
+        super().save(*args, **kwargs)
+
 
 class BusinessCategory(TimestampsMixin, models.Model):
     """
@@ -60,12 +85,16 @@ class BusinessCategory(TimestampsMixin, models.Model):
         blank=True,
     )
 
-    def save(self, *args, **kwargs):
+    def populate_slug(self):
+        """Set the slug if missing (``bulk_create`` skips ``save``)"""
         if not self.slug:
             if self.chamber_of_commerce_id:
                 self.slug = slugify(self.chamber_of_commerce_id)
             else:
                 self.slug = slugify(self.name)
+
+    def save(self, *args, **kwargs):
+        self.populate_slug()
         super().save(*args, **kwargs)
 
 
@@ -131,14 +160,133 @@ class Business(TimestampsMixin, models.Model):
         null=True, blank=True, help_text="Number of employees (if known)"
     )
 
-    def save(self, *args, **kwargs):
+    # Normalized match keys, kept in sync with the fields above
+    normalized_name = models.CharField(
+        max_length=255,
+        blank=True,
+        default="",
+        db_index=True,
+        help_text="Name without legal suffix or punctuation, used for duplicate matching",
+    )
+    normalized_website = models.CharField(
+        max_length=255,
+        blank=True,
+        default="",
+        db_index=True,
+        help_text="Website URL without protocol, www. or trailing slash",
+    )
+    normalized_phone_numbers = models.JSONField(
+        null=False,
+        blank=True,
+        default=list,
+        help_text="Distinct phone numbers as 10 digits",
+    )
+
+    def populate_slug(self):
+        """Set the slug if missing (``bulk_create`` skips ``save``)"""
         if not self.slug:
             if self.chamber_of_commerce_id:
                 self.slug = slugify(self.chamber_of_commerce_id)
             else:
                 self.slug = slugify(self.name)
 
+    def populate_normalized_keys(self) -> list[str]:
+        """
+        Recompute the normalized match keys (``bulk_create`` and
+        ``bulk_update`` skip ``save``), returning the fields that changed
+        """
+        keys = {
+            "normalized_name": normalize_business_name(self.name),
+            "normalized_website": normalize_url(self.website_url),
+            "normalized_phone_numbers": normalize_phone_numbers(self.phone_numbers),
+        }
+        changed = [field for field, value in keys.items() if getattr(self, field) != value]
+        for field in changed:
+            setattr(self, field, keys[field])
+        return changed
+
+    def contact_key_values(self) -> list[tuple[str, str]]:
+        """``(kind, value)`` of the BusinessContactKey rows this business should have"""
+        keys = [
+            (BusinessContactKey.PHONE, phone) for phone in self.normalized_phone_numbers
+        ]
+        if self.normalized_website:
+            keys.append((BusinessContactKey.WEBSITE, self.normalized_website))
+        return keys
+
+    def save(self, *args, **kwargs):
+        self.populate_slug()
+        adding = self._state.adding
+        changed = self.populate_normalized_keys()
+        if kwargs.get("update_fields") and changed:
+            # Keep the stored keys in step with the fields being saved
+            kwargs["update_fields"] = {*kwargs["update_fields"], *changed}
         super().save(*args, **kwargs)
+        if (adding and self.contact_key_values()) or (
+            {"normalized_website", "normalized_phone_numbers"} & set(changed)
+        ):
+            BusinessContactKey.sync([self])
+
+
+class BusinessContactKey(models.Model):
+    """
+    Normalized phone number or website of a business
+
+    One row per value, indexed by ``(kind, value)`` so businesses sharing a
+    contact are found with a self-join.  Kept in sync with
+    ``Business.normalized_phone_numbers`` / ``normalized_website``.
+    """
+
+    PHONE = "phone"
+    WEBSITE = "website"
+    KIND_CHOICES = [
+        (PHONE, "Phone"),
+        (WEBSITE, "Website"),
+    ]
+
+    business = models.ForeignKey(
+        Business, on_delete=models.CASCADE, related_name="contact_keys"
+    )
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    value = models.CharField(max_length=255)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["business", "kind", "value"],
+                name="unique_business_contact_key",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["kind", "value"]),
+        ]
+
+    @classmethod
+    def sync(cls, businesses):
+        """Add and remove rows so ``businesses``' keys match their normalized fields"""
+        wanted = {
+            (business.pk, kind, value)
+            for business in businesses
+            for kind, value in business.contact_key_values()
+        }
+        existing = {
+            (business_id, kind, value): pk
+            for pk, business_id, kind, value in cls.objects.filter(
+                business__in=[business.pk for business in businesses]
+            ).values_list("pk", "business_id", "kind", "value")
+        }
+
+        stale = [pk for key, pk in existing.items() if key not in wanted]
+        if stale:
+            cls.objects.filter(pk__in=stale).delete()
+        cls.objects.bulk_create(
+            [
+                cls(business_id=business_id, kind=kind, value=value)
+                for business_id, kind, value in wanted
+                if (business_id, kind, value) not in existing
+            ],
+            ignore_conflicts=True,
+        )
 
 
 class SocialMediaLink(models.Model):
@@ -149,3 +297,72 @@ class SocialMediaLink(models.Model):
     business = models.ForeignKey(Business, on_delete=models.CASCADE)
     name = models.CharField(max_length=255)
     url = models.URLField()
+
+
+class ScrapeFingerprint(TimestampsMixin, models.Model):
+    """
+    Hash of the last scraped payload of a source record
+
+    Lets re-crawls skip records that have not changed since the last run.
+    """
+
+    source = models.CharField(max_length=255, help_text="Spider name")
+    external_id = models.CharField(
+        max_length=1024, help_text="Record id within the source"
+    )
+    fingerprint = models.CharField(max_length=64)
+    business = models.ForeignKey(
+        Business,
+        on_delete=models.CASCADE,
+        null=True,
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["source", "external_id"],
+                name="unique_scrape_fingerprint_source_external_id",
+            ),
+        ]
+
+
+class DuplicateCandidate(TimestampsMixin, models.Model):
+    """
+    Stored pair of businesses that may be duplicates
+
+    ``business_1`` always has the lower id.  Candidates are stored per
+    ``detector_version``, so results of different settings don't mix.
+    """
+
+    business_1 = models.ForeignKey(
+        Business, on_delete=models.CASCADE, related_name="+"
+    )
+    business_2 = models.ForeignKey(
+        Business, on_delete=models.CASCADE, related_name="+"
+    )
+    score = models.FloatField()
+    reasons = models.JSONField(null=False, blank=True, default=list)
+    detector_version = models.CharField(max_length=255, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["detector_version", "business_1", "business_2"],
+                name="unique_duplicate_candidate_pair",
+            ),
+        ]
+
+
+class DuplicateDetectionRun(TimestampsMixin, models.Model):
+    """
+    A stored duplicate detection run
+
+    ``watermark`` is the latest ``Business.updated_at`` the run covered;
+    the next incremental run only compares businesses updated after it.
+    """
+
+    detector_version = models.CharField(max_length=255, db_index=True)
+    watermark = models.DateTimeField(null=True, blank=True)
+    incremental = models.BooleanField(default=False)
+    businesses_compared = models.IntegerField(default=0)
+    candidates_found = models.IntegerField(default=0)
@@ -0,0 +1,112 @@
+"""
+Normalization helpers for match keys
+"""
+import re
+
+# Canonical forms for common street suffixes, directionals and unit labels
+STREET_ABBREVIATIONS = {
+    "alley": "aly",
+    "avenue": "ave",
+    "boulevard": "blvd",
+    "circle": "cir",
+    "court": "ct",
+    "drive": "dr",
+    "expressway": "expy",
+    "freeway": "fwy",
+    "highway": "hwy",
+    "lane": "ln",
+    "parkway": "pkwy",
+    "place": "pl",
+    "road": "rd",
+    "square": "sq",
+    "street": "st",
+    "terrace": "ter",
+    "trail": "trl",
+    "north": "n",
+    "south": "s",
+    "east": "e",
+    "west": "w",
+    "northeast": "ne",
+    "northwest": "nw",
+    "southeast": "se",
+    "southwest": "sw",
+    "suite": "ste",
+    "apartment": "apt",
+    "building": "bldg",
+    "floor": "fl",
+}
+
+
+def normalize_street(street):
+    """Case-fold, strip punctuation and abbreviate suffixes of a street line"""
+    if not street:
+        return ""
+    street = street.casefold()
+    street = street.replace("#", " ")
+    street = re.sub(r"[^\w\s]", " ", street)
+    return " ".join(
+        STREET_ABBREVIATIONS.get(token, token) for token in street.split()
+    )
+
+
+def normalize_address_key(street_1, city, state, zip):
+    """
+    Key identifying equivalent addresses
+
+    "123 N. Market Street, Frederick MD 21701-1234" and
+    "123 north market st, frederick md 21701" share the same key.
+    """
+    street = normalize_street(street_1)
+    if not street:
+        return ""
+    city = " ".join((city or "").casefold().split())
+    state = " ".join((state or "").casefold().split())
+    zip_code = re.sub(r"\D", "", zip or "")[:5]
+    return "|".join([street, city, state, zip_code])
+
+
+def normalize_business_name(name):
+    """Case-fold a business name and strip its legal suffix and punctuation"""
+    if not name:
+        return ""
+    name = name.lower().strip()
+    # Remove common business suffixes
+    name = re.sub(
+        r"\b(inc|llc|corp|ltd|co|corporation|incorporated|limited|company)\b\.?$",
+        "",
+        name,
+    )
+    # Remove punctuation and extra spaces
+    name = re.sub(r"[^\w\s]", "", name)
+    name = re.sub(r"\s+", " ", name)
+    return name.strip()
+
+
+def normalize_phone_number(phone):
+    """Digits of a phone number, without a leading US country code"""
+    if not phone:
+        return ""
+    cleaned = re.sub(r"\D", "", phone)
+    if len(cleaned) == 11 and cleaned.startswith("1"):
+        cleaned = cleaned[1:]
+    return cleaned
+
+
+def normalize_phone_numbers(phones):
+    """Distinct normalized phone numbers with at least 10 digits, in order"""
+    normalized = []
+    for phone in phones or []:
+        cleaned = normalize_phone_number(phone)
+        if len(cleaned) >= 10 and cleaned not in normalized:
+            normalized.append(cleaned)
+    return normalized
+
+
+def normalize_url(url):
+    """Lower-case a URL without its protocol, "www." and trailing slash"""
+    if not url:
+        return ""
+    url = url.lower().strip()
+    url = re.sub(r"^https?://", "", url)
+    url = re.sub(r"^www\.", "", url)
+    return url.rstrip("/")
@@ -0,0 +1,89 @@
+"""
+Process-pool sharding of fuzzy name scoring
+
+Workers receive compact ``(business id, normalized name)`` tuples once, at
+start-up, and score one shard of the pairwise space each.  Results are
+merged in pair order, so any number of jobs gives the serial output.
+
+This module deliberately avoids Django imports, so workers also start under
+the "spawn" start method.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+from app.similarity import KERNELS
+
+# Shards per job; more, smaller shards balance uneven workloads
+SHARDS_PER_JOB = 4
+
+_records = None
+
+
+def _init_worker(records: list[tuple[int, str]]):
+    global _records
+    _records = records
+
+
+def _score(records, pairs, threshold: float, kernel: str) -> list[tuple[int, int, float]]:
+    names = [name for _, name in records]
+    return KERNELS[kernel].score_pairs(names, pairs, threshold)
+
+
+def _row_pairs(records, shard: int, shards: int):
+    """All pairs whose first index falls in ``shard`` (rows interleaved)"""
+    for i in range(shard, len(records), shards):
+        if not records[i][1]:
+            continue
+        for j in range(i + 1, len(records)):
+            if records[j][1]:
+                yield i, j
+
+
+def _score_rows(shard: int, shards: int, threshold: float, kernel: str):
+    return _score(_records, _row_pairs(_records, shard, shards), threshold, kernel)
+
+
+def _score_pairs(pairs: list[tuple[int, int]], threshold: float, kernel: str):
+    return _score(_records, pairs, threshold, kernel)
+
+
+def score_name_pairs(
+    records: list[tuple[int, str]],
+    threshold: float,
+    pairs: list[tuple[int, int]] | None = None,
+    jobs: int = 1,
+    kernel: str = 'sequence',
+) -> list[tuple[int, int, float]]:
+    """
+    ``(i, j, similarity)`` for pairs of ``records`` positions reaching
+    ``threshold``, sorted by ``(i, j)``
+
+    ``pairs`` restricts scoring to those (e.g. blocked) candidates; by
+    default every pair of non-empty names is scored.  ``kernel`` names the
+    ``app.similarity`` kernel doing the scoring.
+    """
+    if jobs <= 1:
+        if pairs is None:
+            pairs = _row_pairs(records, 0, 1)
+        return _score(records, pairs, threshold, kernel)
+
+    shards = jobs * SHARDS_PER_JOB
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=(records,)
+    ) as executor:
+        if pairs is None:
+            futures = [
+                executor.submit(_score_rows, shard, shards, threshold, kernel)
+                for shard in range(shards)
+            ]
+        else:
+            chunk_size = max(1, -(-len(pairs) // shards))
+            futures = [
+                executor.submit(
+                    _score_pairs, pairs[start : start + chunk_size], threshold, kernel
+                )
+                for start in range(0, len(pairs), chunk_size)
+            ]
+        scored = [result for future in futures for result in future.result()]
+
+    scored.sort()
+    return scored
@@ -0,0 +1,119 @@
+"""
+Threshold-aware name similarity kernels
+
+A kernel scores many name pairs against a threshold and only reports the
+pairs reaching it, so it can give up on a pair as soon as a bound proves the
+threshold is out of reach:
+
+* ``sequence``: ``difflib.SequenceMatcher.ratio()``, with the same scores as
+  calling it directly.  Pairs are taken in bounded chunks, each scored
+  grouped by second name so that name's index is built once per chunk and
+  reused for its pairs; the cheap ``real_quick_ratio`` / ``quick_ratio``
+  upper bounds are checked before the full ratio.
+* ``levenshtein``: ``1 - distance / longest length``.  Pairs whose length
+  difference or character counts already exceed the distance budget are
+  skipped; the rest use a banded edit distance that stops once the budget
+  is exceeded.
+"""
+from collections import Counter
+from difflib import SequenceMatcher
+from itertools import groupby, islice
+
+# Pairs sorted at a time by SequenceKernel; bounds memory when scoring a
+# stream of every pair
+PAIR_CHUNK_SIZE = 100_000
+
+
+class SequenceKernel:
+    name = 'sequence'
+    reason = 'name_fuzzy'
+
+    def score_pairs(self, names, pairs, threshold):
+        """``(i, j, score)`` for ``pairs`` of ``names`` positions reaching ``threshold``"""
+        scored = []
+        matcher = SequenceMatcher(None)
+        pairs = iter(pairs)
+        while chunk := list(islice(pairs, PAIR_CHUNK_SIZE)):
+            # SequenceMatcher caches details about its second sequence, so
+            # pairs are scored grouped by their second name
+            chunk.sort(key=lambda pair: pair[1])
+            for j, group in groupby(chunk, key=lambda pair: pair[1]):
+                matcher.set_seq2(names[j])
+                for i, _ in group:
+                    matcher.set_seq1(names[i])
+                    if (
+                        matcher.real_quick_ratio() >= threshold
+                        and matcher.quick_ratio() >= threshold
+                    ):
+                        similarity = matcher.ratio()
+                        if similarity >= threshold:
+                            scored.append((i, j, similarity))
+        scored.sort()
+        return scored
+
+
+def bounded_levenshtein(a, b, max_distance):
+    """Edit distance of ``a`` and ``b``, or None once it exceeds ``max_distance``"""
+    if len(a) > len(b):
+        a, b = b, a
+    if len(b) - len(a) > max_distance:
+        return None
+
+    # Only cells within max_distance of the diagonal can stay in budget
+    out_of_budget = max_distance + 1
+    previous = list(range(len(a) + 1))
+    for row, char_b in enumerate(b, 1):
+        low = max(1, row - max_distance)
+        high = min(len(a), row + max_distance)
+        current = [out_of_budget] * (len(a) + 1)
+        current[0] = row if row <= max_distance else out_of_budget
+        for column in range(low, high + 1):
+            current[column] = min(
+                previous[column] + 1,
+                current[column - 1] + 1,
+                previous[column - 1] + (a[column - 1] != char_b),
+            )
+        if min(current[low - 1:high + 1]) > max_distance:
+            return None
+        previous = current
+
+    distance = previous[len(a)]
+    return distance if distance <= max_distance else None
+
+
+class LevenshteinKernel:
+    name = 'levenshtein'
+    reason = 'name_levenshtein'
+
+    def score_pairs(self, names, pairs, threshold):
+        scored = []
+        # Character counts, computed once per name for the bag distance bound
+        counts = {}
+        for i, j in pairs:
+            a, b = names[i], names[j]
+            longest = max(len(a), len(b))
+            if not longest:
+                continue
+            # Largest distance still reaching the threshold (with float slack)
+            max_distance = int((1 - threshold) * longest + 1e-9)
+            if abs(len(a) - len(b)) > max_distance:
+                continue
+            if i not in counts:
+                counts[i] = Counter(a)
+            if j not in counts:
+                counts[j] = Counter(b)
+            # Every character of one name missing from the other costs an edit
+            if longest - (counts[i] & counts[j]).total() > max_distance:
+                continue
+            distance = bounded_levenshtein(a, b, max_distance)
+            if distance is not None:
+                similarity = 1 - distance / longest
+                if similarity >= threshold:
+                    scored.append((i, j, similarity))
+        return scored
+
+
+KERNELS = {
+    kernel.name: kernel
+    for kernel in [SequenceKernel(), LevenshteinKernel()]
+}
@@ -0,0 +1,124 @@
+"""
+Compact, column-oriented snapshot of the fields duplicate detection reads
+
+Every method of a ``DuplicateDetector`` run reads the same snapshot, loaded
+with one streamed ``values_list`` query instead of each method hydrating
+every ``Business`` (JSON fields included).  Row ``i`` of each column belongs
+to the business ``ids[i]``; rows are ordered by pk.  Numbers are kept in
+``array`` columns, so a row costs a few strings rather than a model instance.
+
+Model instances are only built for businesses that end up in a candidate
+pair, with every field but a few deferred; reports hydrate them fully in
+chunks (see ``app.duplicate_reports``).
+"""
+import math
+from array import array
+from bisect import bisect_left
+from itertools import groupby
+
+from django.db import connection
+
+from app.models import Business, BusinessContactKey
+
+SNAPSHOT_CHUNK_SIZE = 2000
+
+# Business fields set on candidate instances, in model order as ``from_db`` expects
+CANDIDATE_FIELDS = [
+    field.attname
+    for field in Business._meta.concrete_fields
+    if field.attname in ('id', 'name', 'address_id', 'normalized_name')
+]
+
+
+class BusinessSnapshot:
+    """Column-oriented copy of every business, for one detection run"""
+
+    def __init__(self):
+        self.ids = array('q')
+        self.names = []
+        self.normalized_names = []
+        # 0 when the business has no address
+        self.address_ids = array('q')
+        self.address_keys = []
+        self.streets = []
+        self.cities = []
+        # NaN when the address has no coordinates
+        self.latitudes = array('d')
+        self.longitudes = array('d')
+        # kind -> [(value, [rows])] for contact values shared by several businesses
+        self._shared_contacts = {}
+        self._businesses = {}
+
+    @classmethod
+    def load(cls, chunk_size=SNAPSHOT_CHUNK_SIZE) -> 'BusinessSnapshot':
+        snapshot = cls()
+        # Cities repeat on most rows: keep one string per distinct value
+        cities = {}
+        rows = Business.objects.order_by('pk').values_list(
+            'id', 'name', 'normalized_name', 'address_id',
+            'address__normalized_key', 'address__street_1', 'address__city',
+            'address__latitude', 'address__longitude',
+        ).iterator(chunk_size=chunk_size)
+        for pk, name, normalized_name, address_id, key, street, city, latitude, longitude in rows:
+            snapshot.ids.append(pk)
+            snapshot.names.append(name)
+            snapshot.normalized_names.append(normalized_name)
+            snapshot.address_ids.append(address_id or 0)
+            snapshot.address_keys.append(key or '')
+            snapshot.streets.append(street or '')
+            snapshot.cities.append(cities.setdefault(city or '', city or ''))
+            has_point = latitude is not None and longitude is not None
+            snapshot.latitudes.append(float(latitude) if has_point else math.nan)
+            snapshot.longitudes.append(float(longitude) if has_point else math.nan)
+        return snapshot
+
+    def __len__(self):
+        return len(self.ids)
+
+    def business(self, row) -> Business:
+        """
+        The ``Business`` of ``row``, with only ``CANDIDATE_FIELDS`` loaded
+
+        One instance per row, so a business found by several methods is
+        shared between their candidates.
+        """
+        if row not in self._businesses:
+            values = {
+                'id': self.ids[row],
+                'name': self.names[row],
+                'address_id': self.address_ids[row] or None,
+                'normalized_name': self.normalized_names[row],
+            }
+            self._businesses[row] = Business.from_db(
+                connection.alias, CANDIDATE_FIELDS, [values[name] for name in CANDIDATE_FIELDS]
+            )
+        return self._businesses[row]
+
+    def row(self, pk) -> int | None:
+        """Row of the business ``pk`` (rows are in pk order), if it is in the snapshot"""
+        row = bisect_left(self.ids, pk)
+        return row if row < len(self.ids) and self.ids[row] == pk else None
+
+    def has_point(self, row) -> bool:
+        return not math.isnan(self.latitudes[row])
+
+    def shared_contacts(self, kind) -> list[tuple[str, list[int]]]:
+        """
+        ``(value, rows)`` for every ``BusinessContactKey`` value of ``kind``
+        held by more than one business, by value (rows by pk)
+
+        Loaded on first use with one streamed query.
+        """
+        if kind not in self._shared_contacts:
+            keys = BusinessContactKey.objects.filter(kind=kind).order_by(
+                'value', 'business_id'
+            ).values_list('value', 'business_id').iterator(chunk_size=SNAPSHOT_CHUNK_SIZE)
+            shared = []
+            for value, group in groupby(keys, key=lambda key: key[0]):
+                # Businesses created since the snapshot was loaded are skipped
+                group = [self.row(business_id) for _, business_id in group]
+                group = [row for row in group if row is not None]
+                if len(group) > 1:
+                    shared.append((value, group))
+            self._shared_contacts[kind] = shared
+        return self._shared_contacts[kind]
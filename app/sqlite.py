@@ -0,0 +1,100 @@
+"""
+SQLite connection profiles
+
+Each profile is a set of PRAGMAs applied to every new SQLite connection
+(including the ones opened by the ingestion writer thread).  Profiles are
+defined in ``settings.SQLITE_PROFILES``; the active one defaults to
+``settings.SQLITE_PROFILE`` and commands switch it for their duration with
+the ``use_sqlite_profile`` context manager.
+"""
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+# PRAGMAs a profile may set
+ALLOWED_PRAGMAS = {
+    "busy_timeout",
+    "cache_size",
+    "journal_mode",
+    "mmap_size",
+    "synchronous",
+    "temp_store",
+}
+
+_active_profile = None
+
+
+def get_sqlite_profile() -> str:
+    return _active_profile or getattr(settings, "SQLITE_PROFILE", "default")
+
+
+@contextmanager
+def use_sqlite_profile(name: str):
+    """
+    Make ``name`` the active profile while the block runs
+
+    The profile is applied to open connections and to every connection
+    created inside the block; on exit the previous profile is restored on
+    the connections still open.
+    """
+    global _active_profile
+
+    if name not in getattr(settings, "SQLITE_PROFILES", {}):
+        raise ValueError(f"Unknown SQLite profile: {name}")
+    previous = _active_profile
+    _active_profile = name
+    apply_to_open_connections(name)
+    try:
+        yield
+    finally:
+        _active_profile = previous
+        apply_to_open_connections(get_sqlite_profile())
+
+
+def apply_to_open_connections(name: str):
+    for connection in connections.all(initialized_only=True):
+        # Some PRAGMAs can't change inside a transaction; such connections
+        # keep their settings
+        if (
+            connection.vendor == "sqlite"
+            and connection.connection is not None
+            and not connection.in_atomic_block
+        ):
+            apply_sqlite_profile(connection, name)
+
+
+def apply_sqlite_profile(connection, name: str):
+    """
+    Set the PRAGMAs of profile ``name`` on ``connection``
+
+    The value each PRAGMA had before a profile first changed it is kept on
+    the connection, so PRAGMAs the new profile leaves out go back to it.
+    """
+    pragmas = settings.SQLITE_PROFILES.get(name, {})
+    for pragma in pragmas:
+        if pragma not in ALLOWED_PRAGMAS:
+            raise ValueError(f"Unsupported SQLite PRAGMA in profile {name}: {pragma}")
+
+    original = connection.__dict__.setdefault("sqlite_original_pragmas", {})
+    with connection.cursor() as cursor:
+        for pragma, value in original.items():
+            if pragma not in pragmas:
+                cursor.execute(f"PRAGMA {pragma} = {value}")
+        for pragma, value in pragmas.items():
+            if pragma not in original:
+                cursor.execute(f"PRAGMA {pragma}")
+                row = cursor.fetchone()
+                # mmap_size reports nothing for an in-memory database
+                if row is None:
+                    continue
+                original[pragma] = row[0]
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+
+
+def configure_connection(sender, connection, **kwargs):
+    """``connection_created`` receiver applying the active profile"""
+    if connection.vendor == "sqlite":
+        # A new connection starts from SQLite's defaults
+        connection.__dict__.pop("sqlite_original_pragmas", None)
+        apply_sqlite_profile(connection, get_sqlite_profile())
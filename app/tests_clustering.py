@@ -0,0 +1,127 @@
+"""
+Unit tests for duplicate score fusion and clustering
+"""
+import json
+from io import StringIO
+from types import SimpleNamespace
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from app.clustering import UnionFind, build_clusters, cluster_candidates, fuse_signals
+from app.models import Address, Business
+
+
+def businesses(count):
+    return [SimpleNamespace(id=i) for i in range(count)]
+
+
+class FuseSignalsTest(SimpleTestCase):
+    """Every signal found for a pair should count towards its score"""
+
+    def test_more_signals_rank_higher(self):
+        b = businesses(4)
+        pairs = fuse_signals([
+            (b[0], b[1], 1.0, 'name_fuzzy: "a" <-> "a"'),
+            (b[2], b[3], 0.85, 'name_fuzzy: "b" <-> "bb"'),
+            (b[3], b[2], 0.9, 'phone_match: 3015550100'),
+        ])
+
+        self.assertEqual([(p.business1.id, p.business2.id) for p in pairs], [(2, 3), (0, 1)])
+        self.assertEqual(pairs[0].signals, {'name': 0.85, 'phone': 0.9})
+        self.assertEqual(len(pairs[0].reasons), 2)
+        self.assertAlmostEqual(pairs[1].score, 0.8)
+        self.assertAlmostEqual(pairs[0].score, 1 - (1 - 0.8 * 0.85) * (1 - 0.8 * 0.9))
+
+    def test_weights(self):
+        b = businesses(2)
+        candidates = [(b[0], b[1], 1.0, 'address_exact: 50 Citizens Way, Frederick')]
+        self.assertAlmostEqual(fuse_signals(candidates)[0].score, 0.5)
+        self.assertAlmostEqual(fuse_signals(candidates, {'address': 0.2})[0].score, 0.2)
+
+
+class BuildClustersTest(SimpleTestCase):
+    """Overlapping pairs should collapse into one cluster per connected group"""
+
+    def test_union_find(self):
+        union_find = UnionFind()
+        union_find.union(1, 2)
+        union_find.union(3, 4)
+        union_find.union(2, 4)
+        self.assertEqual(len({union_find.find(i) for i in [1, 2, 3, 4]}), 1)
+        self.assertNotEqual(union_find.find(5), union_find.find(1))
+
+    def test_clusters(self):
+        b = businesses(7)
+        candidates = [
+            (b[0], b[1], 1.0, 'website_match: example.com'),
+            (b[1], b[2], 1.0, 'website_match: example.com'),
+            (b[0], b[2], 1.0, 'website_match: example.com'),
+            (b[2], b[3], 0.9, 'phone_match: 3015550100'),
+            (b[5], b[6], 0.85, 'name_fuzzy: "x" <-> "xx"'),
+        ]
+        clusters = build_clusters(fuse_signals(candidates))
+
+        self.assertEqual(len(clusters), 2)
+        self.assertEqual([business.id for business in clusters[0].businesses], [0, 1, 2, 3])
+        self.assertEqual(len(clusters[0].pairs), 4)
+        self.assertAlmostEqual(clusters[0].score, 0.9)
+        self.assertEqual([business.id for business in clusters[1].businesses], [5, 6])
+
+    def test_min_score(self):
+        b = businesses(3)
+        candidates = [
+            (b[0], b[1], 1.0, 'website_match: example.com'),
+            (b[1], b[2], 1.0, 'address_exact: 50 Citizens Way, Frederick'),
+        ]
+        clusters = cluster_candidates(candidates, min_score=0.6)
+        self.assertEqual([[business.id for business in c.businesses] for c in clusters], [[0, 1]])
+
+
+class ClusterCommandTest(TestCase):
+    def test_ndjson_clusters(self):
+        for name in ["Alpha Bakery", "Zeta Plumbing", "Octagon Dental"]:
+            Business.objects.create(
+                name=name, slug=name.lower().replace(" ", "-"),
+                website_url="https://cluster.example.com",
+            )
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            "detect_duplicates", "--clusters", "--format", "ndjson", "--weights", "website=0.95",
+            stdout=stdout, stderr=stderr,
+        )
+        clusters = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual(len(clusters), 1)
+        self.assertEqual(len(clusters[0]["businesses"]), 3)
+        self.assertEqual(len(clusters[0]["pairs"]), 3)
+        self.assertAlmostEqual(clusters[0]["score"], 0.95 * 0.95, places=3)
+        self.assertIn("Total clusters: 1", stderr.getvalue())
+
+    def create(self, name, **fields):
+        return Business.objects.create(name=name, slug=name.lower().replace(" ", "-"), **fields)
+
+    def test_shared_address_alone_does_not_cluster(self):
+        """Unrelated businesses in one building are not merged into a cluster"""
+        building = Address.objects.create(street_1="50 Citizens Way", city="Frederick", state="MD", zip="21701")
+        self.create("Alpha Bakery", address=building)
+        self.create("Zeta Plumbing", address=building)
+        stdout = StringIO()
+        call_command("detect_duplicates", "--clusters", "--format", "ndjson", stdout=stdout, stderr=StringIO())
+        self.assertEqual(stdout.getvalue(), "")
+
+        # They are candidates, just not strong enough ones
+        stdout = StringIO()
+        call_command(
+            "detect_duplicates", "--clusters", "--format", "ndjson", "--min-score", "0.4",
+            stdout=stdout, stderr=StringIO(),
+        )
+        self.assertEqual(len(stdout.getvalue().splitlines()), 1)
+
+    def test_required_signals(self):
+        for name in ["Alpha Bakery", "Zeta Plumbing"]:
+            self.create(name, website_url="https://cluster.example.com")
+        stdout = StringIO()
+        call_command(
+            "detect_duplicates", "--clusters", "--format", "ndjson", "--require-signals", "name",
+            stdout=stdout, stderr=StringIO(),
+        )
+        self.assertEqual(stdout.getvalue(), "")
@@ -0,0 +1,132 @@
+"""
+Unit tests for stored duplicate candidates and incremental detection
+"""
+from django.test import TestCase
+from django.utils import timezone
+from app.duplicate_candidates import stored_candidates, update_candidates
+from app.duplicate_detection import DuplicateDetector
+from app.models import Address, Business, DuplicateCandidate
+
+
+class IncrementalDuplicateDetectionTest(TestCase):
+    """Incremental runs should only compare changed businesses and match a full rescan"""
+
+    def setUp(self):
+        self.monocacy = Business.objects.create(
+            name="Monocacy Brewing Company",
+            slug="monocacy-brewing-company",
+            phone_numbers=["240-422-4449"],
+        )
+        self.monocacy_co = Business.objects.create(
+            name="Monocacy Brewing CO",
+            slug="monocacy-brewing-co",
+        )
+        self.octavo = Business.objects.create(
+            name="Octavo Designs",
+            slug="octavo-designs",
+            website_url="https://octavodesigns.com",
+        )
+
+    def pair_ids(self, candidates):
+        return {tuple(sorted([b1.id, b2.id])) for b1, b2, _, _ in candidates}
+
+    def test_first_run_is_full(self):
+        detector = DuplicateDetector()
+        run = update_candidates(detector)
+
+        self.assertFalse(run.incremental)
+        self.assertEqual(run.businesses_compared, 3)
+        self.assertEqual(
+            self.pair_ids(stored_candidates(detector.version())),
+            {(self.monocacy.id, self.monocacy_co.id)},
+        )
+
+    def test_unchanged_run_compares_nothing(self):
+        detector = DuplicateDetector()
+        update_candidates(detector)
+        run = update_candidates(detector)
+
+        self.assertTrue(run.incremental)
+        self.assertEqual(run.businesses_compared, 0)
+        self.assertEqual(len(stored_candidates(detector.version())), 1)
+
+    def test_incremental_matches_full_rescan(self):
+        detector = DuplicateDetector()
+        update_candidates(detector)
+
+        octavo_llc = Business.objects.create(
+            name="Octavo Designs LLC",
+            slug="octavo-designs-llc",
+            website_url="http://www.octavodesigns.com/",
+        )
+        monocacy_brewing = Business.objects.create(
+            name="Monocacy Brewing",
+            slug="monocacy-brewing",
+            phone_numbers=["(240) 422-4449"],
+        )
+        self.monocacy_co.name = "Centro Hispano De Frederick"
+        self.monocacy_co.save()
+
+        run = update_candidates(detector)
+        self.assertTrue(run.incremental)
+        self.assertEqual(run.businesses_compared, 3)
+        incremental = self.pair_ids(stored_candidates(detector.version()))
+
+        update_candidates(detector, full=True)
+        self.assertEqual(self.pair_ids(stored_candidates(detector.version())), incremental)
+        self.assertEqual(
+            incremental,
+            {
+                (self.octavo.id, octavo_llc.id),
+                (self.monocacy.id, monocacy_brewing.id),
+            },
+        )
+
+    def test_address_updates_mark_businesses_changed(self):
+        """Coordinates filled in on an address rescan the businesses at it"""
+        addresses = [
+            Address.objects.create(street_1=street, city="Frederick", state="MD", zip="21701")
+            for street in ["4607 Wedgewood Blvd", "4607 Wedgewood Boulevard Suite A"]
+        ]
+        self.monocacy.address = addresses[0]
+        self.monocacy.save()
+        self.monocacy_co.address = addresses[1]
+        self.monocacy_co.save()
+
+        detector = DuplicateDetector()
+        update_candidates(detector, method="geo")
+        self.assertEqual(stored_candidates(detector.version("geo")), [])
+
+        # As the pipeline backfills coordinates: the businesses are not saved
+        Address.objects.filter(pk__in=[address.pk for address in addresses]).update(
+            latitude="39.41431480", longitude="-77.41010073", updated_at=timezone.now()
+        )
+        run = update_candidates(detector, method="geo")
+        self.assertTrue(run.incremental)
+        self.assertEqual(run.businesses_compared, 2)
+        self.assertEqual(
+            self.pair_ids(stored_candidates(detector.version("geo"))),
+            {(self.monocacy.id, self.monocacy_co.id)},
+        )
+
+    def test_methods_are_stored_separately(self):
+        Business.objects.create(
+            name="Monocacy Brewing",
+            slug="monocacy-brewing",
+            phone_numbers=["(240) 422-4449"],
+        )
+        detector = DuplicateDetector()
+        update_candidates(detector, method="phone")
+        update_candidates(detector, method="name")
+
+        phone_candidates = DuplicateCandidate.objects.filter(
+            detector_version=detector.version("phone")
+        )
+        self.assertEqual(phone_candidates.count(), 1)
+        self.assertEqual(
+            phone_candidates.get().reasons, ["phone_match: 2404224449"]
+        )
+        # Each method's results are stored under their own version
+        self.assertEqual(
+            len(stored_candidates(detector.version("name"))), 3
+        )
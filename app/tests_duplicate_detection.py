@@ -1,8 +1,17 @@
 """
 Unit tests for duplicate detection functionality
 """
-from django.test import TestCase
+import random
+from difflib import SequenceMatcher
+from itertools import combinations
+
+from django.test import SimpleTestCase, TestCase
+from django.utils.text import slugify
+from app.blocking import candidate_name_pairs
+from app.geo import haversine_m, nearby_pairs
 from app.models import Business, Address, BusinessCategory
+from app.similarity import KERNELS, bounded_levenshtein
+from app.tfidf import cosine, similar_name_pairs, tfidf_vectors
 from app.duplicate_detection import DuplicateDetector
 
 
@@ -376,6 +385,22 @@ class DuplicateDetectorTest(TestCase):
             self.assertIn("address_exact", reason)
             self.assertIn("50 Citizens Way", reason)
     
+    def test_find_address_duplicates_normalized(self):
+        """Equivalent addresses on different Address rows should match, in one query"""
+        detector = DuplicateDetector()
+        with self.assertNumQueries(1):
+            candidates = detector.find_address_duplicates()
+        
+        monocacy_pair = {self.monocacy_brewing_1.id, self.monocacy_brewing_2.id}
+        matches = [c for c in candidates if {c[0].id, c[1].id} == monocacy_pair]
+        self.assertEqual(len(matches), 1, "1781 North Market Street should match 1781 N Market St")
+        self.assertEqual(matches[0][2], 1.0)
+        self.assertIn("address_normalized", matches[0][3])
+        
+        # Different street numbers or cities are not matched
+        deleon_pair = {self.deleon_frederick.id, self.deleon_gaithersburg.id}
+        self.assertFalse([c for c in candidates if {c[0].id, c[1].id} == deleon_pair])
+    
     def test_find_phone_duplicates(self):
         """Test finding businesses with same phone numbers"""
         detector = DuplicateDetector()
@@ -423,6 +448,30 @@ class DuplicateDetectorTest(TestCase):
         self.assertIsNotNone(financial_website_match, "Should find Financial Services website duplicate")
         self.assertIn("cnafinancialservices.com", financial_website_match[3])
     
+    def test_contact_duplicates_are_complete(self):
+        """A cluster of three businesses sharing a phone and website gives all three pairs"""
+        cluster = [
+            Business.objects.create(
+                name=name, slug=slugify(name),
+                phone_numbers=["301-555-0100"], website_url="https://www.cluster.example.com/",
+            )
+            for name in ["Cluster One", "Cluster Two", "Cluster Three"]
+        ]
+        expected = {(cluster[0].id, cluster[1].id), (cluster[0].id, cluster[2].id), (cluster[1].id, cluster[2].id)}
+        
+        detector = DuplicateDetector()
+        with self.assertNumQueries(2):
+            phone_candidates = detector.find_phone_duplicates()
+        self.assertEqual({(b1.id, b2.id) for b1, b2, _, _ in phone_candidates} & expected, expected)
+        
+        website_candidates = [
+            candidate for candidate in detector.find_website_duplicates()
+            if candidate[0] in cluster and candidate[1] in cluster
+        ]
+        self.assertEqual({(b1.id, b2.id) for b1, b2, _, _ in website_candidates}, expected)
+        for _, _, score, reason in website_candidates:
+            self.assertEqual(reason, "website_match: cluster.example.com")
+    
     def test_find_all_duplicates_deduplication(self):
         """Test that find_all_duplicates removes duplicate pairs"""
         detector = DuplicateDetector(threshold=0.8)
@@ -444,6 +493,18 @@ class DuplicateDetectorTest(TestCase):
         
         self.assertEqual(len(centro_pairs), 1, "Centro Hispano should appear only once despite multiple match types")
     
+    def test_all_methods_share_one_snapshot(self):
+        """Every method reads one snapshot: one business query plus one per contact kind"""
+        detector = DuplicateDetector(threshold=0.8)
+        with self.assertNumQueries(3):
+            candidates = detector.find_all_duplicates()
+        
+        # Candidate businesses are built from the snapshot, other fields deferred
+        business1 = candidates[0][0]
+        self.assertEqual(business1, Business.objects.get(pk=business1.id))
+        self.assertEqual(business1.get_deferred_fields() & {"name", "normalized_name"}, set())
+        self.assertIn("phone_numbers", business1.get_deferred_fields())
+
     def test_threshold_filtering(self):
         """Test that threshold properly filters results"""
         # High threshold should find fewer matches
@@ -544,4 +605,214 @@ class DuplicateDetectorTest(TestCase):
         # Should not crash, and should not match empty names
         for business1, business2, score, reason in candidates:
             self.assertNotEqual(business1.name.strip(), "")
-            self.assertNotEqual(business2.name.strip(), "")
\ No newline at end of file
+            self.assertNotEqual(business2.name.strip(), "")
+    
+    def test_blocking_matches_brute_force(self):
+        """Blocked candidate generation should find exactly the brute-force name pairs"""
+        Business.objects.create(name="Monocacy Brewing", slug="monocacy-brewing")
+        Business.objects.create(name="Monocacy Brew Co", slug="monocacy-brew-co")
+        Business.objects.create(name="AB", slug="ab")
+        Business.objects.create(name="BA", slug="ba")
+        
+        for threshold in [0.5, 0.6, 0.7, 0.8, 0.9, 1.0]:
+            brute_force = DuplicateDetector(threshold=threshold).find_name_duplicates()
+            blocked = DuplicateDetector(threshold=threshold, blocking=True).find_name_duplicates()
+            self.assertEqual(blocked, brute_force, f"Blocking changed results at threshold {threshold}")
+
+    
+    def test_jobs_match_serial(self):
+        """Sharding name scoring across processes should not change the results"""
+        serial = DuplicateDetector(threshold=0.8).find_name_duplicates()
+        self.assertEqual(DuplicateDetector(threshold=0.8, jobs=2).find_name_duplicates(), serial)
+        self.assertEqual(
+            DuplicateDetector(threshold=0.8, jobs=2, blocking=True).find_name_duplicates(),
+            serial
+        )
+    
+    def test_tfidf_engine_recall(self):
+        """The TF-IDF engine should find the same fixture pairs as SequenceMatcher"""
+        def pair_ids(candidates):
+            return {tuple(sorted([b1.id, b2.id])) for b1, b2, _, _ in candidates}
+        
+        sequence_pairs = pair_ids(DuplicateDetector(threshold=0.8).find_name_duplicates())
+        tfidf_candidates = DuplicateDetector(threshold=0.8, engine='tfidf').find_name_duplicates()
+        tfidf_pairs = pair_ids(tfidf_candidates)
+        
+        recall = len(sequence_pairs & tfidf_pairs) / len(sequence_pairs)
+        self.assertEqual(recall, 1.0, f"TF-IDF missed {sequence_pairs - tfidf_pairs}")
+        self.assertEqual(tfidf_pairs, sequence_pairs, "TF-IDF should not add false positives")
+        
+        for business1, business2, score, reason in tfidf_candidates:
+            self.assertGreaterEqual(score, 0.8)
+            self.assertLessEqual(score, 1.0)
+            self.assertTrue(reason.startswith('name_tfidf:'))
+    
+    def test_tfidf_pairs_match_brute_force(self):
+        """Leaving frequent n-grams out of the index should not lose any pair"""
+        names = list(Business.objects.values_list('normalized_name', flat=True))
+        names += ['the frederick co', 'the frederick inn', 'frederick co', '']
+        vectors = tfidf_vectors(names)
+        for threshold in [0.3, 0.5, 0.8, 1.0]:
+            expected = [
+                (i, j, cosine(vectors[i], vectors[j]))
+                for i, j in combinations(range(len(names)), 2)
+                if names[i] and names[j]
+            ]
+            expected = [result for result in expected if result[2] >= threshold]
+            pairs = similar_name_pairs(names, threshold, chunk_size=3)
+            self.assertEqual([pair[:2] for pair in pairs], [pair[:2] for pair in expected])
+            for (_, _, score), (_, _, expected_score) in zip(pairs, expected):
+                self.assertAlmostEqual(score, expected_score)
+    
+    def test_sequence_kernel_parity(self):
+        """The bounded sequence kernel should give SequenceMatcher's exact scores"""
+        names = list(Business.objects.values_list('normalized_name', flat=True))
+        pairs = list(combinations(range(len(names)), 2))
+        for threshold in [0.5, 0.8, 0.9, 1.0]:
+            expected = [
+                (i, j, SequenceMatcher(None, names[i], names[j]).ratio())
+                for i, j in pairs
+            ]
+            expected = [result for result in expected if result[2] >= threshold]
+            self.assertEqual(KERNELS['sequence'].score_pairs(names, pairs, threshold), expected)
+    
+    def test_levenshtein_engine(self):
+        """The Levenshtein engine should find the near-identical fixture names"""
+        candidates = DuplicateDetector(threshold=0.8, engine='levenshtein').find_name_duplicates()
+        names = {
+            frozenset([business1.name, business2.name]): score
+            for business1, business2, score, reason in candidates
+        }
+        self.assertIn(frozenset(["Monocacy Brewing Company", "Monocacy Brewing CO"]), names)
+        self.assertIn(frozenset(["Centro Hispano de Frederick, Inc.", "Centro Hispano De Frederick"]), names)
+        for business1, business2, score, reason in candidates:
+            self.assertTrue(reason.startswith('name_levenshtein:'))
+            a, b = business1.normalized_name, business2.normalized_name
+            distance = bounded_levenshtein(a, b, max(len(a), len(b)))
+            self.assertAlmostEqual(score, 1 - distance / max(len(a), len(b)))
+    
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            DuplicateDetector(engine='soundex')
+
+
+class CandidateNamePairsTest(SimpleTestCase):
+    """Blocked candidates must include every pair reaching the threshold"""
+    
+    def test_no_pair_above_threshold_is_pruned(self):
+        rng = random.Random(0)
+        for alphabet in ["ab", "abc ", "abcdefghij "]:
+            names = [
+                "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 16)))
+                for _ in range(60)
+            ]
+            for threshold in [0.5, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95, 1.0]:
+                expected = {
+                    (i, j)
+                    for i, j in combinations(range(len(names)), 2)
+                    if names[i] and names[j]
+                    and SequenceMatcher(None, names[i], names[j]).ratio() >= threshold
+                }
+                candidates = set(candidate_name_pairs(names, threshold))
+                self.assertLessEqual(expected, candidates, f"{alphabet!r} at {threshold}")
+    
+    def test_changed_only_generates_their_pairs(self):
+        rng = random.Random(1)
+        names = [
+            "".join(rng.choice("abc ") for _ in range(rng.randint(0, 16)))
+            for _ in range(60)
+        ]
+        changed = set(rng.sample(range(len(names)), 8))
+        for threshold in [0.5, 0.7, 0.8, 0.9, 1.0]:
+            expected = [
+                (i, j) for i, j in candidate_name_pairs(names, threshold)
+                if i in changed or j in changed
+            ]
+            self.assertEqual(candidate_name_pairs(names, threshold, changed=changed), expected)
+    
+    def test_dissimilar_pairs_are_pruned(self):
+        names = ["frederick coffee", "frederick coffe", "catoctin dental", "xyz"]
+        self.assertEqual(candidate_name_pairs(names, 0.8), [(0, 1)])
+
+
+class BoundedLevenshteinTest(SimpleTestCase):
+    """Early termination must never change a distance within the budget"""
+    
+    @staticmethod
+    def levenshtein(a, b):
+        previous = list(range(len(b) + 1))
+        for i, char_a in enumerate(a, 1):
+            current = [i]
+            for j, char_b in enumerate(b, 1):
+                current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+            previous = current
+        return previous[-1]
+    
+    def test_matches_full_distance(self):
+        rng = random.Random(0)
+        for _ in range(300):
+            a = "".join(rng.choice("abc ") for _ in range(rng.randint(0, 12)))
+            b = "".join(rng.choice("abc ") for _ in range(rng.randint(0, 12)))
+            distance = self.levenshtein(a, b)
+            for max_distance in range(0, 13):
+                expected = distance if distance <= max_distance else None
+                self.assertEqual(bounded_levenshtein(a, b, max_distance), expected, f"{a!r} {b!r}")
+    
+    def test_kernel_matches_unbounded_scores(self):
+        rng = random.Random(1)
+        names = ["".join(rng.choice("abcd ") for _ in range(rng.randint(1, 14))) for _ in range(50)]
+        pairs = list(combinations(range(len(names)), 2))
+        for threshold in [0.5, 0.7, 0.8, 0.9, 1.0]:
+            expected = []
+            for i, j in pairs:
+                longest = max(len(names[i]), len(names[j]))
+                similarity = 1 - self.levenshtein(names[i], names[j]) / longest
+                if similarity >= threshold:
+                    expected.append((i, j, similarity))
+            self.assertEqual(KERNELS['levenshtein'].score_pairs(names, pairs, threshold), expected)
+
+
+class GeoDuplicatesTest(TestCase):
+    """Nearby businesses with similar names should be found through the grid index"""
+    
+    def setUp(self):
+        def business(name, latitude, longitude):
+            address = Address.objects.create(
+                street_1=name, city="Frederick", state="MD", zip="21701",
+                latitude=latitude, longitude=longitude,
+            )
+            return Business.objects.create(name=name, slug=name.lower().replace(" ", "-"), address=address)
+        
+        self.brewery = business("Monocacy Brewing Company", "39.41431480", "-77.41010073")
+        # ~11 m away
+        self.brewery_nearby = business("Monocacy Brewing", "39.41441480", "-77.41010073")
+        # Same building, different business
+        self.salon = business("Spires Salon", "39.41431480", "-77.41010073")
+        # ~1.1 km away
+        self.brewery_far = business("Monocacy Brewing Co", "39.42431480", "-77.41010073")
+    
+    def test_find_geo_duplicates(self):
+        candidates = DuplicateDetector().find_geo_duplicates(radius_m=50)
+        pairs = {(b1.id, b2.id) for b1, b2, _, _ in candidates}
+        
+        self.assertEqual(pairs, {(self.brewery.id, self.brewery_nearby.id)})
+        _, _, score, reason = candidates[0]
+        self.assertGreater(score, 0.8)
+        self.assertIn("geo_proximity: 11m apart", reason)
+    
+    def test_radius(self):
+        candidates = DuplicateDetector().find_geo_duplicates(radius_m=5000)
+        pairs = {(b1.id, b2.id) for b1, b2, _, _ in candidates}
+        self.assertIn((self.brewery.id, self.brewery_far.id), pairs)
+        self.assertNotIn((self.brewery.id, self.salon.id), pairs)
+    
+    def test_nearby_pairs_matches_all_pairs(self):
+        rng = random.Random(0)
+        points = [(39.41 + rng.random() / 100, -77.41 + rng.random() / 100) for _ in range(200)]
+        for radius_m in [10, 100, 500]:
+            expected = {
+                (i, j)
+                for i, j in combinations(range(len(points)), 2)
+                if haversine_m(*points[i], *points[j]) <= radius_m
+            }
+            self.assertEqual({(i, j) for i, j, _ in nearby_pairs(points, radius_m)}, expected)
@@ -0,0 +1,72 @@
+"""
+Unit tests for streaming duplicate reports
+"""
+import csv
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from app.duplicate_reports import write_csv, write_ndjson
+from app.models import Address, Business, BusinessCategory
+
+
+class DuplicateReportTest(TestCase):
+    """Reports should take a constant number of queries however many pairs they hold"""
+
+    def setUp(self):
+        category = BusinessCategory.objects.create(name="Accounting", slug="accounting")
+        self.businesses = []
+        for i in range(12):
+            address = Address.objects.create(
+                street_1=f"{i} Market St", city="Frederick", state="MD", zip="21701"
+            )
+            business = Business.objects.create(
+                name=f"Frederick Accounting {i}",
+                slug=f"frederick-accounting-{i}",
+                address=address,
+                phone_numbers=[f"301-555-01{i:02d}"],
+            )
+            business.categories.add(category)
+            self.businesses.append(business)
+
+        # Plain instances, as returned by the detector
+        plain = list(Business.objects.order_by("pk"))
+        self.candidates = [
+            (plain[i], plain[j], 0.9, "name_fuzzy: test")
+            for i in range(len(plain))
+            for j in range(i + 1, len(plain))
+        ]
+
+    def test_ndjson_constant_queries(self):
+        output = StringIO()
+        # One query for businesses with their addresses, one for categories
+        with self.assertNumQueries(2):
+            count = write_ndjson(self.candidates, output)
+
+        lines = output.getvalue().splitlines()
+        self.assertEqual(count, 66)
+        self.assertEqual(len(lines), 66)
+        record = json.loads(lines[0])
+        self.assertEqual(record["business1"]["name"], "Frederick Accounting 0")
+        self.assertEqual(record["business1"]["address"], "0 Market St, Frederick")
+        self.assertEqual(record["business2"]["categories"], ["Accounting"])
+        self.assertEqual(record["score"], 0.9)
+
+    def test_csv_constant_queries(self):
+        output = StringIO()
+        with self.assertNumQueries(2):
+            write_csv(self.candidates, output)
+        rows = list(csv.reader(StringIO(output.getvalue())))
+        self.assertEqual(len(rows), 67)
+        self.assertEqual(len(rows[1]), 8)
+
+    def test_command_streams_ndjson_to_stdout(self):
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            "detect_duplicates", "--method", "name", "--format", "ndjson",
+            stdout=stdout, stderr=stderr,
+        )
+        records = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual(len(records), 66)
+        self.assertIn("SUMMARY:", stderr.getvalue())
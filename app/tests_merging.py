@@ -0,0 +1,170 @@
+"""
+Unit tests for merging duplicate businesses
+"""
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from app.merging import merge_clusters, read_clusters_csv
+from app.models import (
+    Address,
+    Business,
+    BusinessCategory,
+    BusinessContactKey,
+    ScrapeFingerprint,
+    SocialMediaLink,
+)
+
+
+class MergeClustersTest(TestCase):
+    def setUp(self):
+        self.bakery = BusinessCategory.objects.create(name="Bakery", slug="bakery")
+        self.cafe = BusinessCategory.objects.create(name="Cafe", slug="cafe")
+        self.address = Address.objects.create(
+            street_1="50 Market St", city="Frederick", state="MD", zip="21701"
+        )
+        self.survivor = Business.objects.create(
+            name="Frederick Bakery",
+            slug="frederick-bakery",
+            phone_numbers=["301-555-0100"],
+            contacts=["Alice"],
+            extra={"source": "chamber", "rating": 4},
+        )
+        self.survivor.categories.add(self.bakery)
+        SocialMediaLink.objects.create(
+            business=self.survivor, name="Facebook", url="https://facebook.com/bakery"
+        )
+
+        self.duplicate = Business.objects.create(
+            name="Frederick Bakery LLC",
+            slug="frederick-bakery-llc",
+            address=self.address,
+            website_url="https://frederickbakery.example.com",
+            downtown_frederick_id="frederick-bakery",
+            phone_numbers=["(301) 555-0100", "301-555-0199"],
+            contacts=["Alice", "Bob"],
+            extra={"source": "downtown", "hours": "9-5"},
+        )
+        self.duplicate.categories.add(self.bakery, self.cafe)
+        SocialMediaLink.objects.create(
+            business=self.duplicate, name="Facebook", url="https://facebook.com/bakery2"
+        )
+        SocialMediaLink.objects.create(
+            business=self.duplicate, name="Instagram", url="https://instagram.com/bakery"
+        )
+        ScrapeFingerprint.objects.create(
+            source="downtown_frederick", external_id="frederick-bakery",
+            fingerprint="abc", business=self.duplicate,
+        )
+
+    def test_merge(self):
+        with self.assertNumQueries(20):
+            plans = merge_clusters([[self.duplicate.pk, self.survivor.pk]])
+
+        self.assertEqual(len(plans), 1)
+        self.assertFalse(Business.objects.filter(pk=self.duplicate.pk).exists())
+        survivor = Business.objects.get(pk=self.survivor.pk)
+        self.assertEqual(survivor.phone_numbers, ["301-555-0100", "301-555-0199"])
+        self.assertEqual(survivor.contacts, ["Alice", "Bob"])
+        self.assertEqual(survivor.extra, {"source": "chamber", "rating": 4, "hours": "9-5"})
+        self.assertEqual(survivor.address_id, self.address.pk)
+        self.assertEqual(survivor.downtown_frederick_id, "frederick-bakery")
+        self.assertEqual(survivor.normalized_website, "frederickbakery.example.com")
+        self.assertEqual(
+            sorted(survivor.categories.values_list("name", flat=True)), ["Bakery", "Cafe"]
+        )
+        self.assertEqual(
+            sorted(SocialMediaLink.objects.filter(business=survivor).values_list("name", "url")),
+            [("Facebook", "https://facebook.com/bakery"), ("Instagram", "https://instagram.com/bakery")],
+        )
+        self.assertEqual(ScrapeFingerprint.objects.get().business_id, survivor.pk)
+        self.assertEqual(
+            sorted(BusinessContactKey.objects.filter(business=survivor).values_list("kind", "value")),
+            [("phone", "3015550100"), ("phone", "3015550199"), ("website", "frederickbakery.example.com")],
+        )
+
+    def test_dry_run(self):
+        plans = merge_clusters([[self.survivor.pk, self.duplicate.pk]], dry_run=True)
+        self.assertTrue(Business.objects.filter(pk=self.duplicate.pk).exists())
+        self.assertEqual(SocialMediaLink.objects.filter(business=self.survivor).count(), 1)
+
+        plan = plans[0]
+        self.assertEqual(plan.survivor.pk, self.survivor.pk)
+        self.assertEqual(len(plan.moved_links), 1)
+        self.assertEqual(len(plan.dropped_links), 1)
+        self.assertEqual(plan.added_categories, [self.cafe.pk])
+        self.assertEqual(plan.changes["contacts"], (["Alice"], ["Alice", "Bob"]))
+        self.assertIn("  categories: 1 added", plan.describe())
+
+    def test_missing_and_repeated_businesses(self):
+        plans = merge_clusters([[self.survivor.pk, 999], [self.survivor.pk, self.duplicate.pk]])
+        self.assertEqual(len(plans), 1)
+        self.assertEqual(merge_clusters([[self.survivor.pk, self.duplicate.pk]]), [])
+
+    def test_read_clusters_csv(self):
+        pairs = StringIO(
+            "business1_id,business1_name,business1_address,business2_id,business2_name,"
+            "business2_address,score,match_reason\n"
+            "1,a,,2,b,,0.9,x\n3,c,,2,b,,0.9,x\n5,e,,6,f,,0.9,x\n"
+        )
+        self.assertEqual(read_clusters_csv(pairs), [[1, 2, 3], [5, 6]])
+
+    def test_cluster_csv_is_refused(self):
+        """Cluster CSVs have no pair scores or reasons to filter on"""
+        clusters = StringIO(
+            "cluster,cluster_score,business_id,business_name,business_address\n"
+            "1,0.9,4,a,\n1,0.9,2,b,\n"
+        )
+        with self.assertRaises(ValueError):
+            read_clusters_csv(clusters)
+
+    def test_read_clusters_csv_filters_pairs(self):
+        """Weak pairs and pairs without the required signals don't join clusters"""
+        pairs = StringIO(
+            "business1_id,business1_name,business1_address,business2_id,business2_name,"
+            "business2_address,score,match_reason\n"
+            '1,a,,2,b,,0.95,"name_fuzzy: ""a"" <-> ""b"""\n'
+            "2,b,,3,c,,1.000,address_exact: 50 Market St, Frederick\n"
+            "4,d,,5,e,,1.000,phone_match: 3015550100\n"
+            '5,e,,4,d,,0.92,"name_fuzzy: ""e"" <-> ""d""; website_match: e.com"\n'
+            '6,f,,7,g,,0.85,"name_fuzzy: ""f"" <-> ""g"""\n'
+        )
+        self.assertEqual(
+            read_clusters_csv(pairs, min_score=0.9, required_signals=["name"]),
+            [[1, 2], [4, 5]],
+        )
+
+    def test_command_dry_run_by_default(self):
+        stdout = StringIO()
+        call_command("merge_duplicates", "--min-score", "0.7", stdout=stdout)
+        output = stdout.getvalue()
+        self.assertIn(f"into #{self.survivor.pk} 'Frederick Bakery'", output)
+        self.assertIn("DRY RUN: 1 clusters would be merged, removing 1 businesses.", output)
+        self.assertTrue(Business.objects.filter(pk=self.duplicate.pk).exists())
+
+    def test_command_requires_name_signal(self):
+        """A shared phone number alone doesn't merge businesses"""
+        stdout = StringIO()
+        call_command("merge_duplicates", "--method", "phone", "--min-score", "0.7", "--apply", stdout=stdout)
+        self.assertIn("Merged 0 clusters", stdout.getvalue())
+        self.assertTrue(Business.objects.filter(pk=self.duplicate.pk).exists())
+
+    def test_command_apply(self):
+        stdout = StringIO()
+        call_command("merge_duplicates", "--min-score", "0.7", "--apply", stdout=stdout)
+        self.assertIn("Merged 1 clusters, removing 1 businesses", stdout.getvalue())
+        self.assertFalse(Business.objects.filter(pk=self.duplicate.pk).exists())
+
+    def test_command_refuses_cluster_csv(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "clusters.csv")
+        call_command(
+            "detect_duplicates", "--clusters", "--format", "csv", "--min-score", "0.7",
+            "--output", path, stdout=StringIO(),
+        )
+        with self.assertRaisesMessage(CommandError, "cluster CSVs can't be filtered"):
+            call_command("merge_duplicates", "--input", path, "--apply", stdout=StringIO())
+        self.assertTrue(Business.objects.filter(pk=self.duplicate.pk).exists())
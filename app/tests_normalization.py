@@ -0,0 +1,171 @@
+"""
+Unit tests for match key normalization
+"""
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from app.models import Address, Business, BusinessContactKey
+from app.normalization import normalize_address_key, normalize_phone_numbers
+
+
+class NormalizeAddressKeyTest(TestCase):
+    """Test the normalized address key used to match equivalent addresses"""
+
+    def test_street_variants_share_key(self):
+        """Suffixes, directionals, case and punctuation should not matter"""
+        self.assertEqual(
+            normalize_address_key("1781 North Market Street", "Frederick", "MD", "21701"),
+            normalize_address_key("1781 N. Market St", "frederick ", "md", "21701-1234"),
+        )
+        self.assertEqual(
+            normalize_address_key("5 Willowdale Drive, Suite 18", "Frederick", "MD", "21703"),
+            "5 willowdale dr ste 18|frederick|md|21703",
+        )
+
+    def test_different_addresses_differ(self):
+        """Different street numbers or zips should give different keys"""
+        self.assertNotEqual(
+            normalize_address_key("1781 N Market St", "Frederick", "MD", "21701"),
+            normalize_address_key("1782 N Market St", "Frederick", "MD", "21701"),
+        )
+        self.assertNotEqual(
+            normalize_address_key("50 Citizens Way", "Frederick", "MD", "21703"),
+            normalize_address_key("50 Citizens Way", "Frederick", "MD", "21701"),
+        )
+
+    def test_edge_cases(self):
+        """Missing street gives an empty key; missing components are allowed"""
+        self.assertEqual(normalize_address_key("", "Frederick", "MD", "21701"), "")
+        self.assertEqual(normalize_address_key(None, None, None, None), "")
+        self.assertEqual(normalize_address_key("5 New Rd", None, None, None), "5 new rd|||")
+
+    def test_address_save_sets_key(self):
+        """Saving an Address keeps normalized_key in sync"""
+        address = Address.objects.create(
+            street_1="150 S. East Street, Suite 103",
+            city="Frederick",
+            state="MD",
+            zip="21701",
+        )
+        self.assertEqual(address.normalized_key, "150 s e st ste 103|frederick|md|21701")
+
+        address.street_1 = "151 S. East Street"
+        address.save()
+        self.assertEqual(address.normalized_key, "151 s e st|frederick|md|21701")
+
+    def test_address_save_update_fields_includes_key(self):
+        """Saving with update_fields also writes a changed normalized_key"""
+        address = Address.objects.create(street_1="50 Citizens Way", city="Frederick", state="MD")
+
+        address.zip = "21701"
+        address.save(update_fields=["zip"])
+        address.refresh_from_db()
+        self.assertEqual(address.normalized_key, "50 citizens way|frederick|md|21701")
+
+
+class BusinessNormalizedKeysTest(TestCase):
+    """Test the persisted normalized name, website and phone keys on Business"""
+
+    def test_phone_numbers(self):
+        """Country codes are dropped, short numbers skipped and repeats removed"""
+        self.assertEqual(
+            normalize_phone_numbers(["+1 (301) 555-0100", "301.555.0100", "555-0100", "3015550199"]),
+            ["3015550100", "3015550199"],
+        )
+        self.assertEqual(normalize_phone_numbers(None), [])
+
+    def test_save_sets_keys(self):
+        """Saving a Business keeps its normalized keys in sync"""
+        business = Business.objects.create(
+            name="Monocacy Brewing Company",
+            slug="monocacy-brewing-company",
+            website_url="https://www.monocacybrewing.com/",
+            phone_numbers=["(240) 422-4449"],
+        )
+        self.assertEqual(business.normalized_name, "monocacy brewing")
+        self.assertEqual(business.normalized_website, "monocacybrewing.com")
+        self.assertEqual(business.normalized_phone_numbers, ["2404224449"])
+
+        business.name = "Monocacy Brewing Co."
+        business.website_url = None
+        business.save()
+        self.assertEqual(business.normalized_name, "monocacy brewing")
+        self.assertEqual(business.normalized_website, "")
+
+    def test_save_update_fields_includes_keys(self):
+        """Saving with update_fields also writes the normalized keys that changed"""
+        business = Business.objects.create(
+            name="Octavo Designs",
+            slug="octavo-designs",
+            phone_numbers=["301-662-9944"],
+        )
+
+        business.name = "Flying Dog Brewery"
+        business.phone_numbers = ["240-555-0101"]
+        business.save(update_fields=["name", "phone_numbers"])
+        business.refresh_from_db()
+        self.assertEqual(business.normalized_name, "flying dog brewery")
+        self.assertEqual(business.normalized_phone_numbers, ["2405550101"])
+        self.assertEqual(
+            set(business.contact_keys.values_list("kind", "value")),
+            {(BusinessContactKey.PHONE, "2405550101")},
+        )
+
+    def test_save_syncs_contact_keys(self):
+        """Contact key rows follow the normalized phone numbers and website"""
+        business = Business.objects.create(
+            name="PPR Strategies",
+            slug="ppr-strategies",
+            website_url="https://pprstrategies.com/",
+            phone_numbers=["301-662-9944", "+1 301 662 9944"],
+        )
+
+        def contact_keys():
+            return set(business.contact_keys.values_list("kind", "value"))
+
+        self.assertEqual(
+            contact_keys(),
+            {(BusinessContactKey.PHONE, "3016629944"), (BusinessContactKey.WEBSITE, "pprstrategies.com")},
+        )
+
+        business.website_url = None
+        business.phone_numbers = ["240-555-0101"]
+        business.save()
+        self.assertEqual(contact_keys(), {(BusinessContactKey.PHONE, "2405550101")})
+
+    def test_backfill_command(self):
+        """The backfill command fixes rows written without their keys"""
+        Business.objects.bulk_create([
+            Business(name="Octavo Designs", slug="octavo-designs", website_url="http://octavodesigns.com"),
+            Business(name="PPR Strategies", slug="ppr-strategies", phone_numbers=["301-662-9944"]),
+        ])
+        self.assertEqual(Business.objects.filter(normalized_name="").count(), 2)
+
+        call_command("backfill_normalized_keys", "--dry-run", stdout=StringIO())
+        self.assertEqual(Business.objects.filter(normalized_name="").count(), 2)
+
+        call_command("backfill_normalized_keys", stdout=StringIO())
+        octavo = Business.objects.get(slug="octavo-designs")
+        self.assertEqual(octavo.normalized_name, "octavo designs")
+        self.assertEqual(octavo.normalized_website, "octavodesigns.com")
+        ppr = Business.objects.get(slug="ppr-strategies")
+        self.assertEqual(ppr.normalized_phone_numbers, ["3016629944"])
+
+    def test_backfill_repairs_contact_keys_and_addresses(self):
+        """Rows with current keys but no contact keys, and stale addresses, are fixed"""
+        address = Address.objects.create(street_1="50 Citizens Way", city="Frederick", state="MD", zip="21701")
+        Address.objects.filter(pk=address.pk).update(normalized_key="")
+        business = Business.objects.create(
+            name="Octavo Designs", slug="octavo-designs", phone_numbers=["301-662-9944"], address=address,
+        )
+        # As after loaddata: the normalized fields are stored, the contact keys are not
+        BusinessContactKey.objects.all().delete()
+
+        call_command("backfill_normalized_keys", stdout=StringIO())
+        self.assertEqual(
+            set(business.contact_keys.values_list("kind", "value")),
+            {(BusinessContactKey.PHONE, "3016629944")},
+        )
+        address.refresh_from_db()
+        self.assertEqual(address.normalized_key, "50 citizens way|frederick|md|21701")
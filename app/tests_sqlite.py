@@ -0,0 +1,71 @@
+"""
+Unit tests for the SQLite connection profiles
+"""
+import os
+import tempfile
+
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TestCase, TransactionTestCase
+from app.sqlite import use_sqlite_profile
+
+PROFILE_PRAGMAS = ('journal_mode', 'synchronous', 'cache_size')
+
+
+def read_pragmas(connection):
+    with connection.cursor() as cursor:
+        values = {}
+        for pragma in PROFILE_PRAGMAS:
+            cursor.execute(f'PRAGMA {pragma}')
+            values[pragma] = cursor.fetchone()[0]
+        return values
+
+
+class NewConnectionTest(TestCase):
+    """Connections opened while a profile is active get its PRAGMAs"""
+
+    def open_file_connection(self):
+        # WAL needs a database file; the test database lives in memory
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        new_connection = DatabaseWrapper({
+            **connection.settings_dict,
+            'NAME': os.path.join(directory.name, 'db.sqlite3'),
+        })
+        self.addCleanup(new_connection.close)
+        new_connection.ensure_connection()
+        return new_connection
+
+    def test_profile_pragmas_are_set(self):
+        with use_sqlite_profile('ingest'):
+            new_connection = self.open_file_connection()
+            self.assertEqual(
+                read_pragmas(new_connection),
+                {'journal_mode': 'wal', 'synchronous': 1, 'cache_size': -65536},
+            )
+
+    def test_connection_in_atomic_block_is_skipped(self):
+        # TestCase runs every test inside a transaction
+        self.assertTrue(connection.in_atomic_block)
+        before = read_pragmas(connection)
+        with use_sqlite_profile('ingest'):
+            self.assertEqual(read_pragmas(connection), before)
+
+
+class OpenConnectionTest(TransactionTestCase):
+    """Open connections switch profiles and go back when the block exits"""
+
+    def test_previous_values_are_restored(self):
+        connection.ensure_connection()
+        before = read_pragmas(connection)
+
+        with use_sqlite_profile('ingest'):
+            self.assertEqual(read_pragmas(connection)['cache_size'], -65536)
+            with use_sqlite_profile('read'):
+                during = read_pragmas(connection)
+                self.assertEqual(during['cache_size'], -131072)
+                # The read profile leaves synchronous alone
+                self.assertEqual(during['synchronous'], before['synchronous'])
+            self.assertEqual(read_pragmas(connection)['synchronous'], 1)
+
+        self.assertEqual(read_pragmas(connection), before)
@@ -0,0 +1,106 @@
+"""
+Character n-gram TF-IDF similarity for business names
+
+Names become sparse, L2-normalized TF-IDF vectors over padded character
+trigrams; pairs are scored by cosine similarity through an inverted index,
+so only names sharing at least one n-gram are ever compared.  Rare n-grams
+(distinctive words) weigh more than common ones like "the" or "ing".
+
+Frequent n-grams (" co", "ing", ...) would make nearly every name a
+candidate for every other one, so each name leaves its most frequent
+n-grams out of the index as far as the threshold allows; see
+``similar_name_pairs``.
+"""
+import math
+from collections import Counter, defaultdict
+
+NGRAM_SIZE = 3
+# Names whose candidates are gathered and scored together
+ROW_CHUNK_SIZE = 1000
+
+
+def char_ngrams(text: str, n: int = NGRAM_SIZE) -> Counter:
+    """Character n-grams of ``text`` padded with spaces, so word edges count"""
+    padded = f" {text} "
+    return Counter(padded[i : i + n] for i in range(len(padded) - n + 1))
+
+
+def tfidf_vectors(names: list[str], n: int = NGRAM_SIZE) -> list[dict[str, float]]:
+    """L2-normalized TF-IDF vectors for ``names`` (empty names give empty vectors)"""
+    counts = [char_ngrams(name, n) if name else Counter() for name in names]
+    document_frequency = Counter(gram for grams in counts for gram in grams)
+    documents = sum(1 for grams in counts if grams)
+    # Smoothed idf, as in scikit-learn's TfidfVectorizer
+    idf = {
+        gram: math.log((1 + documents) / (1 + frequency)) + 1
+        for gram, frequency in document_frequency.items()
+    }
+
+    vectors = []
+    for grams in counts:
+        weights = {gram: count * idf[gram] for gram, count in grams.items()}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+        vectors.append({gram: weight / norm for gram, weight in weights.items()})
+    return vectors
+
+
+def cosine(vector: dict[str, float], other: dict[str, float]) -> float:
+    if len(vector) > len(other):
+        vector, other = other, vector
+    # Rounding can push identical vectors slightly above 1
+    return min(sum(weight * other.get(gram, 0.0) for gram, weight in vector.items()), 1.0)
+
+
+def similar_name_pairs(
+    names: list[str],
+    threshold: float,
+    n: int = NGRAM_SIZE,
+    stats: dict | None = None,
+    chunk_size: int = ROW_CHUNK_SIZE,
+) -> list[tuple[int, int, float]]:
+    """
+    ``(i, j, cosine)`` for every pair ``i < j`` of non-empty ``names`` with
+    TF-IDF cosine similarity of at least ``threshold``, sorted by ``(i, j)``
+
+    Each name is indexed under its n-grams except its most frequent ones,
+    left out while their share of its (unit) vector has a norm below
+    ``threshold``.  By Cauchy-Schwarz a name sharing none of the indexed
+    n-grams scores below the threshold, so probing with every n-gram still
+    finds every pair, while the long postings of frequent n-grams stay
+    short.  Names are scored ``chunk_size`` at a time against the names
+    indexed before them.
+
+    ``stats["compared"]`` is set to the number of candidate pairs scored.
+    """
+    vectors = tfidf_vectors(names, n)
+    document_frequency = Counter(gram for vector in vectors for gram in vector)
+
+    postings = defaultdict(list)
+    pairs = []
+    compared = 0
+
+    for start in range(0, len(vectors), chunk_size):
+        candidates = []
+        for i in range(start, min(start + chunk_size, len(vectors))):
+            vector = vectors[i]
+            matches = set()
+            for gram in vector:
+                matches.update(postings.get(gram, ()))
+            candidates.extend((j, i) for j in matches)
+
+            skipped = 0.0
+            for gram in sorted(vector, key=document_frequency.__getitem__, reverse=True):
+                skipped += vector[gram] ** 2
+                if math.sqrt(skipped) >= threshold:
+                    postings[gram].append(i)
+
+        compared += len(candidates)
+        for j, i in candidates:
+            score = cosine(vectors[i], vectors[j])
+            if score >= threshold:
+                pairs.append((j, i, score))
+
+    if stats is not None:
+        stats["compared"] = compared
+    pairs.sort()
+    return pairs
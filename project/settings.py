@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -82,6 +83,30 @@ DATABASES = {
     }
 }
 
+# PRAGMAs applied to each new SQLite connection (see app/sqlite.py).
+# `run_scraper` switches to "ingest" and read-mostly commands such as
+# `detect_duplicates` to "read"; SQLITE_PROFILE sets the default.
+SQLITE_PROFILES = {
+    "default": {},
+    "ingest": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -65536,  # KiB, i.e. 64 MiB
+        "mmap_size": 268435456,  # 256 MiB
+        "temp_store": "MEMORY",
+    },
+    # No journal_mode here: WAL persists in the database file, so only the
+    # write-heavy ingest profile switches to it
+    "read": {
+        "busy_timeout": 5000,
+        "cache_size": -131072,  # 128 MiB
+        "mmap_size": 1073741824,  # 1 GiB
+        "temp_store": "MEMORY",
+    },
+}
+SQLITE_PROFILE = os.environ.get("SQLITE_PROFILE", "default")
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
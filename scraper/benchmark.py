@@ -0,0 +1,497 @@
+"""
+Helpers for benchmarking ingestion and duplicate detection against a
+throwaway database.
+
+Item generators mimic the shape of each spider's output so the pipeline sees
+realistic repetition, payload sizes and field coverage.  The duplicate
+corpus plants perturbed copies of businesses, so detection can be scored
+against a known ground truth.
+"""
+
+import os
+import random
+import resource
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from django.db import connection
+
+from app import models
+from app.normalization import normalize_address_key
+from scraper import items
+
+STREETS = ["Market", "Patrick", "Church", "Second", "Carroll", "Bentz", "Court"]
+SUFFIXES = ["Street", "St", "Avenue", "Ave", "Road", "Rd"]
+WORDS = [
+    "Monocacy", "Catoctin", "Carroll", "Creek", "Frederick", "Market", "Spires",
+    "Brewing", "Coffee", "Dental", "Law", "Realty", "Fitness", "Bakery",
+    "Consulting", "Auto", "Salon", "Grill", "Design", "Insurance",
+]
+LOREM = (
+    "Family owned and operated in the heart of historic downtown Frederick, "
+    "serving the community with seasonal menus, local craft beverages and "
+    "friendly service seven days a week. "
+)
+
+
+@contextmanager
+def temporary_database():
+    """
+    Point the default connection at a freshly migrated SQLite file
+
+    The real database is left untouched; the file is removed on exit.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        old_name = connection.settings_dict["NAME"]
+        test_settings = connection.settings_dict.setdefault("TEST", {})
+        old_test_name = test_settings.get("NAME")
+        test_settings["NAME"] = os.path.join(directory, "benchmark.sqlite3")
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            test_settings["NAME"] = old_test_name
+
+
+class QueryCounter:
+    """``connection.execute_wrapper`` counting queries (works with DEBUG off)"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _business_name(rng: random.Random, i: int) -> str:
+    return " ".join(rng.sample(WORDS, 2)) + f" {i}"
+
+
+def _street(rng: random.Random) -> str:
+    return f"{rng.randint(1, 999)} {rng.choice(STREETS)} {rng.choice(SUFFIXES)}"
+
+
+def _phone(rng: random.Random) -> str:
+    return f"301-{rng.randint(200, 999)}-{rng.randint(0, 9999):04d}"
+
+
+def generate_frederick_chamber_items(count: int, seed: int = 0) -> list:
+    """
+    Chamber directory: crawled category by category, so a business is
+    yielded once per category it belongs to
+    """
+    rng = random.Random(seed)
+    category_count = max(1, min(200, count // 20))
+    categories = [
+        items.BusinessCategory(
+            name=f"Category {i}", chamber_of_commerce_id=f"category-{i}"
+        )
+        for i in range(category_count)
+    ]
+    listings = {category_index: [] for category_index in range(category_count)}
+    emitted = 0
+    business_index = 0
+    while emitted < count:
+        # Businesses are listed under 1-3 categories
+        for category_index in rng.sample(
+            range(category_count), min(category_count, rng.randint(1, 3))
+        ):
+            if emitted >= count:
+                break
+            listings[category_index].append(business_index)
+            emitted += 1
+        business_index += 1
+
+    businesses = {}
+    generated = []
+    for category_index, category in enumerate(categories):
+        generated.append(category)
+        for i in listings[category_index]:
+            if i not in businesses:
+                businesses[i] = dict(
+                    name=_business_name(rng, i),
+                    chamber_of_commerce_id=f"business-{i}",
+                    address=_street(rng),
+                    city="Frederick",
+                    state="MD",
+                    zip=rng.choice(["21701", "21702", "21703", "21704"]),
+                    main_contact=f"Contact {i}",
+                    phone_numbers=[_phone(rng)],
+                    website=f"https://www.business-{i}.example.com/",
+                    google_maps=f"https://maps.google.com/?q=business-{i}",
+                    social_medias=[
+                        {"name": "Facebook", "url": f"https://facebook.com/business{i}"}
+                    ],
+                )
+            generated.append(items.Business(categories=category, **businesses[i]))
+    return generated
+
+
+def generate_visit_frederick_items(count: int, seed: int = 0) -> list:
+    """
+    Visit Frederick API: large ``extra`` payloads, coordinates, and a fresh
+    category item per listing; some listings appear in several categories
+    """
+    rng = random.Random(seed)
+    category_names = [f"Visit Category {i}" for i in range(30)]
+    unique_listings = max(1, int(count * 0.8))
+    generated = []
+    for n in range(count):
+        i = n if n < unique_listings else rng.randrange(unique_listings)
+        listing_rng = random.Random(seed * 1_000_003 + i)
+        generated.append(
+            items.Business(
+                name=_business_name(listing_rng, i),
+                address=_street(listing_rng),
+                city="Frederick",
+                state="MD",
+                zip="21701",
+                latitude=f"{39.40 + listing_rng.random() / 10:.6f}",
+                longitude=f"{-77.45 + listing_rng.random() / 10:.6f}",
+                website=f"https://visit-{i}.example.com",
+                phone_numbers=[_phone(listing_rng)],
+                extra={
+                    "visit_frederick_id": str(100000 + i),
+                    "quality_score": listing_rng.randint(0, 100),
+                    "is_downtown": listing_rng.random() < 0.3,
+                    "yelp_rating": listing_rng.choice([3.5, 4.0, 4.5, 5.0]),
+                    "yelp_url": f"https://yelp.com/biz/visit-{i}",
+                    "yelp_review_count": listing_rng.randint(0, 900),
+                    "primary_image_url": f"https://img.example.com/{i}.jpg",
+                    "amenities": [f"amenity-{a}" for a in range(listing_rng.randint(0, 12))],
+                    "category_id": rng.randint(1, 300),
+                    "description": LOREM * listing_rng.randint(1, 8),
+                    "email": f"info@visit-{i}.example.com",
+                },
+            )
+        )
+        generated.append(items.BusinessCategory(name=rng.choice(category_names)))
+    return generated
+
+
+def generate_downtown_frederick_items(count: int, seed: int = 0) -> list:
+    """Downtown Frederick map API: permalink ids, coordinates and raw payloads"""
+    rng = random.Random(seed)
+    generated = []
+    for i in range(count):
+        name = _business_name(rng, i)
+        slug = name.lower().replace(" ", "-")
+        latitude = f"{39.41 + rng.random() / 100:.8f}"
+        longitude = f"{-77.41 + rng.random() / 100:.8f}"
+        address = _street(rng)
+        generated.append(
+            items.Business(
+                name=name,
+                downtown_frederick_id=slug,
+                address=address,
+                city="Frederick",
+                state="MD",
+                latitude=latitude,
+                longitude=longitude,
+                extra={
+                    "downtownfrederick_raw": {
+                        "title": name,
+                        "permalink": f"https://downtownfrederick.org/item/{slug}/",
+                        "address": address,
+                        "coordinates": {"latitude": latitude, "longitude": longitude},
+                        "image": f"https://downtownfrederick.org/img/{slug}.jpg",
+                    },
+                    "permalink": f"https://downtownfrederick.org/item/{slug}/",
+                    "source": "downtown_frederick_api",
+                },
+            )
+        )
+    return generated
+
+
+GENERATORS = {
+    "frederick_chamber": generate_frederick_chamber_items,
+    "visit_frederick": generate_visit_frederick_items,
+    "downtown_frederick": generate_downtown_frederick_items,
+}
+
+
+def generate_items(count: int, seed: int = 0, shape: str = "frederick_chamber") -> list:
+    """``count`` business items (plus category items) shaped like ``shape``'s spider"""
+    return GENERATORS[shape](count, seed=seed)
+
+
+def ingest_items(pipeline, generated: list, batch_size: int) -> float:
+    """Feed ``generated`` through ``pipeline.ingest`` in batches, returning seconds"""
+    started_at = time.perf_counter()
+    for start in range(0, len(generated), batch_size):
+        pipeline.ingest(generated[start : start + batch_size])
+    return time.perf_counter() - started_at
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process so far"""
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def current_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ======
+# Duplicate detection corpus
+#
+
+BUSINESS_TYPES = [
+    "Bakery", "Dental", "Law Group", "Realty", "Fitness", "Coffee", "Auto Repair",
+    "Salon", "Grill", "Design", "Insurance", "Consulting", "Plumbing", "Pharmacy",
+    "Brewing", "Photography", "Tax Services", "Pet Care", "Landscaping", "Tavern",
+]
+LEGAL_SUFFIXES = ["LLC", "Inc.", "Co", "Company", "Corp", "Inc"]
+CONSONANTS = "bcdfghklmnprstvz"
+VOWELS = "aeiou"
+FREDERICK_CENTER = (39.4143, -77.4105)
+
+
+@dataclass
+class DuplicateCorpus:
+    """Business records and the planted duplicate pairs among them"""
+
+    records: list = field(default_factory=list)
+    # Pairs of ``records`` positions that are the same business
+    truth: set = field(default_factory=set)
+
+
+def _word(rng: random.Random) -> str:
+    syllables = rng.randint(2, 3)
+    return "".join(
+        rng.choice(CONSONANTS) + rng.choice(VOWELS) for _ in range(syllables)
+    ).capitalize() + rng.choice(["", "", "n", "r", "s"])
+
+
+def _corpus_name(rng: random.Random) -> str:
+    pattern = rng.random()
+    business_type = rng.choice(BUSINESS_TYPES)
+    if pattern < 0.4:
+        name = f"{_word(rng)} {business_type}"
+    elif pattern < 0.6:
+        name = f"{_word(rng)} & {_word(rng)} {business_type}"
+    elif pattern < 0.8:
+        name = f"{rng.choice(WORDS)} {_word(rng)} {business_type}"
+    else:
+        name = f"The {_word(rng)} {business_type}"
+    if rng.random() < 0.3:
+        name += f" {rng.choice(LEGAL_SUFFIXES)}"
+    return name
+
+
+def _typo(rng: random.Random, name: str) -> str:
+    positions = [i for i, char in enumerate(name) if char.isalpha()]
+    if len(positions) < 2:
+        return name
+    i = rng.choice(positions[:-1])
+    kind = rng.randrange(4)
+    if kind == 0:
+        # Swap two letters
+        return name[:i] + name[i + 1] + name[i] + name[i + 2 :]
+    if kind == 1:
+        # Drop a letter
+        return name[:i] + name[i + 1 :]
+    if kind == 2:
+        # Double a letter
+        return name[:i] + name[i] + name[i:]
+    return name[:i] + rng.choice("aeiounrst") + name[i + 1 :]
+
+
+def _perturb_name(rng: random.Random, name: str) -> str:
+    """A variant of ``name`` as another source would list it"""
+    for _ in range(rng.randint(1, 2)):
+        kind = rng.randrange(5)
+        if kind == 0:
+            # Legal suffix added, dropped or swapped
+            words = name.split()
+            if words[-1].rstrip(".,") in [s.rstrip(".") for s in LEGAL_SUFFIXES]:
+                words = words[:-1]
+            if rng.random() < 0.7:
+                words.append(rng.choice(LEGAL_SUFFIXES))
+            name = " ".join(words)
+        elif kind == 1:
+            # Punctuation
+            name = rng.choice([
+                name.replace(" ", ", ", 1) if " " in name else name + ".",
+                name + ".",
+                name.replace(" ", "'s ", 1),
+                name.replace(" ", " - ", 1),
+            ])
+        elif kind == 2:
+            name = _typo(rng, name)
+        elif kind == 3:
+            name = name.replace(" & ", " and ") if "&" in name else name.replace(" and ", " & ")
+        else:
+            name = rng.choice([name.upper(), name.lower(), name.title()])
+    return name
+
+
+def _perturb_phone(rng: random.Random, digits: str) -> str:
+    area, exchange, line = digits[:3], digits[3:6], digits[6:]
+    return rng.choice([
+        f"{area}-{exchange}-{line}",
+        f"({area}) {exchange}-{line}",
+        f"{area}.{exchange}.{line}",
+        f"+1 {area} {exchange} {line}",
+    ])
+
+
+def _perturb_url(rng: random.Random, host: str) -> str:
+    return rng.choice(["https://", "http://"]) + rng.choice(["www.", ""]) + host + rng.choice(["", "/"])
+
+
+def _perturb_street(rng: random.Random, street: str) -> str:
+    for long, short in [("Street", "St"), ("Avenue", "Ave"), ("Road", "Rd"), ("North", "N.")]:
+        if long in street and rng.random() < 0.5:
+            return street.replace(long, short)
+    return street
+
+
+def generate_duplicate_corpus(
+    count: int, seed: int = 0, duplicate_rate: float = 0.2
+) -> DuplicateCorpus:
+    """
+    ``count`` business records, a ``duplicate_rate`` share of them perturbed
+    copies of another record
+
+    Copies vary the name (legal suffixes, punctuation, typos, "&"/"and",
+    case) and usually share the phone number, website and address in
+    another format.  Unrelated businesses also share addresses, as in
+    office buildings and shopping centers.  Businesses are spread at a
+    constant density, so the area grows with ``count``.
+    """
+    rng = random.Random(seed)
+    corpus = DuplicateCorpus()
+    # ~10k businesses over ~10km x 10km
+    spread = 0.045 * max(1.0, (count / 10_000) ** 0.5)
+    streets = [f"{name} {suffix}" for name in STREETS for suffix in ["Street", "Avenue", "Road"]]
+    streets += [f"{_word(rng)} {rng.choice(['Street', 'Avenue', 'Road', 'Drive'])}" for _ in range(max(10, count // 100))]
+
+    def new_address():
+        return [
+            f"{rng.randint(1, 9999)} {rng.choice(['', 'North '])}{rng.choice(streets)}",
+            "Frederick",
+            "MD",
+            rng.choice(["21701", "21702", "21703", "21704"]),
+            round(FREDERICK_CENTER[0] + rng.uniform(-spread, spread), 8),
+            round(FREDERICK_CENTER[1] + rng.uniform(-spread, spread), 8),
+        ]
+
+    buildings = [new_address() for _ in range(max(1, count // 200))]
+    used_phones = set()
+    entities = []
+    while len(corpus.records) < count:
+        if entities and rng.random() < duplicate_rate:
+            # Another source's listing of an existing business
+            entity = rng.choice(entities)
+            canonical = corpus.records[entity[0]]
+            record = {"name": _perturb_name(rng, canonical["name"])}
+            if canonical["phone"] and rng.random() < 0.6:
+                record["phone"] = canonical["phone"]
+                record["phone_numbers"] = [_perturb_phone(rng, canonical["phone"])]
+            if canonical["host"] and rng.random() < 0.5:
+                record["host"] = canonical["host"]
+                record["website_url"] = _perturb_url(rng, canonical["host"])
+            if canonical["address"] and rng.random() < 0.7:
+                address = list(canonical["address"])
+                address[0] = _perturb_street(rng, address[0])
+                record["address"] = address
+            for i in entity:
+                corpus.truth.add((i, len(corpus.records)))
+            entity.append(len(corpus.records))
+        else:
+            name = _corpus_name(rng)
+            record = {"name": name}
+            if rng.random() < 0.8:
+                phone = f"301{rng.randint(2000000, 9999999)}"
+                while phone in used_phones:
+                    phone = f"301{rng.randint(2000000, 9999999)}"
+                used_phones.add(phone)
+                record["phone"] = phone
+                record["phone_numbers"] = [_perturb_phone(rng, phone)]
+            if rng.random() < 0.6:
+                host = f"{name.lower().replace(' ', '').replace('&', 'and').rstrip('.')}-{len(corpus.records)}.com"
+                record["host"] = host
+                record["website_url"] = _perturb_url(rng, host)
+            if rng.random() < 0.9:
+                record["address"] = (
+                    list(rng.choice(buildings)) if rng.random() < 0.1 else new_address()
+                )
+            entities.append([len(corpus.records)])
+        record.setdefault("phone", None)
+        record.setdefault("host", None)
+        record.setdefault("address", None)
+        corpus.records.append(record)
+    return corpus
+
+
+def load_duplicate_corpus(corpus: DuplicateCorpus, batch_size: int = 5000) -> list[int]:
+    """
+    Write ``corpus`` as Business rows (with addresses and contact keys),
+    returning the Business id of each record
+
+    Equivalent addresses share one Address row, as the ingestion pipeline
+    writes them.
+    """
+    addresses = {}
+    for record in corpus.records:
+        if record["address"]:
+            street, city, state, zip_code, latitude, longitude = record["address"]
+            key = normalize_address_key(street, city, state, zip_code)
+            addresses.setdefault(
+                key,
+                models.Address(
+                    street_1=street,
+                    street_2="",
+                    city=city,
+                    state=state,
+                    zip=zip_code,
+                    latitude=latitude,
+                    longitude=longitude,
+                    normalized_key=key,
+                ),
+            )
+    models.Address.objects.bulk_create(addresses.values(), batch_size=batch_size)
+
+    business_ids = []
+    for start in range(0, len(corpus.records), batch_size):
+        businesses = []
+        for i, record in enumerate(corpus.records[start : start + batch_size], start):
+            address = record["address"]
+            business = models.Business(
+                name=record["name"],
+                slug=f"business-{i}",
+                address=addresses[normalize_address_key(*address[:4])] if address else None,
+                phone_numbers=record.get("phone_numbers", []),
+                website_url=record.get("website_url"),
+            )
+            business.populate_normalized_keys()
+            businesses.append(business)
+        models.Business.objects.bulk_create(businesses)
+        models.BusinessContactKey.objects.bulk_create(
+            [
+                models.BusinessContactKey(business_id=business.pk, kind=kind, value=value)
+                for business in businesses
+                for kind, value in business.contact_key_values()
+            ]
+        )
+        business_ids.extend(business.pk for business in businesses)
+    return business_ids
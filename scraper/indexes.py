@@ -0,0 +1,432 @@
+"""
+In-memory lookup structures used by the ingestion pipeline.
+
+They are loaded once per crawl so items can be matched against existing rows
+without a database round-trip per item.
+"""
+
+import heapq
+import sys
+import time
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+
+from app import models
+from app.blocking import can_reach_threshold
+from app.clustering import DEFAULT_SIGNAL_WEIGHTS
+from app.duplicate_detection import DuplicateDetector
+from app.normalization import normalize_address_key
+from app.tfidf import char_ngrams
+from scraper import items
+
+# Fuzzy name lookups read the postings of a name's rarest trigrams until they
+# have seen this many entries, then score the names sharing the most trigrams
+MAX_SCANNED_POSTINGS = 500
+MAX_NAME_CANDIDATES = 10
+
+
+def first_match(*candidates):
+    """
+    Pick the match a ``.filter(...).first()`` would have returned
+
+    Saved rows win over rows pending creation in the current batch, and
+    among saved rows the lowest pk wins.
+    """
+    candidates = [c for c in candidates if c is not None]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda obj: (obj.pk is None, obj.pk or 0))
+
+
+def deep_sizeof(mapping: dict) -> int:
+    """Approximate memory used by a dict of (tuple) keys and scalar values"""
+    size = sys.getsizeof(mapping)
+    for key, value in mapping.items():
+        size += sys.getsizeof(key) + sys.getsizeof(value)
+        if isinstance(key, tuple):
+            size += sum(sys.getsizeof(part) for part in key)
+    return size
+
+
+class BusinessIdentityIndex:
+    """
+    Map business identifiers to a Business pk
+
+    Identifiers are the exact name, ``chamber_of_commerce_id``,
+    ``downtown_frederick_id`` and ``extra['visit_frederick_id']``.  When
+    several rows share an identifier the lowest pk is kept, matching what
+    ``.filter(...).first()`` returns.
+    """
+
+    def __init__(self):
+        self.entries: dict[tuple[str, str], int] = {}
+        self.build_seconds = 0.0
+
+    @classmethod
+    def load(cls) -> "BusinessIdentityIndex":
+        started_at = time.perf_counter()
+        index = cls()
+        rows = (
+            models.Business.objects.order_by("pk")
+            .values_list(
+                "pk",
+                "name",
+                "chamber_of_commerce_id",
+                "downtown_frederick_id",
+                "extra__visit_frederick_id",
+            )
+            .iterator()
+        )
+        for pk, *identifiers in rows:
+            index.add(cls.identity_keys(*identifiers), pk)
+        index.build_seconds = time.perf_counter() - started_at
+        return index
+
+    @staticmethod
+    def identity_keys(
+        name, chamber_of_commerce_id, downtown_frederick_id, visit_frederick_id
+    ) -> list[tuple[str, str]]:
+        keys = []
+        if name:
+            keys.append(("name", name))
+        if chamber_of_commerce_id:
+            keys.append(("chamber_of_commerce_id", chamber_of_commerce_id))
+        if downtown_frederick_id:
+            keys.append(("downtown_frederick_id", downtown_frederick_id))
+        if visit_frederick_id:
+            keys.append(("visit_frederick_id", str(visit_frederick_id)))
+        return keys
+
+    @classmethod
+    def item_keys(cls, item: items.Business) -> list[tuple[str, str]]:
+        return cls.identity_keys(
+            item.name,
+            item.chamber_of_commerce_id,
+            item.downtown_frederick_id,
+            (item.extra or {}).get("visit_frederick_id"),
+        )
+
+    @classmethod
+    def business_keys(cls, business: models.Business) -> list[tuple[str, str]]:
+        return cls.identity_keys(
+            business.name,
+            business.chamber_of_commerce_id,
+            business.downtown_frederick_id,
+            (business.extra or {}).get("visit_frederick_id"),
+        )
+
+    def add(self, keys: list[tuple[str, str]], pk: int):
+        for key in keys:
+            self.entries.setdefault(key, pk)
+
+    def add_business(self, business: models.Business):
+        self.add(self.business_keys(business), business.pk)
+
+    def match(self, keys: list[tuple[str, str]]) -> int | None:
+        """Lowest pk matching any of ``keys``"""
+        pks = [self.entries[key] for key in keys if key in self.entries]
+        return min(pks) if pks else None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def memory_bytes(self) -> int:
+        return deep_sizeof(self.entries)
+
+
+class CategoryCache:
+    """
+    Map normalized category names and ``chamber_of_commerce_id`` to saved
+    BusinessCategory instances
+
+    Categories are few, so the whole table is kept in memory for the crawl.
+    """
+
+    def __init__(self):
+        self.entries: dict[tuple[str, str], models.BusinessCategory] = {}
+
+    @classmethod
+    def load(cls) -> "CategoryCache":
+        cache = cls()
+        for category in models.BusinessCategory.objects.order_by("pk"):
+            cache.add(category)
+        return cache
+
+    @staticmethod
+    def normalize_name(name: str) -> str:
+        return " ".join((name or "").split()).casefold()
+
+    @classmethod
+    def category_keys(cls, name, chamber_of_commerce_id) -> list[tuple[str, str]]:
+        keys = []
+        if normalized_name := cls.normalize_name(name):
+            keys.append(("name", normalized_name))
+        if chamber_of_commerce_id:
+            keys.append(("chamber_of_commerce_id", chamber_of_commerce_id))
+        return keys
+
+    @classmethod
+    def item_keys(cls, item: items.BusinessCategory) -> list[tuple[str, str]]:
+        return cls.category_keys(item.name, item.chamber_of_commerce_id)
+
+    def add(self, category: models.BusinessCategory):
+        for key in self.category_keys(category.name, category.chamber_of_commerce_id):
+            self.entries.setdefault(key, category)
+
+    def match(self, keys: list[tuple[str, str]]) -> models.BusinessCategory | None:
+        return first_match(*(self.entries.get(key) for key in keys))
+
+    def __len__(self):
+        return len({id(category) for category in self.entries.values()})
+
+
+class AddressIndex:
+    """
+    Map ``Address.normalized_key`` to ``[pk, latitude, longitude]``
+
+    Coordinates are kept so missing ones can be backfilled without reading
+    the row again.
+    """
+
+    def __init__(self):
+        self.entries: dict[str, list] = {}
+
+    @classmethod
+    def load(cls) -> "AddressIndex":
+        index = cls()
+        rows = (
+            models.Address.objects.exclude(normalized_key="")
+            .order_by("pk")
+            .values_list("normalized_key", "pk", "latitude", "longitude")
+            .iterator()
+        )
+        for key, pk, latitude, longitude in rows:
+            index.entries.setdefault(key, [pk, latitude, longitude])
+        return index
+
+    @staticmethod
+    def item_key(item: items.Business) -> str:
+        return normalize_address_key(item.address, item.city, item.state, item.zip)
+
+    def add(self, address: models.Address):
+        self.entries[address.normalized_key] = [
+            address.pk,
+            address.latitude,
+            address.longitude,
+        ]
+
+    def get(self, key: str) -> list | None:
+        return self.entries.get(key)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class FingerprintIndex:
+    """
+    Map a source's external ids to the fingerprint of their last scraped payload
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        # external id -> (fingerprint, pk of the business it was written to)
+        self.entries: dict[str, tuple[str, int]] = {}
+
+    @classmethod
+    def load(cls, source: str) -> "FingerprintIndex":
+        index = cls(source)
+        index.entries = {
+            external_id: (fingerprint, business_id)
+            for external_id, fingerprint, business_id in models.ScrapeFingerprint.objects.filter(
+                source=source
+            )
+            .values_list("external_id", "fingerprint", "business_id")
+            .iterator()
+        }
+        return index
+
+    def get(self, external_id: str) -> str | None:
+        entry = self.entries.get(external_id)
+        return entry[0] if entry else None
+
+    def business_id(self, external_id: str) -> int | None:
+        entry = self.entries.get(external_id)
+        return entry[1] if entry else None
+
+    def add(self, external_id: str, fingerprint: str, business_id: int):
+        self.entries[external_id] = (fingerprint, business_id)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+@dataclass
+class FuzzyMatch:
+    pk: int
+    score: float
+    # Name ratio alone, 0 when only contacts matched
+    name_score: float = 0.0
+    reasons: list = field(default_factory=list)
+
+
+class FuzzyBusinessIndex:
+    """
+    Find saved businesses resembling an item, for matching at ingest time
+
+    Names, phone numbers and websites are keyed with the
+    ``DuplicateDetector.normalize_*`` rules.  Names are looked up through
+    postings of their padded trigram occurrences, rarest first, reading at
+    most ``MAX_SCANNED_POSTINGS`` entries; the ``MAX_NAME_CANDIDATES`` names
+    sharing the most trigrams are scored with ``SequenceMatcher``.  A lookup
+    therefore costs about the same whatever the size of the index.  It is
+    not exhaustive: a name sharing only common trigrams with the item may be
+    missed and is left to ``detect_duplicates``.  Shared phone numbers and
+    websites raise the score with a noisy-OR:
+
+        score = 1 - (1 - name ratio) * prod(1 - weight[contact])
+    """
+
+    def __init__(self, threshold: float = 0.8):
+        self.threshold = threshold
+        self.names: dict[int, tuple[str, frozenset]] = {}
+        self.contacts: dict[int, list[tuple[str, str]]] = {}
+        self.postings: dict[tuple[str, int], set[int]] = {}
+        self.contact_postings: dict[tuple[str, str], set[int]] = {}
+        self.build_seconds = 0.0
+
+    @classmethod
+    def load(cls, threshold: float = 0.8) -> "FuzzyBusinessIndex":
+        started_at = time.perf_counter()
+        index = cls(threshold)
+        rows = (
+            models.Business.objects.order_by("pk")
+            .values_list(
+                "pk", "normalized_name", "normalized_phone_numbers", "normalized_website"
+            )
+            .iterator()
+        )
+        for pk, name, phones, website in rows:
+            index.add(pk, name, cls.contact_keys(phones or [], website))
+        index.build_seconds = time.perf_counter() - started_at
+        return index
+
+    @staticmethod
+    def name_tokens(name: str) -> frozenset:
+        """Trigram occurrences, so shared tokens count shared trigrams with repeats"""
+        return frozenset(
+            (trigram, occurrence)
+            for trigram, count in char_ngrams(name).items()
+            for occurrence in range(count)
+        )
+
+    @staticmethod
+    def contact_keys(phones: list[str], website: str) -> list[tuple[str, str]]:
+        keys = [("phone", phone) for phone in phones]
+        if website:
+            keys.append(("website", website))
+        return keys
+
+    @classmethod
+    def item_keys(cls, item: items.Business) -> tuple[str, list[tuple[str, str]]]:
+        phones = []
+        for phone in item.clean_phone_numbers():
+            cleaned = DuplicateDetector.clean_phone_number(phone)
+            if len(cleaned) >= 10 and cleaned not in phones:
+                phones.append(cleaned)
+        return (
+            DuplicateDetector.normalize_name(item.name),
+            cls.contact_keys(phones, DuplicateDetector.normalize_url(item.website)),
+        )
+
+    def add(self, pk: int, name: str, contact_keys: list[tuple[str, str]]):
+        """Index a business, replacing what was indexed for it before"""
+        self.remove(pk)
+        if name:
+            tokens = self.name_tokens(name)
+            self.names[pk] = (name, tokens)
+            for token in tokens:
+                self.postings.setdefault(token, set()).add(pk)
+        if contact_keys:
+            self.contacts[pk] = contact_keys
+            for key in contact_keys:
+                self.contact_postings.setdefault(key, set()).add(pk)
+
+    def add_business(self, business: models.Business):
+        self.add(
+            business.pk,
+            business.normalized_name,
+            self.contact_keys(
+                business.normalized_phone_numbers or [], business.normalized_website
+            ),
+        )
+
+    def remove(self, pk: int):
+        _, tokens = self.names.pop(pk, ("", ()))
+        for token in tokens:
+            self.postings[token].discard(pk)
+        for key in self.contacts.pop(pk, []):
+            self.contact_postings[key].discard(pk)
+
+    def name_scores(self, name: str) -> dict[int, float]:
+        """``SequenceMatcher`` ratio of the closest indexed names reaching the threshold"""
+        tokens = self.name_tokens(name)
+        probes = sorted(
+            (self.postings[token] for token in tokens if token in self.postings), key=len
+        )
+        candidates = set()
+        scanned = 0
+        for posting in probes:
+            if candidates and scanned + len(posting) > MAX_SCANNED_POSTINGS:
+                break
+            candidates.update(posting)
+            scanned += len(posting)
+        closest = heapq.nlargest(
+            MAX_NAME_CANDIDATES,
+            ((len(tokens & self.names[pk][1]), pk) for pk in candidates),
+        )
+
+        scores = {}
+        matcher = SequenceMatcher(None)
+        matcher.set_seq2(name)
+        for _, pk in closest:
+            other = self.names[pk][0]
+            if not can_reach_threshold(len(name), len(other), self.threshold):
+                continue
+            matcher.set_seq1(other)
+            if (
+                matcher.real_quick_ratio() < self.threshold
+                or matcher.quick_ratio() < self.threshold
+            ):
+                continue
+            ratio = matcher.ratio()
+            if ratio >= self.threshold:
+                scores[pk] = ratio
+        return scores
+
+    def match(self, keys: tuple[str, list[tuple[str, str]]]) -> list[FuzzyMatch]:
+        """Businesses scoring at least the threshold against ``keys``, best first"""
+        name, contact_keys = keys
+        name_scores = self.name_scores(name) if name else {}
+        shared_contacts = {}
+        for key in contact_keys:
+            for pk in self.contact_postings.get(key, ()):
+                shared_contacts.setdefault(pk, []).append(key)
+
+        matches = []
+        for pk in name_scores.keys() | shared_contacts.keys():
+            reasons = []
+            name_score = name_scores.get(pk, 0.0)
+            miss = 1 - name_score
+            if pk in name_scores:
+                reasons.append(f'name_fuzzy: "{name}" <-> "{self.names[pk][0]}"')
+            for kind, value in shared_contacts.get(pk, []):
+                reasons.append(f"{kind}_match: {value}")
+                miss *= 1 - DEFAULT_SIGNAL_WEIGHTS[kind]
+            score = 1 - miss
+            if score >= self.threshold:
+                matches.append(FuzzyMatch(pk, score, name_score, reasons))
+        matches.sort(key=lambda match: (-match.score, match.pk))
+        return matches
+
+    def __len__(self):
+        return len(self.names.keys() | self.contacts.keys())
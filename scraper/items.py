@@ -2,8 +2,10 @@
 Intermediary data structures to store scraped data.
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from typing import TYPE_CHECKING, Optional
+import hashlib
+import json
 import re
 
 if TYPE_CHECKING:
@@ -50,7 +52,7 @@ class Business:
 
     def clean_phone_numbers(self) -> list[str]:
         """Return a cleaned list of phone numbers."""
-        return list(
+        return sorted(
             set([phone.strip() for phone in self.phone_numbers or [] if phone.strip()])
         )
 
@@ -76,3 +78,52 @@ class Business:
             )
         except (ValueError, TypeError):
             return None
+
+    def external_id(self) -> str:
+        """
+        Stable id of the scraped record within its source
+
+        Listings repeated once per category (e.g. the Chamber directory) get
+        one record per category.
+        """
+        visit_frederick_id = (self.extra or {}).get("visit_frederick_id")
+        external_id = (
+            self.chamber_of_commerce_id
+            or self.downtown_frederick_id
+            or self.fitci_id
+            or (str(visit_frederick_id) if visit_frederick_id else None)
+            or self.name
+        )
+        categories = self._category_keys()
+        if categories:
+            external_id += "#" + ",".join(
+                chamber_of_commerce_id or name
+                for name, chamber_of_commerce_id in categories
+            )
+        return external_id
+
+    def fingerprint(self) -> str:
+        """Hash of the normalized payload, to detect unchanged records on re-crawl"""
+        payload = {}
+        for field in fields(self):
+            if field.name in ("_cache", "categories"):
+                continue
+            value = getattr(self, field.name)
+            if isinstance(value, str):
+                value = value.strip()
+            elif field.name == "phone_numbers":
+                value = self.clean_phone_numbers()
+            payload[field.name] = value or None
+        payload["categories"] = self._category_keys()
+
+        serialized = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha1(serialized.encode("utf-8")).hexdigest()
+
+    def _category_keys(self) -> list[tuple[str, str]]:
+        categories = self.categories or []
+        if isinstance(categories, BusinessCategory):
+            categories = [categories]
+        return sorted(
+            (category.name or "", category.chamber_of_commerce_id or "")
+            for category in categories
+        )
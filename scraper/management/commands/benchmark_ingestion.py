@@ -0,0 +1,127 @@
+"""
+Management command to benchmark DjangoBusinessIngestionPipeline throughput
+"""
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from scraper.benchmark import (
+    GENERATORS,
+    QueryCounter,
+    current_commit,
+    generate_items,
+    ingest_items,
+    peak_rss_bytes,
+    temporary_database,
+)
+from scraper.pipelines import DjangoBusinessIngestionPipeline
+from scraper.writer import IngestionWriter
+
+
+class Command(BaseCommand):
+    help = "Benchmark ingestion throughput on synthetic items shaped like each spider"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scales",
+            nargs="+",
+            type=int,
+            default=[1000, 10000],
+            help="Numbers of business items to ingest (default: 1000 10000)",
+        )
+        parser.add_argument(
+            "--shapes",
+            nargs="+",
+            choices=list(GENERATORS),
+            default=list(GENERATORS),
+            help="Spider shapes to generate (default: all)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Items per ingestion transaction (default: 100)",
+        )
+        parser.add_argument(
+            "--writer",
+            action="store_true",
+            help="Ingest through the IngestionWriter thread instead of inline",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed for the generated items",
+        )
+        parser.add_argument(
+            "--output",
+            help="Also write the JSON results to this file",
+        )
+
+    def handle(self, *args, **options):
+        results = []
+        # Smallest runs first, so the process-wide peak RSS reported after
+        # each run is attributable to the largest run so far
+        for scale in sorted(options["scales"]):
+            for shape in options["shapes"]:
+                with temporary_database():
+                    results.append(self.run_benchmark(shape, scale, options))
+                self.stderr.write(
+                    f"{shape} x {scale}: {results[-1]['items_per_second']} items/s"
+                )
+
+        report = {
+            "commit": current_commit(),
+            "batch_size": options["batch_size"],
+            "writer": options["writer"],
+            "results": results,
+        }
+        output = json.dumps(report, indent=2)
+        if options.get("output"):
+            with open(options["output"], "w", encoding="utf-8") as f:
+                f.write(output)
+        self.stdout.write(output)
+
+    def run_benchmark(self, shape: str, scale: int, options) -> dict:
+        generated = generate_items(scale, seed=options["seed"], shape=shape)
+        pipeline = DjangoBusinessIngestionPipeline()
+        pipeline.load_indexes()
+        counter = QueryCounter()
+
+        if options["writer"]:
+            seconds = self.ingest_with_writer(pipeline, generated, counter, options)
+        else:
+            with connection.execute_wrapper(counter):
+                seconds = ingest_items(pipeline, generated, options["batch_size"])
+
+        return {
+            "shape": shape,
+            "scale": scale,
+            "items": len(generated),
+            "seconds": round(seconds, 3),
+            "items_per_second": round(len(generated) / seconds, 1),
+            "queries": counter.count,
+            "queries_per_item": round(counter.count / len(generated), 3),
+            "peak_rss_bytes": peak_rss_bytes(),
+        }
+
+    def ingest_with_writer(self, pipeline, generated, counter, options) -> float:
+        def count_writer_queries():
+            # The writer thread has its own connection to instrument; it is
+            # closed with the thread, so the wrapper is never removed
+            connection.execute_wrappers.append(counter)
+
+        writer = IngestionWriter(
+            pipeline.ingest,
+            setup=count_writer_queries,
+            batch_size=options["batch_size"],
+            batch_timeout=None,
+        )
+        started_at = time.perf_counter()
+        writer.start()
+        for item in generated:
+            writer.put(item)
+        writer.close()
+        return time.perf_counter() - started_at
@@ -0,0 +1,94 @@
+"""
+Management command to compare SQLite connection profiles
+"""
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from app.duplicate_detection import DuplicateDetector
+from app.sqlite import use_sqlite_profile
+from scraper.benchmark import generate_items, ingest_items, temporary_database
+from scraper.pipelines import DjangoBusinessIngestionPipeline
+
+
+class Command(BaseCommand):
+    help = "Time ingestion and duplicate detection under each SQLite profile"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profiles",
+            nargs="+",
+            choices=list(settings.SQLITE_PROFILES),
+            default=list(settings.SQLITE_PROFILES),
+            help="Profiles to compare (default: all)",
+        )
+        parser.add_argument(
+            "--items",
+            type=int,
+            default=2000,
+            help="Number of business items to ingest (default: 2000)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1,
+            help="Items per ingestion transaction (default: 1, one commit per item)",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed for the generated items",
+        )
+        parser.add_argument(
+            "--json",
+            action="store_true",
+            help="Print results as JSON",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("SQLite profiles only apply to the sqlite3 backend")
+
+        results = []
+        for profile in options["profiles"]:
+            # Each profile gets a fresh database so runs don't warm each other up
+            with temporary_database(), use_sqlite_profile(profile):
+                generated = generate_items(options["items"], seed=options["seed"])
+
+                ingest_seconds = ingest_items(
+                    DjangoBusinessIngestionPipeline(), generated, options["batch_size"]
+                )
+
+                started_at = time.perf_counter()
+                candidates = DuplicateDetector().find_all_duplicates()
+                detect_seconds = time.perf_counter() - started_at
+
+            results.append(
+                {
+                    "profile": profile,
+                    "items": options["items"],
+                    "batch_size": options["batch_size"],
+                    "ingest_seconds": round(ingest_seconds, 3),
+                    "items_per_second": round(len(generated) / ingest_seconds, 1),
+                    "detect_duplicates_seconds": round(detect_seconds, 3),
+                    "candidates": len(candidates),
+                }
+            )
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(
+            f"{'profile':<10} {'ingest (s)':>11} {'items/s':>10} {'detect (s)':>11}"
+        )
+        for result in results:
+            self.stdout.write(
+                f"{result['profile']:<10} {result['ingest_seconds']:>11.3f} "
+                f"{result['items_per_second']:>10.1f} "
+                f"{result['detect_duplicates_seconds']:>11.3f}"
+            )
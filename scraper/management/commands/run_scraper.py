@@ -1,8 +1,12 @@
+import argparse
+import time
 from enum import StrEnum, auto
 from django.core.management.base import BaseCommand
 from scrapy.crawler import CrawlerProcess
 from scrapy.utils.project import get_project_settings
 
+from app.sqlite import use_sqlite_profile
+
 from scraper.spiders.frederick_chamber import FrederickChamberSpider
 from scraper.spiders.discover_frederick import DiscoverFrederickSpider
 from scraper.spiders.discover_frederick_major_employers import (
@@ -28,54 +32,99 @@ class ScraperName(StrEnum):
     VISIT_FREDERICK = auto()
 
 
+SCRAPERS = {
+    ScraperName.FREDERICK_CHAMBER: ("Frederick Chamber", FrederickChamberSpider),
+    ScraperName.DISCOVER_FREDERICK: ("Discover Frederick", DiscoverFrederickSpider),
+    ScraperName.DISCOVER_FREDERICK_MAJOR_EMPLOYERS: (
+        "Discover Frederick Major Employers",
+        DiscoverFrederickMajorEmployersSpider,
+    ),
+    ScraperName.MADE_IN_FREDERICK: ("Made In Frederick", MadeInFrederickSpider),
+    ScraperName.BUSINESS_IN_FREDERICK_TOP_EMPLOYERS: (
+        "Business in Frederick Top Employers",
+        BusinessInFrederickTopEmployersSpider,
+    ),
+    ScraperName.DOWNTOWN_FREDERICK: ("Downtown Frederick", DowntownFrederickSpider),
+    ScraperName.FITCI: ("FITCI", FitciSpider),
+    ScraperName.VISIT_FREDERICK: ("Visit Frederick", VisitFrederickSpider),
+}
+
+
+# Scrapers crawling the same site: they run one after another so the site
+# still sees one request per DOWNLOAD_DELAY
+SAME_SITE = [
+    [ScraperName.DISCOVER_FREDERICK, ScraperName.DISCOVER_FREDERICK_MAJOR_EMPLOYERS],
+]
+
+
+def crawl_sequences(names: list[ScraperName]) -> list[list[ScraperName]]:
+    """Group ``names`` into sequences crawled side by side, scrapers of a site together"""
+    sequences = []
+    grouped = set()
+    for name in names:
+        if name in grouped:
+            continue
+        site = next((site for site in SAME_SITE if name in site), [name])
+        sequence = [other for other in names if other in site]
+        grouped.update(sequence)
+        sequences.append(sequence)
+    return sequences
+
+
+def scraper_names(value: str) -> list[ScraperName]:
+    """``all`` or a comma separated list of scraper names"""
+    if value == "all":
+        return list(ScraperName)
+    try:
+        names = [ScraperName(name.strip()) for name in value.split(",") if name.strip()]
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(
+            f"{error}; choose 'all' or from {', '.join(ScraperName)}"
+        )
+    if not names:
+        raise argparse.ArgumentTypeError("No scraper given")
+    # Running a spider twice in one process would write its items twice
+    return list(dict.fromkeys(names))
+
+
 class Command(BaseCommand):
-    help = "Run scraper w/ Django integration"
+    help = "Run scrapers w/ Django integration"
 
     def add_arguments(self, parser):
         parser.add_argument(
             "scraper",
-            type=ScraperName,
-            choices=list(ScraperName),
-            default=ScraperName.FREDERICK_CHAMBER,
-            help="Choose which scraper to run",
+            type=scraper_names,
+            help=(
+                "Scraper to run, a comma separated list of scrapers, or 'all' "
+                "to crawl every source at once in one process "
+                f"({', '.join(ScraperName)})"
+            ),
         )
 
     def handle(self, *args, **options):
+        with use_sqlite_profile("ingest"):
+            self.run_scrapers(options["scraper"])
+
+    def run_scrapers(self, names: list[ScraperName]):
+        # Spiders of different sites share the reactor and one ingestion
+        # writer thread; each keeps DOWNLOAD_DELAY on its own site
         process = CrawlerProcess(settings=get_project_settings())
 
-        match options["scraper"]:
-            case ScraperName.FREDERICK_CHAMBER:
-                self.stdout.write("Running Frederick Chamber scraper")
-                process.crawl(FrederickChamberSpider)
-                process.start()
-            case ScraperName.DISCOVER_FREDERICK:
-                self.stdout.write("Running Discover Frederick scraper")
-                process.crawl(DiscoverFrederickSpider)
-                process.start()
-            case ScraperName.DISCOVER_FREDERICK_MAJOR_EMPLOYERS:
-                self.stdout.write("Running Discover Frederick Major Employers scraper")
-                process.crawl(DiscoverFrederickMajorEmployersSpider)
-                process.start()
-            case ScraperName.MADE_IN_FREDERICK:
-                self.stdout.write("Running Made In Frederick scraper")
-                process.crawl(MadeInFrederickSpider)
-                process.start()
-            case ScraperName.BUSINESS_IN_FREDERICK_TOP_EMPLOYERS:
-                self.stdout.write("Running Business in Frederick Top Employers scraper")
-                process.crawl(BusinessInFrederickTopEmployersSpider)
-                process.start()
-            case ScraperName.DOWNTOWN_FREDERICK:
-                self.stdout.write("Running Downtown Frederick scraper")
-                process.crawl(DowntownFrederickSpider)
-                process.start()
-            case ScraperName.FITCI:
-                self.stdout.write("Running FITCI scraper")
-                process.crawl(FitciSpider)
-                process.start()
-            case ScraperName.VISIT_FREDERICK:
-                self.stdout.write("Running Visit Frederick scraper")
-                process.crawl(VisitFrederickSpider)
-                process.start()
-            case _:
-                self.stderr.write("Unknown scraper option")
-                return
+        for sequence in crawl_sequences(names):
+            self.crawl_in_turn(process, sequence)
+
+        started_at = time.perf_counter()
+        process.start()
+        if len(names) > 1:
+            self.stdout.write(
+                f"Ran {len(names)} scrapers in "
+                f"{time.perf_counter() - started_at:.1f}s"
+            )
+
+    def crawl_in_turn(self, process: CrawlerProcess, names: list[ScraperName]):
+        """Schedule the scrapers ``names``, each starting once the previous finished"""
+        label, spider = SCRAPERS[names[0]]
+        self.stdout.write(f"Running {label} scraper")
+        deferred = process.crawl(spider)
+        if names[1:]:
+            deferred.addBoth(lambda _: self.crawl_in_turn(process, names[1:]))
@@ -1,269 +1,1029 @@
 import logging
+import math
+import threading
+import time
+from functools import partial
 
-from asgiref.sync import sync_to_async
-from django.db.models import Q
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from scrapy.utils.defer import maybe_deferred_to_future
+from twisted.internet import threads
 
 from app import models
 from scraper import items
+from scraper.indexes import (
+    AddressIndex,
+    BusinessIdentityIndex,
+    CategoryCache,
+    FingerprintIndex,
+    FuzzyBusinessIndex,
+    FuzzyMatch,
+    first_match,
+)
 from scraper.output.csv_logger import ScrapeCSVLogger
+from scraper.writer import IngestionWriter
 
 logger = logging.getLogger(__name__)
 
+# Errors one bad item can raise while its batch is written (constraint
+# violations, values a column can't hold, ...): the batch is replayed one
+# item at a time so the other items are still written
+ITEM_ERRORS = (DatabaseError, ValueError, ArithmeticError)
+
+# ``DuplicateCandidate.detector_version`` of pairs found at ingest time
+INGEST_CANDIDATE_VERSION = "ingest"
+
+
+def item_categories(item: items.Business) -> list[items.BusinessCategory]:
+    """
+    Categories of a business item as a list
+
+    Some spiders pass a single ``BusinessCategory`` instead of a list.
+    """
+    if not item.categories:
+        return []
+    if isinstance(item.categories, items.BusinessCategory):
+        return [item.categories]
+    return list(item.categories)
+
 
 class DjangoBusinessIngestionPipeline:
     """
     Convert from Scrapy items to Django models and save them to the database
+
+    Items are handed to an ``IngestionWriter`` thread through a bounded
+    queue, so parsing never waits on the database.  The writer groups items
+    into batches; each batch is resolved against the database with a
+    handful of set-based queries and written with ``bulk_create`` /
+    ``bulk_update`` inside one transaction.  When the queue is full the
+    engine is paused until the writer catches up.
+
+    Existing businesses, categories and addresses are matched through
+    in-memory indexes (``BusinessIdentityIndex``, ``CategoryCache`` and
+    ``AddressIndex``) loaded when the spider opens, so matching needs no
+    database access.  Business items whose payload fingerprint matches the
+    one stored for the same source record on the last crawl are skipped
+    before any of that; they still get their stored business as ``_cache``
+    and a CSV log row once the batch commits.
+
+    Every spider of a process writes through the same ``SharedIngestion``
+    writer and indexes, so several spiders can crawl in one reactor.
+
+    Items without an exact match are looked up in a ``FuzzyBusinessIndex``.
+    A match scoring at least ``fuzzy_attach_score`` whose name alone scores
+    at least ``fuzzy_attach_name_score`` is merged into the existing
+    business (shared contacts only raise a name match, they never attach on
+    their own); other matches are stored as ``DuplicateCandidate`` rows for
+    review.  Businesses created in the same batch are only fuzzy
+    matched from the next batch on.
+
+    Settings:
+        INGESTION_BATCH_SIZE: write after this many items
+        INGESTION_BATCH_TIMEOUT: write once a batch has waited this many
+            seconds for more items
+        INGESTION_QUEUE_SIZE: items queued for the writer before the crawl
+            is paused
+        FUZZY_MATCH_ATTACH_SCORE: merge fuzzy matches scoring at least this
+        FUZZY_MATCH_ATTACH_NAME_SCORE: ... whose name ratio is at least this
+        FUZZY_MATCH_CANDIDATE_SCORE: store fuzzy matches scoring at least
+            this as duplicate candidates (0 disables fuzzy matching)
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        batch_size=1,
+        batch_timeout=None,
+        max_queue_size=1000,
+        fuzzy_attach_score=0.95,
+        fuzzy_attach_name_score=0.85,
+        fuzzy_candidate_score=0.8,
+        stats=None,
+        crawler=None,
+    ):
         self.csv_logger = None
         self.spider_name = None
+        self.stats = stats
+        self.crawler = crawler
+        self.batch_size = max(1, batch_size)
+        self.batch_timeout = batch_timeout
+        self.max_queue_size = max_queue_size
+        self.fuzzy_attach_score = fuzzy_attach_score
+        self.fuzzy_attach_name_score = fuzzy_attach_name_score
+        self.fuzzy_candidate_score = fuzzy_candidate_score
+        self.ingestion = None
+        self.writer = None
+        self.paused = False
+        self.identity_index = None
+        self.category_cache = None
+        self.address_index = None
+        self.fingerprints = None
+        self.fuzzy_index = None
+        # Index updates to apply once the current batch has committed
+        self.after_commit = []
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            batch_size=crawler.settings.getint("INGESTION_BATCH_SIZE", 1),
+            batch_timeout=crawler.settings.getfloat("INGESTION_BATCH_TIMEOUT") or None,
+            max_queue_size=crawler.settings.getint("INGESTION_QUEUE_SIZE", 1000),
+            fuzzy_attach_score=crawler.settings.getfloat("FUZZY_MATCH_ATTACH_SCORE", 0.95),
+            fuzzy_attach_name_score=crawler.settings.getfloat(
+                "FUZZY_MATCH_ATTACH_NAME_SCORE", 0.85
+            ),
+            fuzzy_candidate_score=crawler.settings.getfloat(
+                "FUZZY_MATCH_CANDIDATE_SCORE", 0.8
+            ),
+            stats=crawler.stats,
+            crawler=crawler,
+        )
 
     def open_spider(self, spider):
         self.spider_name = getattr(spider, "name", "scraper")
         self.csv_logger = ScrapeCSVLogger(self.spider_name)
+        self.ingestion = SharedIngestion.join(self)
+        self.writer = self.ingestion.writer
+
+    def load_indexes(self, shared=None):
+        """
+        Load the in-memory lookups used to match items against the database
+
+        The business, category, address and fuzzy indexes of ``shared`` (the
+        pipeline of another spider writing through the same writer) are
+        reused rather than loaded, so each spider matches the businesses the
+        others create.  Fingerprints are always loaded for this spider.
+        """
+        if self.spider_name:
+            self.fingerprints = FingerprintIndex.load(self.spider_name)
+            if self.stats is not None:
+                self.stats.set_value(
+                    "ingestion/fingerprint/known", len(self.fingerprints)
+                )
+        if shared is not None:
+            self.identity_index = shared.identity_index
+            self.category_cache = shared.category_cache
+            self.address_index = shared.address_index
+            self.fuzzy_index = shared.fuzzy_index
+            return
+
+        self.identity_index = BusinessIdentityIndex.load()
+        self.category_cache = CategoryCache.load()
+        self.address_index = AddressIndex.load()
+        if self.fuzzy_candidate_score:
+            self.fuzzy_index = FuzzyBusinessIndex.load(self.fuzzy_candidate_score)
+            logger.info(
+                f"Loaded fuzzy business index: {len(self.fuzzy_index)} businesses "
+                f"in {self.fuzzy_index.build_seconds:.3f}s"
+            )
+        logger.info(
+            f"Loaded business identity index: {len(self.identity_index)} keys "
+            f"in {self.identity_index.build_seconds:.3f}s"
+        )
+        if self.stats is not None:
+            self.stats.set_value(
+                "ingestion/identity_index/build_seconds",
+                round(self.identity_index.build_seconds, 4),
+            )
+            self.stats.set_value(
+                "ingestion/identity_index/keys", len(self.identity_index)
+            )
+            self.stats.set_value(
+                "ingestion/identity_index/memory_bytes",
+                self.identity_index.memory_bytes(),
+            )
+            self.stats.set_value(
+                "ingestion/category_cache/categories", len(self.category_cache)
+            )
+            self.stats.set_value(
+                "ingestion/address_index/keys", len(self.address_index)
+            )
+            if self.fuzzy_index is not None:
+                self.stats.set_value(
+                    "ingestion/fuzzy_index/build_seconds",
+                    round(self.fuzzy_index.build_seconds, 4),
+                )
+                self.stats.set_value(
+                    "ingestion/fuzzy_index/businesses", len(self.fuzzy_index)
+                )
 
     def close_spider(self, spider):
+        deferred = self.ingestion.leave(self)
+        deferred.addBoth(self._close_csv_logger)
+        return deferred
+
+    def _close_csv_logger(self, result):
         if self.csv_logger:
             self.csv_logger.close()
+        return result
 
     async def process_item(self, item, spider):
-        await sync_to_async(self.process_item_sync)(item, spider)
+        self.ingestion.queued(self)
+        if not self.writer.offer((self, item)):
+            # Queue is full: stop scheduling requests until the writer drains
+            # it, and wait for room off the reactor thread
+            self.pause_crawl()
+            await maybe_deferred_to_future(
+                threads.deferToThread(self.writer.put, (self, item))
+            )
+        return item
+
+    def pause_crawl(self):
+        if self.paused or not self.crawler or not self.crawler.engine:
+            return
+        self.paused = True
+        self.crawler.engine.pause()
+        logger.info("Ingestion queue full, pausing the crawl")
+        if self.stats is not None:
+            self.stats.inc_value("ingestion/writer/backpressure_pauses")
+
+    def resume_crawl(self):
+        if not self.paused:
+            return
+        self.paused = False
+        self.crawler.engine.unpause()
+        logger.info("Ingestion queue drained, resuming the crawl")
 
     def process_item_sync(self, item, spider):
-        if isinstance(item, items.BusinessCategory):
-            self.process_business_category(item)
-        elif isinstance(item, items.Business):
-            self.process_business(item)
-        else:
-            logger.warning(f"Unknown item type: {item}")
+        self.ingest([item])
 
     def process_business_category(
         self, item: items.BusinessCategory
     ) -> models.BusinessCategory:
-        if item._cache:
-            return item._cache
+        if not item._cache:
+            self.ingest([item])
+        return item._cache
+
+    def process_business(self, item: items.Business) -> models.Business:
+        if not item._cache:
+            self.ingest([item])
+        return item._cache
+
+    # ======
+    # Batch Ingestion
+    #
+
+    def ingest(self, batch: list):
+        """
+        Write a batch of items in one transaction
+
+        If writing the batch fails on one of ``ITEM_ERRORS`` (e.g. a slug
+        collision), it is rolled back and replayed one item at a time so a
+        single bad item does not drop the whole batch.
+        """
+        if self.identity_index is None:
+            self.load_indexes()
 
         try:
-            category = models.BusinessCategory.objects.get(
-                Q(name=item.name)
-                | Q(
-                    chamber_of_commerce_id=item.chamber_of_commerce_id,
-                    chamber_of_commerce_id__isnull=False,
-                ),
+            self._ingest_atomic(batch)
+        except ITEM_ERRORS as error:
+            # Cached categories may hold changes from the rolled back batch;
+            # reload in place, as other spiders' pipelines share the cache
+            self.category_cache.entries = CategoryCache.load().entries
+            if len(batch) == 1:
+                logger.error(f"Could not ingest item {batch[0]}: {error!r}")
+                self.inc_stat("ingestion/items_failed")
+                return
+            logger.warning(
+                f"Batch of {len(batch)} items failed, retrying one item at a time"
+            )
+            for item in batch:
+                self.ingest([item])
+
+    def _ingest_atomic(self, batch: list):
+        self.after_commit = []
+        business_items = []
+        category_items = []
+        for item in batch:
+            if isinstance(item, items.BusinessCategory):
+                category_items.append(item)
+            elif isinstance(item, items.Business):
+                business_items.append(item)
+            else:
+                logger.warning(f"Unknown item type: {item}")
+
+        business_items, fingerprints, unchanged = self.skip_unchanged(business_items)
+        for item in business_items:
+            category_items.extend(item_categories(item))
+
+        with transaction.atomic():
+            categories = self.resolve_categories(category_items)
+            addresses = self.resolve_addresses(business_items)
+            businesses = self.resolve_businesses(business_items, addresses)
+            self.attach_categories(business_items, businesses, categories)
+            self.attach_social_media_links(business_items, businesses)
+            self.save_fingerprints(business_items, businesses, fingerprints)
+
+        # Only cache model instances once the transaction has committed
+        for callback in self.after_commit:
+            callback()
+        for item in category_items:
+            item._cache = categories[id(item)]
+            self.category_cache.add(item._cache)
+        for item, business in zip(business_items, businesses):
+            item._cache = business
+            self.identity_index.add_business(business)
+            if self.fuzzy_index is not None:
+                self.fuzzy_index.add_business(business)
+            # Log to CSV here, always passing the real model instance
+            if self.csv_logger:
+                self.csv_logger.log_business(business)
+
+        # Unchanged items still resolve to (and are logged with) their business
+        written = {
+            fingerprints[id(item)][0]: business
+            for item, business in zip(business_items, businesses)
+            if id(item) in fingerprints
+        }
+        for item, external_id, business in unchanged:
+            item._cache = business or written.get(external_id)
+            if self.csv_logger and item._cache:
+                self.csv_logger.log_business(item._cache)
+
+    def skip_unchanged(
+        self, business_items: list[items.Business]
+    ) -> tuple[list[items.Business], dict[int, tuple[str, str]], list[tuple]]:
+        """
+        Drop items whose fingerprint is unchanged since the last crawl
+
+        Returns the remaining items, their (external id, fingerprint) keyed
+        by ``id()``, and ``(item, external id, business)`` for each dropped
+        item.  ``business`` is None for repeats of a record written in the
+        same batch.  Records whose business has since been deleted (e.g.
+        merged into another) are not dropped.
+        """
+        if self.fingerprints is None:
+            return business_items, {}, []
+
+        keyed = [(item, item.external_id(), item.fingerprint()) for item in business_items]
+        # Businesses of the unchanged records, in one query
+        known = models.Business.objects.in_bulk(
+            {
+                self.fingerprints.business_id(external_id)
+                for _, external_id, fingerprint in keyed
+                if self.fingerprints.get(external_id) == fingerprint
+            }
+        )
+
+        counts = {"skipped": 0, "changed": 0, "new": 0}
+        seen = {}
+        remaining = []
+        fingerprints = {}
+        unchanged = []
+        for item, external_id, fingerprint in keyed:
+            previous = seen.get(external_id) or self.fingerprints.get(external_id)
+            if previous == fingerprint:
+                if external_id in seen:
+                    unchanged.append((item, external_id, None))
+                    counts["skipped"] += 1
+                    continue
+                business = known.get(self.fingerprints.business_id(external_id))
+                if business is not None:
+                    unchanged.append((item, external_id, business))
+                    counts["skipped"] += 1
+                    continue
+
+            counts["changed" if previous else "new"] += 1
+            seen[external_id] = fingerprint
+            fingerprints[id(item)] = (external_id, fingerprint)
+            remaining.append(item)
+
+        def record_counts():
+            for outcome, count in counts.items():
+                if count and self.stats is not None:
+                    self.stats.inc_value(f"ingestion/fingerprint/{outcome}", count)
+
+        self.after_commit.append(record_counts)
+        return remaining, fingerprints, unchanged
+
+    def save_fingerprints(
+        self,
+        business_items: list[items.Business],
+        businesses: list[models.Business],
+        fingerprints: dict[int, tuple[str, str]],
+    ):
+        """Store the fingerprint of every written item, one row per source record"""
+        rows = {}
+        for item, business in zip(business_items, businesses):
+            if id(item) not in fingerprints:
+                continue
+            external_id, fingerprint = fingerprints[id(item)]
+            rows[external_id] = models.ScrapeFingerprint(
+                source=self.fingerprints.source,
+                external_id=external_id,
+                fingerprint=fingerprint,
+                business=business,
             )
-            if item.chamber_of_commerce_id and not category.chamber_of_commerce_id:
+        if not rows:
+            return
+
+        models.ScrapeFingerprint.objects.bulk_create(
+            rows.values(),
+            update_conflicts=True,
+            unique_fields=["source", "external_id"],
+            update_fields=["fingerprint", "business", "updated_at"],
+        )
+        for row in rows.values():
+            self.after_commit.append(
+                partial(
+                    self.fingerprints.add,
+                    row.external_id,
+                    row.fingerprint,
+                    row.business_id,
+                )
+            )
+
+    def resolve_categories(
+        self, category_items: list[items.BusinessCategory]
+    ) -> dict[int, models.BusinessCategory]:
+        """
+        Map each category item (by ``id()``) to a saved BusinessCategory
+        """
+        resolved = {
+            id(item): item._cache for item in category_items if item._cache
+        }
+        pending_items = [item for item in category_items if not item._cache]
+        if not pending_items:
+            return resolved
+
+        # Categories created or re-keyed within this batch
+        batch_cache = CategoryCache()
+        created = []
+        updated = []
+        for item in pending_items:
+            keys = CategoryCache.item_keys(item)
+            category = first_match(
+                self.category_cache.match(keys), batch_cache.match(keys)
+            )
+            if category is None:
+                category = models.BusinessCategory(
+                    name=item.name,
+                    chamber_of_commerce_id=item.chamber_of_commerce_id or None,
+                )
+                category.populate_slug()
+                created.append(category)
+
+            elif item.chamber_of_commerce_id and not category.chamber_of_commerce_id:
                 # Update the chamber_of_commerce_id if it was not set before
                 category.chamber_of_commerce_id = item.chamber_of_commerce_id
-                category.save()
-                logger.info(
-                    f"Updated BusinessCategory chamber_of_commerce_id: {category}"
-                )
+                if category.pk:
+                    updated.append(category)
 
-        except models.BusinessCategory.DoesNotExist:
-            category = models.BusinessCategory.objects.create(
-                name=item.name,
-                chamber_of_commerce_id=item.chamber_of_commerce_id or None,
+            batch_cache.add(category)
+            resolved[id(item)] = category
+
+        if created:
+            models.BusinessCategory.objects.bulk_create(created)
+            logger.info(f"Created {len(created)} BusinessCategory rows")
+        if updated:
+            now = timezone.now()
+            for category in updated:
+                category.updated_at = now
+            models.BusinessCategory.objects.bulk_update(
+                updated, ["chamber_of_commerce_id", "updated_at"]
             )
-            logger.info(f"Created BusinessCategory: {category}")
-
-        except models.BusinessCategory.MultipleObjectsReturned:
-            # Handle the case where multiple categories exist with the same name
-            # This should be rare, but we log it for debugging purposes
-            logger.error(
-                f"Multiple BusinessCategory objects found for {item.name}. "
-                "Using the first one found."
+            logger.info(
+                f"Updated BusinessCategory chamber_of_commerce_id: {len(updated)} rows"
             )
-            category = models.BusinessCategory.objects.filter(
-                Q(chamber_of_commerce_id=item.chamber_of_commerce_id)
-                | Q(name=item.name)
-            ).first()
+        return resolved
 
-        item._cache = category
-        return category
+    def resolve_addresses(
+        self, business_items: list[items.Business]
+    ) -> dict[int, int | None]:
+        """
+        Map each business item (by ``id()``) to a saved Address pk (or None)
 
-    def process_business(self, item: items.Business) -> models.Business:
-        if item._cache:
-            return item._cache
+        Addresses are matched on ``Address.normalized_key`` through the
+        address index.  Existing addresses only gain coordinates they are
+        missing.
+        """
+        resolved = {}
+        created = {}
+        updated = {}
+        for item in business_items:
+            key = AddressIndex.item_key(item)
+            resolved[id(item)] = key
+            if not key:
+                continue
 
-        categories = [
-            self.process_business_category(category)
-            for category in item.categories or []
-        ]
+            coordinates = self.clean_coordinates(item)
+            if key in created:
+                address = created[key]
+            elif entry := self.address_index.get(key):
+                pk, latitude, longitude = entry
+                address = updated.get(pk) or models.Address(
+                    pk=pk, normalized_key=key, latitude=latitude, longitude=longitude
+                )
+                if any(
+                    getattr(address, field) is None for field in coordinates
+                ):
+                    updated[pk] = address
+            else:
+                address = models.Address(
+                    street_1=item.address,
+                    city=item.city or "",
+                    state=item.state or "",
+                    zip=item.zip or "",
+                    normalized_key=key,
+                )
+                created[key] = address
 
-        # TODO - move Address creation to a separate pipeline
-        if item.address:
-            address_defaults = {}
-            
-            # Add coordinates if available
-            if item.latitude:
-                try:
-                    address_defaults['latitude'] = float(item.latitude)
-                except (ValueError, TypeError):
-                    logger.warning(f"Invalid latitude value: {item.latitude}")
-            
-            if item.longitude:
-                try:
-                    address_defaults['longitude'] = float(item.longitude)
-                except (ValueError, TypeError):
-                    logger.warning(f"Invalid longitude value: {item.longitude}")
-            
-            address, created = models.Address.objects.update_or_create(
-                street_1=item.address,
-                city=item.city,
-                state=item.state,
-                zip=item.zip,
-                defaults=address_defaults
+            for field, value in coordinates.items():
+                if getattr(address, field) is None:
+                    setattr(address, field, value)
+
+        if created:
+            models.Address.objects.bulk_create(created.values())
+            logger.info(f"Created {len(created)} Address rows")
+        if updated:
+            now = timezone.now()
+            for address in updated.values():
+                address.updated_at = now
+            models.Address.objects.bulk_update(
+                updated.values(), ["latitude", "longitude", "updated_at"]
             )
-            if created:
-                logger.info(f"Created Address: {address}")
-            elif address_defaults:
-                # Update coordinates if they were provided and address already exists
-                updated = False
-                if 'latitude' in address_defaults and not address.latitude:
-                    address.latitude = address_defaults['latitude']
-                    updated = True
-                if 'longitude' in address_defaults and not address.longitude:
-                    address.longitude = address_defaults['longitude']
-                    updated = True
-                if updated:
-                    address.save()
-                    logger.info(f"Updated Address coordinates: {address}")
-        else:
-            address = None
+            logger.info(f"Updated Address coordinates: {len(updated)} rows")
 
-        try:
-            business = models.Business.objects.get(
-                Q(name=item.name)
-                | Q(
-                    chamber_of_commerce_id=item.chamber_of_commerce_id,
-                    chamber_of_commerce_id__isnull=False,
-                )
-                | Q(
-                    downtown_frederick_id=item.downtown_frederick_id,
-                    downtown_frederick_id__isnull=False,
-                ),
+        for address in [*created.values(), *updated.values()]:
+            self.after_commit.append(partial(self.address_index.add, address))
+
+        return {
+            item_id: (
+                created[key].pk
+                if key in created
+                else self.address_index.get(key)[0] if key else None
             )
+            for item_id, key in resolved.items()
+        }
+
+    @staticmethod
+    def clean_coordinates(item: items.Business) -> dict:
+        """Valid coordinates of ``item``; out of range values are dropped"""
+        coordinates = {}
+        for field, limit in (("latitude", 90), ("longitude", 180)):
+            value = getattr(item, field)
+            if not value:
+                continue
+            try:
+                coordinate = float(value)
+            except (ValueError, TypeError):
+                logger.warning(f"Invalid {field} value: {value}")
+                continue
+            if not math.isfinite(coordinate) or abs(coordinate) > limit:
+                logger.warning(f"Out of range {field} value: {value}")
+                continue
+            coordinates[field] = coordinate
+        return coordinates
+
+    def resolve_businesses(
+        self,
+        business_items: list[items.Business],
+        addresses: dict[int, int | None],
+    ) -> list[models.Business]:
+        """
+        Match, merge and write every business item, returning one Business per item
+
+        Items matching the same business (e.g. a Chamber listing repeated
+        once per category) are merged into the same instance.
+        """
+        if not business_items:
+            return []
+
+        # Saved rows are matched through the identity index and fetched in
+        # one query; rows created or re-keyed within this batch are matched
+        # through ``batch_index``
+        item_keys = [
+            BusinessIdentityIndex.item_keys(item) for item in business_items
+        ]
+        fuzzy_matches = self.match_fuzzy(business_items, item_keys)
+        existing = models.Business.objects.in_bulk(
+            {
+                pk
+                for keys in item_keys
+                if (pk := self.identity_index.match(keys)) is not None
+            }
+            | {
+                match.pk
+                for matches in fuzzy_matches.values()
+                if (match := self.attachable_match(matches)) is not None
+            }
+        )
+        batch_index = {}
+        # (business, pk of the existing business, match) to store as candidates
+        candidates = []
+
+        def register(business):
+            for key in BusinessIdentityIndex.business_keys(business):
+                batch_index.setdefault(key, business)
 
-        except models.Business.MultipleObjectsReturned:
-            # Handle the case where multiple businesses exist with the same name
-            # This should be rare, but we log it for debugging purposes
-            logger.error(
-                f"Multiple Business objects found for {item.name}. "
-                "Using the first one found."
+        created = []
+        updated = {}
+        resolved = []
+        for item, keys in zip(business_items, item_keys):
+            address_id = addresses.get(id(item))
+            business = first_match(
+                existing.get(self.identity_index.match(keys)),
+                *(batch_index.get(key) for key in keys),
             )
-            business = models.Business.objects.filter(
-                Q(name=item.name)
-                | Q(chamber_of_commerce_id=item.chamber_of_commerce_id)
-                | Q(downtown_frederick_id=item.downtown_frederick_id),
-            ).first()
-
-        except models.Business.DoesNotExist:
-            # If the business does not exist, create it
-            business = None
-
-        if business:
-            # Explicitly update fields if not present
-            updated_fields = []
-            if item.name and not business.name:
-                business.name = item.name
-                updated_fields.append("name")
-
-            if address and not business.address:
-                business.address = address
-                updated_fields.append("address")
-
-            if item.website and not business.website_url:
-                business.website_url = item.website
-                updated_fields.append("website_url")
-
-            if item.google_maps and not business.google_maps_url:
-                business.google_maps_url = item.google_maps
-                updated_fields.append("google_maps_url")
-
-            if item.downtown_frederick_id and not business.downtown_frederick_id:
-                business.downtown_frederick_id = item.downtown_frederick_id
-                updated_fields.append("downtown_frederick_id")
-
-            # Handle extra field - merge dictionaries
-            if item.extra:
-                if not business.extra:
-                    business.extra = item.extra
-                    updated_fields.append("extra")
-                else:
-                    # Merge extra data, preferring new data
-                    merged_extra = {**business.extra, **item.extra}
-                    if merged_extra != business.extra:
-                        business.extra = merged_extra
-                        updated_fields.append("extra")
-
-            if item.number_of_employees and not business.number_of_employees:
-                # Parse number_of_employees, allowing numbers like "10,000"
-                try:
-                    business.number_of_employees = item.clean_number_of_employees()
-                    updated_fields.append("number_of_employees")
-                except (ValueError, TypeError):
+            matches = fuzzy_matches.get(id(item), [])
+            attached = None
+            if business is None and (match := self.attachable_match(matches)):
+                # The row may have been deleted (e.g. merged away) since the
+                # index was loaded
+                business = existing.get(match.pk)
+                if business is None:
                     logger.warning(
-                        f"Could not parse number_of_employees: {item.number_of_employees}"
+                        f"Fuzzy match {match.pk} for {item.name!r} no longer exists"
                     )
-
-            if phone_numbers := item.clean_phone_numbers():
-                if phone_numbers != business.phone_numbers:
-                    business.phone_numbers = list(
-                        set(business.phone_numbers + phone_numbers)
+                    self.after_commit.append(partial(self.fuzzy_index.remove, match.pk))
+                    matches = [other for other in matches if other is not match]
+                else:
+                    attached = match
+                    logger.info(
+                        f"Fuzzy matched {item.name!r} to Business {business.pk} "
+                        f"({match.score:.3f}: {'; '.join(match.reasons)})"
+                    )
+                    self.after_commit.append(
+                        partial(self.inc_stat, "ingestion/fuzzy/attached")
                     )
-                    updated_fields.append("phone_numbers")
 
-            if item.main_contact and item.main_contact not in business.contacts:
-                business.contacts.append(item.main_contact)
-                updated_fields.append("contacts")
+            if business is None:
+                business = self.build_business(item, address_id)
+                created.append(business)
+            else:
+                updated_fields = self.merge_business(business, item, address_id)
+                if updated_fields and business.pk:
+                    updated.setdefault(business.pk, (business, set()))[1].update(
+                        updated_fields
+                    )
+            register(business)
+            resolved.append(business)
+            candidates.extend(
+                (business, match) for match in matches if match is not attached
+            )
 
-            if updated_fields:
-                business.save(update_fields=updated_fields)
-                logger.info(
-                    f"Updated Business: {business} with fields {updated_fields}"
-                )
+        if created:
+            for business in created:
+                business.populate_slug()
+                business.populate_normalized_keys()
+            models.Business.objects.bulk_create(created)
+            models.BusinessContactKey.sync(created)
+            logger.info(f"Created {len(created)} Business rows")
 
-            else:
-                logger.info(f"Business already exists, no updates needed: {business}")
-
-        else:
-            business = models.Business.objects.create(
-                chamber_of_commerce_id=item.chamber_of_commerce_id or None,
-                downtown_frederick_id=item.downtown_frederick_id or None,
-                name=item.name,
-                address=address,
-                website_url=item.website,
-                google_maps_url=item.google_maps,
-                number_of_employees=item.clean_number_of_employees(),
-                phone_numbers=item.clean_phone_numbers(),
-                contacts=[item.main_contact] if item.main_contact else [],
-                extra=item.extra or {},
+        if updated:
+            now = timezone.now()
+            fields = {"updated_at"}
+            contacts_changed = []
+            for business, updated_fields in updated.values():
+                business.updated_at = now
+                fields.update(updated_fields)
+                key_fields = business.populate_normalized_keys()
+                fields.update(key_fields)
+                if {"normalized_website", "normalized_phone_numbers"} & set(key_fields):
+                    contacts_changed.append(business)
+            models.Business.objects.bulk_update(
+                [business for business, _ in updated.values()], sorted(fields)
+            )
+            models.BusinessContactKey.sync(contacts_changed)
+            logger.info(
+                f"Updated {len(updated)} Business rows with fields {sorted(fields)}"
             )
-            logger.info(f"Created Business: {business}")
 
-        # ======
-        # Handle Related Fields
-        #
+        self.save_fuzzy_candidates(candidates)
+        return resolved
 
-        # Add categories to the business if it doesn't already exist
-        for category in categories:
-            if not business.categories.filter(pk=category.pk).exists():
-                business.categories.add(category)
+    def attachable_match(self, matches: list[FuzzyMatch]) -> FuzzyMatch | None:
+        """Best of ``matches`` strong enough to merge into, with a name match"""
+        return next(
+            (
+                match
+                for match in matches
+                if match.score >= self.fuzzy_attach_score
+                and match.name_score >= self.fuzzy_attach_name_score
+            ),
+            None,
+        )
 
-        for social_media in item.social_medias or []:
-            social_media_link, created = models.SocialMediaLink.objects.get_or_create(
-                business=business,
-                name=social_media["name"],
-                defaults=dict(
-                    url=social_media["url"],
+    def match_fuzzy(
+        self, business_items: list[items.Business], item_keys: list
+    ) -> dict[int, list]:
+        """
+        Fuzzy matches, best first, of each item (by ``id()``) without an
+        exact match in the identity index
+        """
+        if self.fuzzy_index is None:
+            return {}
+        fuzzy_matches = {}
+        started_at = time.perf_counter()
+        lookups = 0
+        for item, keys in zip(business_items, item_keys):
+            if self.identity_index.match(keys) is not None:
+                continue
+            lookups += 1
+            if matches := self.fuzzy_index.match(FuzzyBusinessIndex.item_keys(item)):
+                fuzzy_matches[id(item)] = matches
+        if lookups:
+            self.inc_stat("ingestion/fuzzy/lookups", lookups)
+            self.inc_stat(
+                "ingestion/fuzzy/lookup_seconds", time.perf_counter() - started_at
+            )
+        return fuzzy_matches
+
+    def save_fuzzy_candidates(self, candidates: list):
+        """Store medium-confidence fuzzy matches as duplicate candidates"""
+        if not candidates:
+            return
+        # Skip matches deleted since the index was loaded
+        live = set(
+            models.Business.objects.filter(
+                pk__in={match.pk for _, match in candidates}
+            ).values_list("pk", flat=True)
+        )
+        rows = {}
+        for business, match in candidates:
+            if business.pk == match.pk or match.pk not in live:
+                continue
+            pair = (min(business.pk, match.pk), max(business.pk, match.pk))
+            rows.setdefault(
+                pair,
+                models.DuplicateCandidate(
+                    business_1_id=pair[0],
+                    business_2_id=pair[1],
+                    score=match.score,
+                    reasons=match.reasons,
+                    detector_version=INGEST_CANDIDATE_VERSION,
                 ),
             )
-            if created:
-                logger.info(f"Created SocialMediaLink: {social_media_link}")
+        if not rows:
+            return
+        models.DuplicateCandidate.objects.bulk_create(
+            rows.values(), ignore_conflicts=True
+        )
+        logger.info(f"Stored {len(rows)} fuzzy duplicate candidates")
+        self.after_commit.append(
+            partial(self.inc_stat, "ingestion/fuzzy/candidates", len(rows))
+        )
 
-        item._cache = business
-        # Log to CSV here, always passing the real model instance
-        if self.csv_logger:
-            self.csv_logger.log_business(business)
-        return business
+    def inc_stat(self, key: str, count=1):
+        if self.stats is not None:
+            self.stats.inc_value(key, count)
+
+    @staticmethod
+    def build_business(
+        item: items.Business, address_id: int | None
+    ) -> models.Business:
+        return models.Business(
+            chamber_of_commerce_id=item.chamber_of_commerce_id or None,
+            downtown_frederick_id=item.downtown_frederick_id or None,
+            name=item.name,
+            address_id=address_id,
+            website_url=item.website,
+            google_maps_url=item.google_maps,
+            number_of_employees=item.clean_number_of_employees(),
+            phone_numbers=item.clean_phone_numbers(),
+            contacts=[item.main_contact] if item.main_contact else [],
+            extra=item.extra or {},
+        )
+
+    @staticmethod
+    def merge_business(
+        business: models.Business,
+        item: items.Business,
+        address_id: int | None,
+    ) -> list[str]:
+        """
+        Fill empty fields of ``business`` from ``item``, returning the changed fields
+        """
+        updated_fields = []
+        if item.name and not business.name:
+            business.name = item.name
+            updated_fields.append("name")
+
+        if address_id and not business.address_id:
+            business.address_id = address_id
+            updated_fields.append("address")
+
+        if item.website and not business.website_url:
+            business.website_url = item.website
+            updated_fields.append("website_url")
+
+        if item.google_maps and not business.google_maps_url:
+            business.google_maps_url = item.google_maps
+            updated_fields.append("google_maps_url")
+
+        if item.downtown_frederick_id and not business.downtown_frederick_id:
+            business.downtown_frederick_id = item.downtown_frederick_id
+            updated_fields.append("downtown_frederick_id")
+
+        # Handle extra field - merge dictionaries
+        if item.extra:
+            if not business.extra:
+                business.extra = item.extra
+                updated_fields.append("extra")
+            else:
+                # Merge extra data, preferring new data
+                merged_extra = {**business.extra, **item.extra}
+                if merged_extra != business.extra:
+                    business.extra = merged_extra
+                    updated_fields.append("extra")
+
+        if item.number_of_employees and not business.number_of_employees:
+            # Parse number_of_employees, allowing numbers like "10,000"
+            number_of_employees = item.clean_number_of_employees()
+            if number_of_employees is None:
+                logger.warning(
+                    f"Could not parse number_of_employees: {item.number_of_employees}"
+                )
+            else:
+                business.number_of_employees = number_of_employees
+                updated_fields.append("number_of_employees")
+
+        if phone_numbers := item.clean_phone_numbers():
+            if not set(phone_numbers) <= set(business.phone_numbers):
+                business.phone_numbers = list(
+                    set(business.phone_numbers + phone_numbers)
+                )
+                updated_fields.append("phone_numbers")
+
+        if item.main_contact and item.main_contact not in business.contacts:
+            business.contacts.append(item.main_contact)
+            updated_fields.append("contacts")
+
+        return updated_fields
+
+    # ======
+    # Handle Related Fields
+    #
+
+    def attach_categories(
+        self,
+        business_items: list[items.Business],
+        businesses: list[models.Business],
+        categories: dict[int, models.BusinessCategory],
+    ):
+        """
+        Link every business to its item's categories with one insert
+
+        Links already present in the through table are skipped.
+        """
+        Through = models.Business.categories.through
+        wanted = {
+            (business.pk, categories[id(category)].pk)
+            for item, business in zip(business_items, businesses)
+            for category in item_categories(item)
+        }
+        if not wanted:
+            return
+
+        existing = set(
+            Through.objects.filter(
+                business_id__in={business_id for business_id, _ in wanted}
+            ).values_list("business_id", "businesscategory_id")
+        )
+        missing = sorted(wanted - existing)
+        if missing:
+            Through.objects.bulk_create(
+                [
+                    Through(business_id=business_id, businesscategory_id=category_id)
+                    for business_id, category_id in missing
+                ],
+                ignore_conflicts=True,
+            )
+            logger.info(f"Added {len(missing)} Business categories")
+
+    def attach_social_media_links(
+        self,
+        business_items: list[items.Business],
+        businesses: list[models.Business],
+    ):
+        """
+        Create social media links not yet present, matched on (business, name)
+        """
+        wanted = {}
+        for item, business in zip(business_items, businesses):
+            for social_media in item.social_medias or []:
+                if not social_media.get("name") or not social_media.get("url"):
+                    continue
+                wanted.setdefault(
+                    (business.pk, social_media["name"]), social_media["url"]
+                )
+        if not wanted:
+            return
+
+        existing = set(
+            models.SocialMediaLink.objects.filter(
+                business_id__in={business_id for business_id, _ in wanted}
+            ).values_list("business_id", "name")
+        )
+        created = [
+            models.SocialMediaLink(business_id=business_id, name=name, url=url)
+            for (business_id, name), url in wanted.items()
+            if (business_id, name) not in existing
+        ]
+        if created:
+            models.SocialMediaLink.objects.bulk_create(created)
+            logger.info(f"Created {len(created)} SocialMediaLink rows")
+
+
+class SharedIngestion:
+    """
+    One ``IngestionWriter`` for every spider crawling in the process
+
+    Spiders run side by side in one reactor (``run_scraper all``) queue
+    ``(pipeline, item)`` pairs to the same writer thread, so batches are
+    still written one at a time (SQLite allows a single writer) and every
+    pipeline matches against the same in-memory indexes.  The writer is
+    started when the first spider opens and stopped once the last closes.
+
+    Writer stats (batches, commit times, queue depth) are recorded on the
+    stats of every crawler whose items may still be written at the time.
+    """
+
+    active = None
+
+    def __init__(self, pipeline: "DjangoBusinessIngestionPipeline"):
+        from twisted.internet import reactor
+
+        # Its indexes are loaded first and shared with the other pipelines
+        self.leader = pipeline
+        self.pipelines = []
+        # Items queued and not written yet, per pipeline (until it has left)
+        self.pending = {}
+        self.written = threading.Condition()
+        self.writer = IngestionWriter(
+            self.ingest,
+            setup=pipeline.load_indexes,
+            batch_size=pipeline.batch_size,
+            batch_timeout=pipeline.batch_timeout,
+            max_queue_size=pipeline.max_queue_size,
+            stats=self,
+            on_drained=lambda: reactor.callFromThread(self.resume_crawls),
+        )
+        self.writer.start()
+
+    @classmethod
+    def join(cls, pipeline: "DjangoBusinessIngestionPipeline") -> "SharedIngestion":
+        if cls.active is None:
+            cls.active = cls(pipeline)
+        cls.active.pipelines.append(pipeline)
+        with cls.active.written:
+            cls.active.pending[pipeline] = 0
+        return cls.active
+
+    def leave(self, pipeline: "DjangoBusinessIngestionPipeline"):
+        """
+        Deferred firing once ``pipeline``'s queued items are written; the
+        writer is stopped when the last pipeline leaves
+        """
+        self.pipelines.remove(pipeline)
+        if self.pipelines:
+            return threads.deferToThread(self.wait_written, pipeline)
+        SharedIngestion.active = None
+        return threads.deferToThread(self.writer.close)
+
+    def queued(self, pipeline: "DjangoBusinessIngestionPipeline"):
+        """Count an item ``pipeline`` hands to the writer"""
+        with self.written:
+            self.pending[pipeline] += 1
+
+    def wait_written(self, pipeline: "DjangoBusinessIngestionPipeline"):
+        """Block until every item ``pipeline`` queued has been written"""
+        # Other pipelines' items queued after the last of these aren't waited for
+        self.writer.flush(wait=False)
+        with self.written:
+            self.written.wait_for(lambda: not self.pending[pipeline])
+            del self.pending[pipeline]
+
+    def ingest(self, batch: list):
+        """Write a batch of ``(pipeline, item)``, each pipeline's items together"""
+        by_pipeline = {}
+        for pipeline, item in batch:
+            by_pipeline.setdefault(pipeline, []).append(item)
+        try:
+            for pipeline, pipeline_items in by_pipeline.items():
+                if pipeline.identity_index is None and self.leader.identity_index is not None:
+                    pipeline.load_indexes(shared=self.leader)
+                pipeline.ingest(pipeline_items)
+        finally:
+            # Written or dropped, these items are no longer pending
+            with self.written:
+                for pipeline, pipeline_items in by_pipeline.items():
+                    self.pending[pipeline] -= len(pipeline_items)
+                self.written.notify_all()
+
+    def crawler_stats(self) -> list:
+        with self.written:
+            return [
+                pipeline.stats for pipeline in self.pending if pipeline.stats is not None
+            ]
+
+    def inc_value(self, key, count=1):
+        for stats in self.crawler_stats():
+            stats.inc_value(key, count)
+
+    def max_value(self, key, value):
+        for stats in self.crawler_stats():
+            stats.max_value(key, value)
+
+    def resume_crawls(self):
+        for pipeline in self.pipelines:
+            pipeline.resume_crawl()
@@ -67,6 +67,23 @@ ITEM_PIPELINES = {
    "scraper.pipelines.DjangoBusinessIngestionPipeline": 300,
 }
 
+# Write scraped items in batches from a dedicated writer thread (see
+# DjangoBusinessIngestionPipeline): write after INGESTION_BATCH_SIZE items, or
+# once a batch has waited INGESTION_BATCH_TIMEOUT seconds for more. The crawl
+# is paused while INGESTION_QUEUE_SIZE items are waiting to be written.
+INGESTION_BATCH_SIZE = 100
+INGESTION_BATCH_TIMEOUT = 5
+INGESTION_QUEUE_SIZE = 1000
+
+# Items without an exact match are fuzzy matched (name, phone and website)
+# against existing businesses: matches scoring FUZZY_MATCH_ATTACH_SCORE, with a
+# name ratio of at least FUZZY_MATCH_ATTACH_NAME_SCORE, are merged into the
+# existing row; the others down to FUZZY_MATCH_CANDIDATE_SCORE are stored as
+# duplicate candidates. Set the candidate score to 0 to disable.
+FUZZY_MATCH_ATTACH_SCORE = 0.95
+FUZZY_MATCH_ATTACH_NAME_SCORE = 0.85
+FUZZY_MATCH_CANDIDATE_SCORE = 0.8
+
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
 #AUTOTHROTTLE_ENABLED = True
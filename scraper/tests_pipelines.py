@@ -0,0 +1,298 @@
+"""
+Unit tests for the batched ingestion pipeline
+"""
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from app.models import (
+    Address,
+    Business,
+    BusinessCategory,
+    DuplicateCandidate,
+    ScrapeFingerprint,
+)
+from scraper import items
+from scraper.indexes import MAX_NAME_CANDIDATES, FuzzyBusinessIndex
+from scraper.pipelines import DjangoBusinessIngestionPipeline, SharedIngestion
+
+
+def make_pipeline(spider_name="frederick_chamber", **kwargs):
+    pipeline = DjangoBusinessIngestionPipeline(stats=mock.Mock(), **kwargs)
+    pipeline.spider_name = spider_name
+    pipeline.csv_logger = mock.Mock()
+    pipeline.load_indexes()
+    return pipeline
+
+
+def stat_total(pipeline, key):
+    """Sum of the ``inc_value`` calls recorded for ``key``"""
+    return sum(
+        call.args[1] if len(call.args) > 1 else 1
+        for call in pipeline.stats.inc_value.call_args_list
+        if call.args[0] == key
+    )
+
+
+class BatchIngestionTest(TestCase):
+    """A batch is matched against the in-memory indexes and written in one transaction"""
+
+    def test_repeated_listing_merges_into_one_business(self):
+        """A listing repeated once per category becomes one business with every category"""
+        listings = [
+            items.Business(
+                name="Frederick Bakery",
+                chamber_of_commerce_id="frederick-bakery",
+                categories=[items.BusinessCategory(name=name, chamber_of_commerce_id=slug)],
+                extra=extra,
+            )
+            for name, slug, extra in [
+                ("Bakery", "bakery", {"hours": "9-5"}),
+                ("Cafe", "cafe", {"rating": 4}),
+            ]
+        ]
+        make_pipeline().ingest(listings)
+
+        business = Business.objects.get()
+        self.assertEqual([listing._cache.pk for listing in listings], [business.pk] * 2)
+        self.assertEqual(
+            set(business.categories.values_list("name", flat=True)), {"Bakery", "Cafe"}
+        )
+        self.assertEqual(business.extra, {"hours": "9-5", "rating": 4})
+
+    def test_existing_business_is_updated(self):
+        """Items matching a saved business by identity fill in its empty fields"""
+        existing = Business.objects.create(
+            name="Frederick Bakery",
+            slug="frederick-bakery",
+            chamber_of_commerce_id="frederick-bakery",
+        )
+        item = items.Business(
+            name="Frederick Bakery",
+            chamber_of_commerce_id="frederick-bakery",
+            website="https://frederickbakery.example.com",
+        )
+        make_pipeline().ingest([item])
+
+        self.assertEqual(Business.objects.count(), 1)
+        self.assertEqual(item._cache.pk, existing.pk)
+        existing.refresh_from_db()
+        self.assertEqual(existing.website_url, "https://frederickbakery.example.com")
+
+    def test_equivalent_addresses_share_a_row(self):
+        make_pipeline().ingest([
+            items.Business(
+                name="Monocacy Brewing Company", chamber_of_commerce_id="monocacy",
+                address="1781 North Market Street", city="Frederick", state="MD", zip="21701",
+            ),
+            items.Business(
+                name="Spires Salon", chamber_of_commerce_id="spires",
+                address="1781 N Market St", city="Frederick", state="MD", zip="21701",
+            ),
+        ])
+
+        address = Address.objects.get()
+        self.assertEqual(
+            set(Business.objects.values_list("address_id", flat=True)), {address.pk}
+        )
+
+    def test_categories_are_reused_across_batches(self):
+        pipeline = make_pipeline()
+        for name in ["Frederick Bakery", "Market Street Bakery"]:
+            pipeline.ingest([
+                items.Business(
+                    name=name,
+                    categories=[items.BusinessCategory(name="Bakery", chamber_of_commerce_id="12")],
+                )
+            ])
+
+        category = BusinessCategory.objects.get()
+        self.assertEqual(category.business_set.count(), 2)
+
+    def test_unchanged_items_are_skipped(self):
+        """Re-crawled records with the same payload are not written again, but still logged"""
+        def crawl():
+            return [
+                items.Business(name="Frederick Bakery", chamber_of_commerce_id="frederick-bakery"),
+                items.Business(name="Spires Salon", chamber_of_commerce_id="spires"),
+            ]
+
+        first = crawl()
+        make_pipeline().ingest(first)
+        self.assertEqual(ScrapeFingerprint.objects.count(), 2)
+
+        pipeline = make_pipeline()
+        second = crawl()
+        second[1].website = "https://spires.example.com"
+        pipeline.ingest(second)
+
+        self.assertEqual(stat_total(pipeline, "ingestion/fingerprint/skipped"), 1)
+        self.assertEqual(stat_total(pipeline, "ingestion/fingerprint/changed"), 1)
+        self.assertEqual(
+            [item._cache.pk for item in second], [item._cache.pk for item in first]
+        )
+        logged = [call.args[0].pk for call in pipeline.csv_logger.log_business.call_args_list]
+        self.assertEqual(sorted(logged), sorted(item._cache.pk for item in first))
+        self.assertEqual(
+            Business.objects.get(pk=second[1]._cache.pk).website_url,
+            "https://spires.example.com",
+        )
+
+    def test_failed_item_does_not_drop_the_batch(self):
+        """A batch failing on one item is replayed item by item"""
+        Business.objects.create(name="Old Name", slug="spires")
+        pipeline = make_pipeline()
+        batch = [
+            items.Business(name="Frederick Bakery", chamber_of_commerce_id="frederick-bakery"),
+            # Its slug collides with the business above
+            items.Business(name="Spires Salon", chamber_of_commerce_id="spires"),
+            items.Business(name="Monocacy Brewing", chamber_of_commerce_id="monocacy"),
+        ]
+        with self.assertLogs("scraper.pipelines", level="ERROR"):
+            pipeline.ingest(batch)
+
+        self.assertEqual(
+            set(Business.objects.values_list("slug", flat=True)),
+            {"spires", "frederick-bakery", "monocacy"},
+        )
+        self.assertIsNone(batch[1]._cache)
+        self.assertEqual(stat_total(pipeline, "ingestion/items_failed"), 1)
+
+    def test_out_of_range_coordinates_are_dropped(self):
+        item = items.Business(
+            name="Frederick Bakery", chamber_of_commerce_id="frederick-bakery",
+            address="50 Market St", city="Frederick", state="MD", zip="21701",
+            latitude="123.4", longitude="-77.41010073",
+        )
+        with self.assertLogs("scraper.pipelines", level="WARNING"):
+            make_pipeline().ingest([item])
+
+        address = Address.objects.get()
+        self.assertIsNone(address.latitude)
+        self.assertEqual(float(address.longitude), -77.41010073)
+
+
+class FuzzyMatchingTest(TestCase):
+    """Items without an exact match are attached to, or paired with, similar businesses"""
+
+    def setUp(self):
+        self.brewery = Business.objects.create(
+            name="Monocacy Brewing Company",
+            slug="monocacy-brewing-company",
+            phone_numbers=["240-422-4449"],
+        )
+        self.restaurant = Business.objects.create(
+            name="Roy Rogers",
+            slug="roy-rogers",
+            phone_numbers=["301-555-0100"],
+            website_url="https://royrogers.example.com",
+        )
+
+    def test_similar_name_and_contact_attach(self):
+        item = items.Business(
+            name="Monocacy Brewing Co", chamber_of_commerce_id="monocacy",
+            phone_numbers=["(240) 422-4449"],
+        )
+        pipeline = make_pipeline()
+        pipeline.ingest([item])
+
+        self.assertEqual(item._cache.pk, self.brewery.pk)
+        self.assertEqual(Business.objects.count(), 2)
+        self.assertEqual(stat_total(pipeline, "ingestion/fuzzy/attached"), 1)
+
+    def test_contacts_alone_only_store_a_candidate(self):
+        """Sharing a phone number and website is not enough to merge different names"""
+        item = items.Business(
+            name="Joe's Pizza", chamber_of_commerce_id="joes-pizza",
+            phone_numbers=["301-555-0100"], website="http://www.royrogers.example.com/",
+        )
+        make_pipeline().ingest([item])
+
+        self.assertNotEqual(item._cache.pk, self.restaurant.pk)
+        candidate = DuplicateCandidate.objects.get()
+        self.assertEqual(
+            (candidate.business_1_id, candidate.business_2_id),
+            (self.restaurant.pk, item._cache.pk),
+        )
+        self.assertGreaterEqual(candidate.score, 0.95)
+
+    def test_deleted_match_creates_a_business(self):
+        pipeline = make_pipeline()
+        self.brewery.delete()
+        item = items.Business(
+            name="Monocacy Brewing Co", chamber_of_commerce_id="monocacy",
+            phone_numbers=["(240) 422-4449"],
+        )
+        with self.assertLogs("scraper.pipelines", level="WARNING"):
+            pipeline.ingest([item])
+
+        self.assertEqual(item._cache.name, "Monocacy Brewing Co")
+        self.assertFalse(DuplicateCandidate.objects.exists())
+
+
+class FuzzyBusinessIndexTest(SimpleTestCase):
+    """Lookups read a bounded part of the index"""
+
+    def setUp(self):
+        self.index = FuzzyBusinessIndex(0.8)
+        for pk in range(2000):
+            self.index.add(pk, f"the {pk} consulting group", [])
+        self.index.add(5000, "monocacy brewing", [])
+
+    def test_rare_trigrams_find_the_match(self):
+        self.assertEqual(list(self.index.name_scores("monocacy brewin")), [5000])
+
+    def test_common_names_score_few_candidates(self):
+        """Hundreds of names are within the threshold, only the closest are scored"""
+        scores = self.index.name_scores("the 1 consulting group")
+        self.assertIn(1, scores)
+        self.assertLessEqual(len(scores), MAX_NAME_CANDIDATES)
+
+
+class SharedIngestionTest(TransactionTestCase):
+    """Spiders of one process write through one writer and share its indexes"""
+
+    def setUp(self):
+        self.chamber = DjangoBusinessIngestionPipeline(stats=mock.Mock())
+        self.chamber.spider_name = "frederick_chamber"
+        self.downtown = DjangoBusinessIngestionPipeline(stats=mock.Mock())
+        self.downtown.spider_name = "downtown_frederick"
+        self.ingestion = SharedIngestion.join(self.chamber)
+
+    def tearDown(self):
+        SharedIngestion.active = None
+        self.ingestion.writer.close()
+
+    def queue(self, pipeline, item):
+        self.ingestion.queued(pipeline)
+        self.ingestion.writer.put((pipeline, item))
+
+    def test_pipelines_share_writer_and_indexes(self):
+        self.assertIs(SharedIngestion.join(self.downtown), self.ingestion)
+        self.queue(self.chamber, items.Business(name="Frederick Bakery", chamber_of_commerce_id="fb"))
+        self.queue(self.downtown, items.Business(name="Frederick Bakery", downtown_frederick_id="fb"))
+        self.ingestion.wait_written(self.chamber)
+        self.ingestion.wait_written(self.downtown)
+
+        self.assertIs(self.downtown.identity_index, self.chamber.identity_index)
+        # The downtown listing matched the business the chamber spider created
+        business = Business.objects.get()
+        self.assertEqual(business.downtown_frederick_id, "fb")
+        self.assertEqual(
+            set(ScrapeFingerprint.objects.values_list("source", flat=True)),
+            {"frederick_chamber", "downtown_frederick"},
+        )
+
+    def test_leaving_pipeline_waits_for_its_own_items(self):
+        SharedIngestion.join(self.downtown)
+        self.queue(self.chamber, items.Business(name="Frederick Bakery", chamber_of_commerce_id="fb"))
+        self.ingestion.wait_written(self.chamber)
+
+        self.assertTrue(Business.objects.filter(chamber_of_commerce_id="fb").exists())
+        self.assertNotIn(self.chamber, self.ingestion.pending)
+        # Writer stats go to the crawlers still writing only
+        self.ingestion.inc_value("ingestion/writer/items", 3)
+        self.downtown.stats.inc_value.assert_called_with("ingestion/writer/items", 3)
+        self.assertNotIn(
+            mock.call("ingestion/writer/items", 3),
+            self.chamber.stats.inc_value.call_args_list,
+        )
@@ -0,0 +1,114 @@
+"""
+Unit tests for the run_scraper command
+"""
+import argparse
+from io import StringIO
+from unittest import mock
+
+from django.test import SimpleTestCase
+from twisted.internet import defer
+
+from scraper.management.commands.run_scraper import (
+    SCRAPERS,
+    Command,
+    ScraperName,
+    crawl_sequences,
+    scraper_names,
+)
+
+
+class ScraperNamesTest(SimpleTestCase):
+    """Test parsing the scraper argument"""
+
+    def test_all(self):
+        """``all`` selects every scraper"""
+        self.assertEqual(scraper_names("all"), list(ScraperName))
+
+    def test_comma_separated(self):
+        """Names are split on commas, stripped and de-duplicated in order"""
+        self.assertEqual(
+            scraper_names("fitci, frederick_chamber,fitci,"),
+            [ScraperName.FITCI, ScraperName.FREDERICK_CHAMBER],
+        )
+
+    def test_invalid(self):
+        """Unknown names and empty lists are rejected"""
+        with self.assertRaises(argparse.ArgumentTypeError):
+            scraper_names("fitci,nope")
+        with self.assertRaises(argparse.ArgumentTypeError):
+            scraper_names(" , ")
+
+
+class CrawlSequencesTest(SimpleTestCase):
+    """Test grouping the scrapers of a site"""
+
+    def test_same_site_scrapers_grouped(self):
+        """Scrapers of the same site share a sequence, the others run alone"""
+        self.assertEqual(
+            crawl_sequences(
+                [
+                    ScraperName.DISCOVER_FREDERICK_MAJOR_EMPLOYERS,
+                    ScraperName.FITCI,
+                    ScraperName.DISCOVER_FREDERICK,
+                ]
+            ),
+            [
+                [
+                    ScraperName.DISCOVER_FREDERICK_MAJOR_EMPLOYERS,
+                    ScraperName.DISCOVER_FREDERICK,
+                ],
+                [ScraperName.FITCI],
+            ],
+        )
+
+    def test_all_scrapers_crawled_once(self):
+        """Every scraper ends up in exactly one sequence"""
+        sequences = crawl_sequences(list(ScraperName))
+        crawled = [name for sequence in sequences for name in sequence]
+        self.assertCountEqual(crawled, list(ScraperName))
+
+
+class CrawlInTurnTest(SimpleTestCase):
+    """Test that scrapers of a sequence are started one after another"""
+
+    def test_next_crawl_waits_for_previous(self):
+        """The second scraper is crawled once the first one finished"""
+        crawls = {}
+        process = mock.Mock()
+
+        def crawl(spider):
+            crawls[spider] = defer.Deferred()
+            return crawls[spider]
+
+        process.crawl.side_effect = crawl
+        command = Command(stdout=StringIO())
+        first, second = (
+            SCRAPERS[ScraperName.DISCOVER_FREDERICK][1],
+            SCRAPERS[ScraperName.DISCOVER_FREDERICK_MAJOR_EMPLOYERS][1],
+        )
+
+        command.crawl_in_turn(
+            process,
+            [ScraperName.DISCOVER_FREDERICK, ScraperName.DISCOVER_FREDERICK_MAJOR_EMPLOYERS],
+        )
+        self.assertEqual([call.args[0] for call in process.crawl.call_args_list], [first])
+
+        crawls[first].callback(None)
+        self.assertEqual(
+            [call.args[0] for call in process.crawl.call_args_list], [first, second]
+        )
+
+    def test_next_crawl_starts_after_failure(self):
+        """A failed crawl doesn't stop the rest of its sequence"""
+        process = mock.Mock()
+        deferreds = [defer.Deferred(), defer.Deferred()]
+        process.crawl.side_effect = deferreds
+        command = Command(stdout=StringIO())
+
+        command.crawl_in_turn(
+            process,
+            [ScraperName.DISCOVER_FREDERICK, ScraperName.DISCOVER_FREDERICK_MAJOR_EMPLOYERS],
+        )
+        deferreds[0].errback(RuntimeError("crawl failed"))
+        self.assertEqual(process.crawl.call_count, 2)
+        self.assertIn("Running Discover Frederick Major Employers scraper", command.stdout.getvalue())
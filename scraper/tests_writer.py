@@ -0,0 +1,83 @@
+"""
+Unit tests for the ingestion writer thread
+"""
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+from scraper.writer import IngestionWriter
+
+
+class IngestionWriterTest(SimpleTestCase):
+    """Items are written in batches from the writer thread"""
+
+    def start(self, ingest, **kwargs):
+        writer = IngestionWriter(ingest, stats=mock.Mock(), **kwargs)
+        writer.start()
+        self.addCleanup(lambda: writer.is_alive() and writer.close())
+        return writer
+
+    def test_batches_and_close(self):
+        batches = []
+        writer = self.start(batches.append, batch_size=2, batch_timeout=None)
+        for item in range(5):
+            writer.put(item)
+        writer.close()
+
+        self.assertEqual([item for batch in batches for item in batch], list(range(5)))
+        self.assertTrue(all(len(batch) <= 2 for batch in batches))
+        self.assertFalse(writer.is_alive())
+
+    def test_flush_waits_for_queued_items(self):
+        batches = []
+        # A long timeout: flush must end the batch rather than wait it out
+        writer = self.start(batches.append, batch_size=100, batch_timeout=60)
+        writer.put("a")
+        writer.put("b")
+        writer.flush()
+        self.assertEqual(batches, [["a", "b"]])
+
+    def test_backpressure(self):
+        """A full queue refuses items until the writer drains it to half"""
+        writing = threading.Event()
+        release = threading.Event()
+        drained = threading.Event()
+
+        def ingest(batch):
+            writing.set()
+            release.wait(5)
+
+        writer = self.start(
+            ingest, batch_size=1, batch_timeout=None, max_queue_size=2, on_drained=drained.set
+        )
+        # The first item is taken by the blocked writer, two fill the queue
+        writer.put(1)
+        self.assertTrue(writing.wait(5))
+        self.assertTrue(writer.offer(2))
+        self.assertTrue(writer.offer(3))
+        self.assertFalse(writer.offer(4))
+        self.assertTrue(writer.filled_up.is_set())
+
+        release.set()
+        self.assertTrue(drained.wait(5))
+        writer.close()
+        writer.stats.max_value.assert_any_call("ingestion/writer/queue_depth_max", 2)
+
+    def test_failed_batch_is_dropped(self):
+        """An error writing one batch doesn't stop the writer"""
+        written = []
+
+        def ingest(batch):
+            if "bad" in batch:
+                raise RuntimeError("boom")
+            written.extend(batch)
+
+        writer = self.start(ingest, batch_size=1, batch_timeout=None)
+        with self.assertLogs("scraper.writer", level="ERROR"):
+            writer.put("bad")
+            writer.put("good")
+            writer.close()
+
+        self.assertEqual(written, ["good"])
+        writer.stats.inc_value.assert_any_call("ingestion/writer/items_dropped", 1)
+        writer.stats.inc_value.assert_any_call("ingestion/writer/errors")
@@ -0,0 +1,163 @@
+"""
+Single database writer thread for the ingestion pipeline.
+
+Scrapy hands items over through a bounded queue; the writer groups them into
+batches and commits each batch from its own thread (and so its own database
+connection), letting parsing and database writes overlap.
+"""
+
+import logging
+import queue
+import threading
+import time
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def is_marker(item) -> bool:
+    """Whether a queued ``item`` is a stop or flush marker rather than an item"""
+    return item is _STOP or isinstance(item, threading.Event)
+
+
+class IngestionWriter(threading.Thread):
+    """
+    Consume items from a bounded queue and write them in batches
+
+    ``ingest`` is called with each batch; ``setup`` runs once on the writer
+    thread before the first batch (e.g. to load lookup indexes).  Once the
+    queue has filled up, ``on_drained`` is called (from the writer thread)
+    as soon as it is back down to half its size.
+    """
+
+    def __init__(
+        self,
+        ingest,
+        setup=None,
+        batch_size=100,
+        batch_timeout=5.0,
+        max_queue_size=1000,
+        stats=None,
+        on_drained=None,
+    ):
+        super().__init__(name="ingestion-writer", daemon=True)
+        self.ingest = ingest
+        self.setup = setup
+        self.batch_size = max(1, batch_size)
+        self.batch_timeout = batch_timeout
+        self.queue = queue.Queue(maxsize=max(1, max_queue_size))
+        self.low_watermark = self.queue.maxsize // 2
+        self.stats = stats
+        self.on_drained = on_drained
+        self.filled_up = threading.Event()
+
+    def offer(self, item) -> bool:
+        """Queue ``item`` without blocking; False if the queue is full"""
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.filled_up.set()
+            return False
+        self.record_depth()
+        return True
+
+    def put(self, item):
+        """Queue ``item``, blocking until there is room"""
+        self.queue.put(item)
+        self.record_depth()
+
+    def flush(self, wait=True):
+        """
+        Write the batch being collected without waiting out its timeout; with
+        ``wait``, block until everything queued so far has been written
+        """
+        written = threading.Event()
+        self.queue.put(written)
+        if wait:
+            written.wait()
+
+    def close(self):
+        """Write everything still queued, then stop the thread"""
+        self.queue.put(_STOP)
+        self.join()
+
+    def run(self):
+        try:
+            if self.setup:
+                self.run_safely(self.setup)
+
+            marker = None
+            while marker is not _STOP:
+                batch, marker = self.next_batch()
+                if batch:
+                    self.write(batch)
+                if isinstance(marker, threading.Event):
+                    # A flush() is waiting for the items queued before it
+                    marker.set()
+                if self.filled_up.is_set() and self.queue.qsize() <= self.low_watermark:
+                    self.filled_up.clear()
+                    if self.on_drained:
+                        self.on_drained()
+        finally:
+            connections.close_all()
+
+    def next_batch(self) -> tuple[list, object]:
+        """
+        Wait for an item, then collect up to ``batch_size`` items or until timeout
+
+        Also returns the stop or flush marker that ended the batch, if any.
+        """
+        item = self.queue.get()
+        if is_marker(item):
+            return [], item
+
+        batch = [item]
+        deadline = (
+            time.monotonic() + self.batch_timeout if self.batch_timeout else None
+        )
+        while len(batch) < self.batch_size:
+            try:
+                if deadline is None:
+                    item = self.queue.get_nowait()
+                else:
+                    item = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if is_marker(item):
+                return batch, item
+            batch.append(item)
+        return batch, None
+
+    def write(self, batch: list):
+        started_at = time.perf_counter()
+        if not self.run_safely(self.ingest, batch):
+            logger.error(f"Ingestion writer dropped a batch of {len(batch)} items")
+            if self.stats is not None:
+                self.stats.inc_value("ingestion/writer/items_dropped", len(batch))
+        elapsed = time.perf_counter() - started_at
+
+        if self.stats is not None:
+            self.stats.inc_value("ingestion/writer/batches")
+            self.stats.inc_value("ingestion/writer/items", len(batch))
+            self.stats.inc_value("ingestion/writer/commit_seconds_total", elapsed)
+            self.stats.max_value("ingestion/writer/commit_seconds_max", elapsed)
+
+    def run_safely(self, function, *args) -> bool:
+        """Run ``function``, returning False if it raised"""
+        # An unexpected error must not kill the thread, or the queue would
+        # fill up and block the crawl forever
+        try:
+            function(*args)
+        except Exception:
+            logger.exception(f"Ingestion writer failed running {function.__name__}")
+            if self.stats is not None:
+                self.stats.inc_value("ingestion/writer/errors")
+            return False
+        return True
+
+    def record_depth(self):
+        if self.stats is not None:
+            self.stats.max_value("ingestion/writer/queue_depth_max", self.queue.qsize())